@@ -8,11 +8,8 @@ import geopandas as gpd
 import pandas as pd
 import folium
 from streamlit_folium import folium_static
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
 import os
-import subprocess
 import json
 import base64
 from io import BytesIO
@@ -22,21 +19,37 @@ from proc import (
     ler_geodataframe,
     selecionar_imovel_car,
     inserir_geojson_folium,
+    preparar_geojson,
+    zoom_para_extensao,
+    assinatura_arquivo,
     mostrar_status,
     validar_geometria,
     contar_embargos_por_cpf,
     calcular_risco_reputacional,
-    calcular_area_util,
-    cor_por_status
+    obter_motor_areas,
+    cor_por_status,
+    estatisticas_cache_camadas,
+    obter_indice_cpf,
+    obter_indice_imoveis,
+    ler_feicoes_por_atributo,
+    MAX_SUGESTOES_IMOVEIS
+)
+from scraper import iniciar_atualizacao_background, status_atualizacao
+from earth_engine import (
+    histograma_mapbiomas,
+    serie_mapbiomas,
+    matriz_transicao_mapbiomas,
+    tabela_transicao,
+    miniaturas_sentinel2,
+    mapbiomas_classes,
+    obter_cache_ee,
+    ee_disponivel,
+    inicializar_ee,
+    MAX_NUVENS_SENTINEL2
 )
 
-# Tentar importar Earth Engine
-try:
-    import ee
-    import geemap.foliumap as geemap
-    EE_DISPONIVEL = True
-except ImportError:
-    EE_DISPONIVEL = False
+# O download do Streamlit entrega o ZIP inteiro da memória: carteiras maiores vão pelo `laudos.py`
+MAX_IMOVEIS_EXPORTACAO = 500
 
 # Configuração da página
 st.set_page_config(
@@ -68,48 +81,31 @@ def inicializar_earth_engine():
     """
     Inicializa Google Earth Engine usando service account
     
+    A inicialização é feita uma única vez por processo (ver
+    `earth_engine.inicializar_ee`); nas reexecuções seguintes esta chamada
+    não acessa a rede nem relê credenciais.
+    
     Returns:
         bool: True se inicialização foi bem-sucedida
     """
-    if not EE_DISPONIVEL:
+    if not ee_disponivel():
         return False
     
     try:
-        # Verificar se já está inicializado
-        ee.Initialize()
-        return True
-    except:
-        pass
-    
-    try:
+        credenciais_json = None
+        
         # Tentar usar secrets do Streamlit
         if 'google_earth_engine' in st.secrets:
             service_account_info = st.secrets['google_earth_engine']
             
             if 'service_account_b64' in service_account_info:
                 # Decodificar base64
-                credentials_json = base64.b64decode(
+                credenciais_json = base64.b64decode(
                     service_account_info['service_account_b64']
                 ).decode('utf-8')
-                credentials = json.loads(credentials_json)
-                
-                # Inicializar com service account
-                service_account = credentials['client_email']
-                credentials_ee = ee.ServiceAccountCredentials(service_account, key_data=credentials_json)
-                ee.Initialize(credentials_ee)
-                return True
-        
-        # Tentar arquivo local
-        if os.path.exists('service_account.json'):
-            with open('service_account.json', 'r') as f:
-                credentials = json.load(f)
-            service_account = credentials['client_email']
-            credentials_ee = ee.ServiceAccountCredentials(service_account, 'service_account.json')
-            ee.Initialize(credentials_ee)
-            return True
-        
-        # Tentar autenticação padrão
-        ee.Initialize()
+        
+        # Sem secrets: arquivo local service_account.json ou autenticação padrão
+        inicializar_ee(credenciais_json)
         return True
         
     except Exception as e:
@@ -119,76 +115,68 @@ def inicializar_earth_engine():
 
 # ==================== FUNÇÕES DE ANÁLISE MAPBIOMAS ====================
 
-def obter_cobertura_mapbiomas(roi, ano):
+def obter_cobertura_mapbiomas(geometria, ano):
     """
     Obtém dados de cobertura do MapBiomas para um ano específico
     
+    O resultado fica em cache em disco (ver `earth_engine.histograma_mapbiomas`):
+    repetir a análise de um imóvel e ano já consultados não chama o Earth Engine.
+    
     Args:
-        roi (ee.Geometry): Região de interesse
+        geometria (dict): Geometria GeoJSON do imóvel
         ano (int): Ano da análise
         
     Returns:
         dict: Dicionário com estatísticas de cobertura
     """
     try:
-        # Coleção MapBiomas 8.0
-        mapbiomas = ee.Image('projects/mapbiomas-workspace/public/collection8/mapbiomas_collection80_integration_v1')
-        
-        # Selecionar banda do ano
-        banda = f'classification_{ano}'
-        imagem = mapbiomas.select(banda)
-        
-        # Calcular áreas por classe
-        areas = imagem.reduceRegion(
-            reducer=ee.Reducer.frequencyHistogram(),
-            geometry=roi,
-            scale=30,
-            maxPixels=1e13,
-            bestEffort=True,
-            tileScale=4
-        )
-        
-        # Processar resultado
-        histogram = areas.getInfo()[banda]
-        
-        # Converter pixel count para hectares (30m x 30m = 900m² = 0.09ha)
-        resultado = {}
-        for classe, pixels in histogram.items():
-            area_ha = float(pixels) * 0.09
-            resultado[int(classe)] = area_ha
-        
-        return resultado
+        return histograma_mapbiomas(geometria, ano)
         
     except Exception as e:
         st.error(f"Erro ao obter cobertura MapBiomas: {e}")
         return {}
 
 
-def mapbiomas_classes():
+def obter_serie_mapbiomas(geometria, anos):
     """
-    Retorna dicionário com classes do MapBiomas
+    Obtém a série temporal de cobertura MapBiomas de um imóvel
     
+    Todos os anos que não estão em cache são reduzidos em uma única
+    requisição (ou em poucos lotes paralelos), em vez de uma por ano.
+    
+    Args:
+        geometria (dict): Geometria GeoJSON do imóvel
+        anos (list): Anos da série
+        
     Returns:
-        dict: Dicionário {código: nome}
+        pd.DataFrame: Tabela ano x classe (colunas 'ano', 'classe', 'nome_classe', 'area_ha')
     """
-    return {
-        3: 'Formação Florestal',
-        4: 'Formação Savânica',
-        5: 'Mangue',
-        11: 'Área Úmida',
-        12: 'Campo Alagado',
-        15: 'Pastagem',
-        18: 'Agricultura',
-        21: 'Mosaico Agricultura/Pastagem',
-        24: 'Infraestrutura Urbana',
-        25: 'Outras Áreas não Vegetadas',
-        30: 'Mineração',
-        33: 'Rio/Lago/Oceano',
-        41: 'Lavoura Temporária',
-        46: 'Café',
-        47: 'Citrus',
-        48: 'Outras Lavouras Perenes'
-    }
+    try:
+        return serie_mapbiomas(geometria, anos)
+        
+    except Exception as e:
+        st.error(f"Erro ao obter série MapBiomas: {e}")
+        return pd.DataFrame(columns=['ano', 'classe', 'nome_classe', 'area_ha'])
+
+
+def obter_transicoes_mapbiomas(geometria, ano_inicial, ano_final):
+    """
+    Obtém as transições de uso do solo entre dois anos
+    
+    Args:
+        geometria (dict): Geometria GeoJSON do imóvel
+        ano_inicial (int): Ano de origem
+        ano_final (int): Ano de destino
+        
+    Returns:
+        pd.DataFrame: Transições (colunas 'de', 'para', 'nome_de', 'nome_para', 'area_ha')
+    """
+    try:
+        return matriz_transicao_mapbiomas(geometria, ano_inicial, ano_final)
+        
+    except Exception as e:
+        st.error(f"Erro ao obter transições MapBiomas: {e}")
+        return pd.DataFrame(columns=['de', 'para', 'nome_de', 'nome_para', 'area_ha'])
 
 
 def criar_grafico_cobertura(dados_cobertura, titulo):
@@ -212,6 +200,9 @@ def criar_grafico_cobertura(dados_cobertura, titulo):
     
     df = pd.DataFrame(df_dados).sort_values('Área (ha)', ascending=False)
     
+    # plotly só é importado quando há gráfico a desenhar (ver benchmarks/tempo_inicializacao.py)
+    import plotly.express as px
+    
     # Criar gráfico
     fig = px.bar(
         df,
@@ -251,45 +242,87 @@ def criar_grafico_pizza(dados_cobertura):
         labels.append(nome_classe)
         values.append(area)
     
+    import plotly.graph_objects as go
+    
     fig = go.Figure(data=[go.Pie(labels=labels, values=values)])
     fig.update_layout(title='Distribuição de Uso do Solo', height=500)
     
     return fig
 
 
+def criar_grafico_serie(serie):
+    """
+    Cria gráfico de área empilhada da série temporal de uso do solo
+    
+    Args:
+        serie (pd.DataFrame): Tabela ano x classe de `serie_mapbiomas`
+        
+    Returns:
+        plotly.graph_objects.Figure: Figura do gráfico
+    """
+    import plotly.express as px
+    
+    fig = px.area(
+        serie,
+        x='ano',
+        y='area_ha',
+        color='nome_classe',
+        labels={'ano': 'Ano', 'area_ha': 'Área (ha)', 'nome_classe': 'Classe'}
+    )
+    fig.update_layout(height=450)
+    
+    return fig
+
+
+def criar_grafico_transicao(matriz, ano_inicial, ano_final):
+    """
+    Cria mapa de calor da matriz de transição entre classes
+    
+    Args:
+        matriz (pd.DataFrame): Matriz de `tabela_transicao`
+        ano_inicial (int): Ano de origem
+        ano_final (int): Ano de destino
+        
+    Returns:
+        plotly.graph_objects.Figure: Figura do gráfico
+    """
+    import plotly.express as px
+    
+    fig = px.imshow(
+        matriz,
+        text_auto='.1f',
+        color_continuous_scale='YlOrRd',
+        labels={'x': f'Classe em {ano_final}', 'y': f'Classe em {ano_inicial}', 'color': 'Área (ha)'},
+        aspect='auto'
+    )
+    fig.update_layout(height=500)
+    
+    return fig
+
+
 # ==================== FUNÇÕES DE SATÉLITE ====================
 
-def obter_imagem_sentinel2(roi, ano):
+def obter_imagens_sentinel2(geometria, anos):
     """
-    Obtém imagem Sentinel-2 mediana para um ano
+    Obtém miniaturas RGB Sentinel-2 (mediana anual) de um imóvel
+    
+    Os anos são buscados em paralelo e cada PNG fica em cache local
+    (ver `earth_engine.miniatura_sentinel2`): comparar um ano já visto não
+    chama o Earth Engine.
     
     Args:
-        roi (ee.Geometry): Região de interesse
-        ano (int): Ano da imagem
+        geometria (dict): Geometria GeoJSON do imóvel
+        anos (list): Anos das imagens
         
     Returns:
-        ee.Image: Imagem Sentinel-2 processada
+        dict: {ano: bytes PNG}, vazio em caso de erro
     """
     try:
-        # Definir período
-        data_inicio = f'{ano}-01-01'
-        data_fim = f'{ano}-12-31'
-        
-        # Coleção Sentinel-2
-        sentinel = ee.ImageCollection('COPERNICUS/S2_SR') \
-            .filterBounds(roi) \
-            .filterDate(data_inicio, data_fim) \
-            .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 20)) \
-            .select(['B4', 'B3', 'B2'])  # RGB
-        
-        # Mediana
-        imagem = sentinel.median().clip(roi)
-        
-        return imagem
+        return miniaturas_sentinel2(geometria, anos)
     
     except Exception as e:
         st.error(f"Erro ao obter imagem Sentinel-2: {e}")
-        return None
+        return {}
 
 
 def detectar_focos_fogo(gdf_imovel):
@@ -320,6 +353,9 @@ def gerar_laudo_pdf(dados_imovel, embargos_ibama, embargos_icmbio, areas, risco)
     """
     Gera PDF profissional de compliance
     
+    Usa o mesmo gerador do lote (`laudos.gerar_laudo_pdf`), importado só
+    quando o laudo é pedido.
+    
     Args:
         dados_imovel (dict): Dados do imóvel
         embargos_ibama (int): Número de embargos IBAMA
@@ -331,90 +367,9 @@ def gerar_laudo_pdf(dados_imovel, embargos_ibama, embargos_icmbio, areas, risco)
         bytes: PDF em bytes
     """
     try:
-        from reportlab.lib.pagesizes import A4
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.units import cm
-        
-        # Criar buffer
-        buffer = BytesIO()
-        pdf = canvas.Canvas(buffer, pagesize=A4)
-        
-        # Dimensões da página
-        width, height = A4
-        
-        # Cabeçalho
-        pdf.setFont("Helvetica-Bold", 20)
-        pdf.drawString(2*cm, height - 2*cm, "LAUDO DE CONFORMIDADE ESG")
-        
-        pdf.setFont("Helvetica", 12)
-        pdf.drawString(2*cm, height - 3*cm, f"Imóvel: {dados_imovel.get('cod_imovel', 'N/A')}")
-        pdf.drawString(2*cm, height - 3.7*cm, f"Data: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
-        
-        # Linha separadora
-        pdf.line(2*cm, height - 4*cm, width - 2*cm, height - 4*cm)
-        
-        # Status de Embargos
-        y_pos = height - 5*cm
-        pdf.setFont("Helvetica-Bold", 14)
-        pdf.drawString(2*cm, y_pos, "STATUS DE EMBARGOS")
-        
-        pdf.setFont("Helvetica", 11)
-        y_pos -= 0.8*cm
-        pdf.drawString(2*cm, y_pos, f"Embargos IBAMA: {embargos_ibama}")
-        y_pos -= 0.6*cm
-        pdf.drawString(2*cm, y_pos, f"Embargos ICMBio: {embargos_icmbio}")
-        
-        # Status geral
-        y_pos -= 1*cm
-        pdf.setFont("Helvetica-Bold", 14)
-        if embargos_ibama + embargos_icmbio == 0:
-            pdf.setFillColorRGB(0, 0.5, 0)
-            pdf.drawString(2*cm, y_pos, "✓ APROVADO - Sem Embargos")
-        else:
-            pdf.setFillColorRGB(0.8, 0, 0)
-            pdf.drawString(2*cm, y_pos, "✗ REPROVADO - Com Embargos Ativos")
-        
-        # Resetar cor
-        pdf.setFillColorRGB(0, 0, 0)
-        
-        # Risco Reputacional
-        y_pos -= 1.5*cm
-        pdf.setFont("Helvetica-Bold", 14)
-        pdf.drawString(2*cm, y_pos, "RISCO REPUTACIONAL")
-        
-        pdf.setFont("Helvetica", 11)
-        y_pos -= 0.8*cm
-        pdf.drawString(2*cm, y_pos, f"{risco[0]}")
-        y_pos -= 0.6*cm
-        pdf.drawString(2*cm, y_pos, f"Score: {risco[1]}/100")
-        
-        # Áreas
-        y_pos -= 1.5*cm
-        pdf.setFont("Helvetica-Bold", 14)
-        pdf.drawString(2*cm, y_pos, "ANÁLISE DE ÁREAS")
-        
-        pdf.setFont("Helvetica", 11)
-        y_pos -= 0.8*cm
-        pdf.drawString(2*cm, y_pos, f"Área Total: {areas['total']:.2f} ha")
-        y_pos -= 0.6*cm
-        pdf.drawString(2*cm, y_pos, f"Área Embargada: {areas['embargada']:.2f} ha")
-        y_pos -= 0.6*cm
-        pdf.drawString(2*cm, y_pos, f"Reserva Legal: {areas['reserva_legal']:.2f} ha")
-        y_pos -= 0.6*cm
-        pdf.drawString(2*cm, y_pos, f"APP: {areas['app']:.2f} ha")
-        y_pos -= 0.6*cm
-        pdf.setFont("Helvetica-Bold", 11)
-        pdf.drawString(2*cm, y_pos, f"Área Útil Explorável: {areas['util']:.2f} ha ({areas['percentual_util']:.1f}%)")
-        
-        # Rodapé
-        pdf.setFont("Helvetica", 8)
-        pdf.drawString(2*cm, 2*cm, "Sistema de Compliance ESG - Rondônia")
-        pdf.drawString(2*cm, 1.5*cm, "Desenvolvido por Ruan Almeida")
-        
-        pdf.save()
-        
-        buffer.seek(0)
-        return buffer.getvalue()
+        from laudos import gerar_laudo_pdf as gerar_pdf
+        
+        return gerar_pdf(dados_imovel, embargos_ibama, embargos_icmbio, areas, risco)
         
     except Exception as e:
         st.error(f"Erro ao gerar PDF: {e}")
@@ -435,20 +390,30 @@ def main():
     
     st.sidebar.title("⚙️ Configurações")
     
-    # Botão de atualização de embargos
-    if st.sidebar.button("🔄 Atualizar Base de Embargos"):
-        with st.spinner("Baixando dados do IBAMA/ICMBio..."):
-            resultado = subprocess.run(
-                ["python", "scraper.py"],
-                capture_output=True,
-                text=True
-            )
-            
-            if resultado.returncode == 0:
-                st.sidebar.success("✅ Base atualizada com sucesso!")
-                st.rerun()
-            else:
-                st.sidebar.error(f"❌ Erro na atualização: {resultado.stderr}")
+    # Atualização de embargos em segundo plano (uma por vez para todas as sessões)
+    tarefa = status_atualizacao()
+    em_andamento = tarefa is not None and tarefa['estado'] == 'executando'
+    
+    if st.sidebar.button("🔄 Atualizar Base de Embargos", disabled=em_andamento):
+        id_tarefa, nova = iniciar_atualizacao_background()
+        if not nova:
+            st.sidebar.info("ℹ️ Já existe uma atualização em andamento")
+        tarefa = status_atualizacao(id_tarefa)
+        em_andamento = tarefa['estado'] == 'executando'
+    
+    if em_andamento:
+        st.sidebar.progress(
+            tarefa['progresso'],
+            text=f"⏳ [{tarefa['id']}] {tarefa['mensagem']}"
+        )
+        st.sidebar.caption("Você pode continuar navegando com os dados atuais.")
+        st.sidebar.button("🔃 Verificar andamento")
+    elif tarefa is not None and tarefa['fim'] is not None:
+        horario = tarefa['fim'].strftime('%H:%M:%S')
+        if tarefa['estado'] == 'concluida':
+            st.sidebar.success(f"✅ Base atualizada às {horario}")
+        else:
+            st.sidebar.error(f"❌ Erro na atualização ({horario}): {tarefa['mensagem']}")
     
     # Verificar se arquivo existe
     gpkg_path = "car_embargos.gpkg"
@@ -469,82 +434,71 @@ def main():
         
         st.sidebar.success(f"✅ {len(layers)} camadas encontradas")
         
-        # Ler dados
-        gdf_imoveis = None
-        gdf_embargos_ibama = gpd.GeoDataFrame()
-        gdf_embargos_icmbio = gpd.GeoDataFrame()
-        gdf_rl = gpd.GeoDataFrame()
-        gdf_app = gpd.GeoDataFrame()
-        
-        if 'area_imovel' in layers:
-            gdf_imoveis = ler_geodataframe(gpkg_path, 'area_imovel')
-        
-        if 'embargos_ibama' in layers:
-            gdf_embargos_ibama = ler_geodataframe(gpkg_path, 'embargos_ibama')
-        
-        if 'embargos_icmbio' in layers:
-            gdf_embargos_icmbio = ler_geodataframe(gpkg_path, 'embargos_icmbio')
+        # Ler dados (só a linha do imóvel selecionado; embargos, RL e APP
+        # são lidos só na vizinhança dele)
+        if 'area_imovel' not in layers:
+            st.error("❌ Nenhum imóvel encontrado na camada 'area_imovel'")
+            st.stop()
         
-        if 'reserva_legal' in layers:
-            gdf_rl = ler_geodataframe(gpkg_path, 'reserva_legal')
+        # Determinar coluna de código (pelo esquema, sem ler a camada)
+        with fiona.open(gpkg_path, layer='area_imovel') as origem:
+            atributos_imovel = list(origem.schema['properties'])
+        coluna_cod = 'cod_imovel' if 'cod_imovel' in atributos_imovel else atributos_imovel[0]
         
-        if 'app' in layers:
-            gdf_app = ler_geodataframe(gpkg_path, 'app')
+        # Índice de busca por prefixo (só código e CPF/CNPJ, sem geometrias)
+        indice_imoveis = obter_indice_imoveis(gpkg_path, 'area_imovel', coluna_cod)
         
         # Verificar se há imóveis
-        if gdf_imoveis is None or gdf_imoveis.empty:
+        if len(indice_imoveis) == 0:
             st.error("❌ Nenhum imóvel encontrado na camada 'area_imovel'")
             st.stop()
         
-        # Determinar coluna de código
-        coluna_cod = 'cod_imovel' if 'cod_imovel' in gdf_imoveis.columns else gdf_imoveis.columns[0]
-        
-        # Seleção de imóvel
+        # Seleção de imóvel: as opções são só as sugestões para o termo digitado
         st.sidebar.markdown("### 📍 Selecionar Imóvel")
-        codigos_imoveis = gdf_imoveis[coluna_cod].unique().tolist()
+        termo_busca = st.sidebar.text_input(
+            "Buscar por código CAR ou CPF/CNPJ:",
+            placeholder="Início do código ou do documento"
+        )
+        sugestoes = indice_imoveis.buscar(termo_busca, MAX_SUGESTOES_IMOVEIS)
+        
+        if not sugestoes:
+            st.sidebar.warning(f"⚠️ Nenhum imóvel começa com '{termo_busca}'")
+            st.stop()
+        
         codigo_selecionado = st.sidebar.selectbox(
-            "Código do Imóvel:",
-            options=codigos_imoveis,
+            f"Código do Imóvel ({len(sugestoes)} primeiros de {len(indice_imoveis)}):",
+            options=sugestoes,
             index=0
         )
         
-        # Selecionar imóvel
+        # Selecionar imóvel (lê só a linha dele)
         gdf_imovel_sel, lat, lon, min_lat, max_lat, min_lon, max_lon = selecionar_imovel_car(
-            gdf_imoveis,
+            ler_feicoes_por_atributo(gpkg_path, 'area_imovel', coluna_cod, [codigo_selecionado]),
             codigo_selecionado,
             coluna_cod
         )
         
-        # Filtrar embargos do imóvel
-        gdf_embargos_ibama_imovel = gpd.GeoDataFrame()
-        gdf_embargos_icmbio_imovel = gpd.GeoDataFrame()
-        
-        if not gdf_embargos_ibama.empty:
-            # Filtrar por interseção espacial
-            gdf_embargos_ibama_imovel = gpd.sjoin(
-                gdf_embargos_ibama,
-                gdf_imovel_sel,
-                how='inner',
-                predicate='intersects'
-            )
-        
-        if not gdf_embargos_icmbio.empty:
-            gdf_embargos_icmbio_imovel = gpd.sjoin(
-                gdf_embargos_icmbio,
-                gdf_imovel_sel,
-                how='inner',
-                predicate='intersects'
-            )
-        
-        # Filtrar RL e APP do imóvel
-        gdf_rl_imovel = gpd.GeoDataFrame()
-        gdf_app_imovel = gpd.GeoDataFrame()
-        
-        if not gdf_rl.empty:
-            gdf_rl_imovel = gpd.sjoin(gdf_rl, gdf_imovel_sel, how='inner', predicate='intersects')
+        # Feições que intersectam o imóvel: o envelope do imóvel vai para o
+        # R-tree do GeoPackage (ou os grupos do GeoParquet), sem carregar a
+        # camada do estado inteiro. Nenhum atributo é usado, só a geometria.
+        def ler_vizinhanca(camada):
+            if camada not in layers:
+                return gpd.GeoDataFrame()
+            return ler_geodataframe(gpkg_path, camada, mask=gdf_imovel_sel, colunas=[])
+        
+        gdf_embargos_ibama_imovel = ler_vizinhanca('embargos_ibama')
+        gdf_embargos_icmbio_imovel = ler_vizinhanca('embargos_icmbio')
+        gdf_rl_imovel = ler_vizinhanca('reserva_legal')
+        gdf_app_imovel = ler_vizinhanca('app')
+        
+        # Índice CPF/CNPJ -> embargos (só a coluna cpf_cnpj, uma vez por versão das camadas)
+        indice_cpf = obter_indice_cpf(
+            gpkg_path,
+            [camada for camada in ('embargos_ibama', 'embargos_icmbio') if camada in layers]
+        )
         
-        if not gdf_app.empty:
-            gdf_app_imovel = gpd.sjoin(gdf_app, gdf_imovel_sel, how='inner', predicate='intersects')
+        cache = estatisticas_cache_camadas()
+        st.sidebar.caption(f"🗄️ Cache de camadas: {cache['hits']} hits / {cache['misses']} misses")
         
         # Obter CPF/CNPJ
         cpf_cnpj = None
@@ -570,15 +524,17 @@ def main():
         if cpf_cnpj:
             risco_msg, risco_score = calcular_risco_reputacional(
                 cpf_cnpj,
-                gdf_embargos_ibama,
-                gdf_embargos_icmbio
+                gdf_embargos_ibama_imovel,
+                gdf_embargos_icmbio_imovel,
+                indice=indice_cpf
             )
             st.sidebar.markdown(f"**{risco_msg}** (Score: {risco_score})")
             
             total_outros_embargos = contar_embargos_por_cpf(
                 cpf_cnpj,
-                gdf_embargos_ibama,
-                gdf_embargos_icmbio
+                gdf_embargos_ibama_imovel,
+                gdf_embargos_icmbio_imovel,
+                indice=indice_cpf
             )
             
             if total_outros_embargos > (num_embargos_ibama + num_embargos_icmbio):
@@ -590,6 +546,12 @@ def main():
         # Status CAR
         st.sidebar.markdown(f"**Status CAR:** {status_validacao}")
         
+        descontar_sobreposicoes = st.sidebar.checkbox(
+            "🧩 Descontar sobreposições nas áreas",
+            value=True,
+            help="Recorta embargos, RL e APP ao imóvel e conta cada hectare uma única vez"
+        )
+        
         # ==================== ÁREA PRINCIPAL ====================
         
         col1, col2 = st.columns([2, 1])
@@ -597,17 +559,35 @@ def main():
         with col1:
             st.markdown("### 🗺️ Mapa Interativo")
             
-            # Criar mapa
+            # Criar mapa, com o zoom em que o imóvel inteiro cabe na tela
+            largura_mapa, altura_mapa = 800, 600
+            zoom_mapa = zoom_para_extensao((min_lon, min_lat, max_lon, max_lat), largura_mapa, altura_mapa)
             mapa = folium.Map(
                 location=[lat, lon],
-                zoom_start=13,
+                zoom_start=zoom_mapa,
                 tiles='OpenStreetMap'
             )
             
+            # GeoJSON simplificado e sem colunas extras, em cache por imóvel e versão
+            # do arquivo; o detalhe é preservado até 3 níveis de zoom além do inicial
+            versao_gpkg = assinatura_arquivo(gpkg_path)
+            bytes_mapa = {'depois': 0, 'vertices_antes': 0, 'vertices_depois': 0}
+            
+            def geojson_mapa(gdf, camada):
+                geojson, estatisticas = preparar_geojson(
+                    gdf,
+                    zoom_mapa + 3,
+                    chave=(gpkg_path, versao_gpkg, camada, codigo_selecionado)
+                )
+                bytes_mapa['depois'] += estatisticas['bytes_depois']
+                bytes_mapa['vertices_antes'] += estatisticas['vertices_antes']
+                bytes_mapa['vertices_depois'] += estatisticas['vertices_depois']
+                return geojson
+            
             # Adicionar imóvel
             cor_imovel = cor_por_status(status_validacao)
             folium.GeoJson(
-                gdf_imovel_sel,
+                geojson_mapa(gdf_imovel_sel, 'area_imovel'),
                 name='Imóvel CAR',
                 style_function=lambda x: {
                     'fillColor': cor_imovel,
@@ -620,7 +600,7 @@ def main():
             # Adicionar embargos IBAMA
             if not gdf_embargos_ibama_imovel.empty:
                 folium.GeoJson(
-                    gdf_embargos_ibama_imovel,
+                    geojson_mapa(gdf_embargos_ibama_imovel, 'embargos_ibama'),
                     name='Embargos IBAMA',
                     style_function=lambda x: {
                         'fillColor': 'red',
@@ -633,7 +613,7 @@ def main():
             # Adicionar embargos ICMBio
             if not gdf_embargos_icmbio_imovel.empty:
                 folium.GeoJson(
-                    gdf_embargos_icmbio_imovel,
+                    geojson_mapa(gdf_embargos_icmbio_imovel, 'embargos_icmbio'),
                     name='Embargos ICMBio',
                     style_function=lambda x: {
                         'fillColor': 'orange',
@@ -646,7 +626,7 @@ def main():
             # Adicionar RL
             if not gdf_rl_imovel.empty:
                 folium.GeoJson(
-                    gdf_rl_imovel,
+                    geojson_mapa(gdf_rl_imovel, 'reserva_legal'),
                     name='Reserva Legal',
                     style_function=lambda x: {
                         'fillColor': 'green',
@@ -659,7 +639,7 @@ def main():
             # Adicionar APP
             if not gdf_app_imovel.empty:
                 folium.GeoJson(
-                    gdf_app_imovel,
+                    geojson_mapa(gdf_app_imovel, 'app'),
                     name='APP',
                     style_function=lambda x: {
                         'fillColor': 'blue',
@@ -684,7 +664,11 @@ def main():
             folium.LayerControl().add_to(mapa)
             
             # Exibir mapa
-            folium_static(mapa, width=800, height=600)
+            folium_static(mapa, width=largura_mapa, height=altura_mapa)
+            st.caption(
+                f"🗺️ Geometrias enviadas ao mapa: {bytes_mapa['depois'] / 1024:,.0f} KB, "
+                f"{bytes_mapa['vertices_depois']:,} de {bytes_mapa['vertices_antes']:,} vértices (zoom {zoom_mapa})"
+            )
         
         with col2:
             st.markdown("### 📊 Dashboard")
@@ -698,13 +682,13 @@ def main():
             if cpf_cnpj:
                 st.metric("🔍 Risco Reputacional", f"{risco_score}/100")
             
-            # Calcular áreas
-            areas = calcular_area_util(
+            # Calcular áreas (hectares na Albers de áreas iguais, CRS_AREA) só com as feições da vizinhança
+            # (índices e projeções em cache junto dos recortes: reexecuções não refazem nada)
+            motor = obter_motor_areas(gpkg_path, layers, mask=gdf_imovel_sel)
+            areas = motor.calcular(
                 gdf_imovel_sel,
-                pd.concat([gdf_embargos_ibama_imovel, gdf_embargos_icmbio_imovel]),
-                gdf_rl_imovel,
-                gdf_app_imovel
-            )
+                modo='uniao' if descontar_sobreposicoes else 'soma'
+            ).iloc[0].to_dict()
             
             st.markdown("### 🌾 Análise de Áreas")
             st.metric("Área Total", f"{areas['total']:.2f} ha")
@@ -722,9 +706,13 @@ def main():
         st.markdown("---")
         st.markdown("### 🛰️ Análise MapBiomas")
         
-        # Inicializar Earth Engine
+        # Earth Engine só é importado/inicializado quando o usuário ativa a seção
         ee_inicializado = False
-        if EE_DISPONIVEL:
+        usar_earth_engine = ee_disponivel() and st.checkbox(
+            "🛰️ Ativar análises de satélite (Google Earth Engine)",
+            key='usar_earth_engine'
+        )
+        if usar_earth_engine:
             with st.spinner("Inicializando Google Earth Engine..."):
                 ee_inicializado = inicializar_earth_engine()
         
@@ -739,19 +727,43 @@ def main():
             
             with col_mb2:
                 analise_transicao = st.checkbox("🔄 Análise de Transição (dois anos)")
+                if analise_transicao:
+                    ano_inicial_transicao = st.slider("📅 Ano Inicial da Série", 1985, 2022, 2008)
             
             if st.button("▶️ Executar Análise MapBiomas"):
                 with st.spinner("Processando análise..."):
                     try:
-                        # Converter geometria para Earth Engine
+                        # Geometria GeoJSON do imóvel (também é a chave do cache)
                         geom_json = json.loads(gdf_imovel_sel.to_json())
-                        roi = ee.Geometry(geom_json['features'][0]['geometry'])
+                        geometria = geom_json['features'][0]['geometry']
+                        
+                        # Série temporal: todos os anos em uma requisição em lote (e em cache)
+                        serie = None
+                        transicoes = None
+                        if analise_transicao:
+                            if ano_inicial_transicao >= ano_analise:
+                                st.warning("⚠️ O ano inicial da série deve ser anterior ao ano de análise")
+                            else:
+                                serie = obter_serie_mapbiomas(
+                                    geometria,
+                                    range(ano_inicial_transicao, ano_analise + 1)
+                                )
+                                transicoes = obter_transicoes_mapbiomas(
+                                    geometria,
+                                    ano_inicial_transicao,
+                                    ano_analise
+                                )
                         
-                        # Obter cobertura
-                        cobertura = obter_cobertura_mapbiomas(roi, ano_analise)
+                        # Obter cobertura (já em cache se a série incluiu o ano)
+                        cobertura = obter_cobertura_mapbiomas(geometria, ano_analise)
                         
                         if cobertura:
                             st.success(f"✅ Análise concluída para o ano {ano_analise}")
+                            cache_ee = obter_cache_ee().estatisticas()
+                            st.caption(
+                                f"🗄️ Cache Earth Engine: {cache_ee['hits']} hits / "
+                                f"{cache_ee['misses']} misses ({cache_ee['entradas']} resultados guardados)"
+                            )
                             
                             # Gráficos
                             col_g1, col_g2 = st.columns(2)
@@ -780,13 +792,43 @@ def main():
                             ])
                             st.dataframe(df_resultado, use_container_width=True)
                             
+                            if serie is not None and not serie.empty:
+                                st.markdown(f"#### 📈 Evolução do Uso do Solo ({ano_inicial_transicao}-{ano_analise})")
+                                st.plotly_chart(criar_grafico_serie(serie), use_container_width=True)
+                                
+                                st.dataframe(
+                                    serie.pivot_table(index='ano', columns='nome_classe', values='area_ha', fill_value=0).round(2),
+                                    use_container_width=True
+                                )
+                            
+                            if transicoes is not None and not transicoes.empty:
+                                st.markdown(f"#### 🔀 Matriz de Transição ({ano_inicial_transicao} → {ano_analise})")
+                                
+                                # Vegetação nativa (floresta, savana, mangue) convertida em pastagem
+                                conversao = transicoes[
+                                    transicoes['de'].isin([3, 4, 5]) & (transicoes['para'] == 15)
+                                ]['area_ha'].sum()
+                                st.metric("🌳➡️🐄 Vegetação nativa → Pastagem", f"{conversao:.2f} ha")
+                                
+                                fig_matriz = criar_grafico_transicao(
+                                    tabela_transicao(transicoes),
+                                    ano_inicial_transicao,
+                                    ano_analise
+                                )
+                                st.plotly_chart(fig_matriz, use_container_width=True)
+                            
                             # Exportação
                             st.markdown("#### 📥 Exportar Dados")
                             
                             # Excel
+                            # openpyxl só é carregado pelo pandas aqui, ao montar a planilha
                             buffer = BytesIO()
                             with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
                                 df_resultado.to_excel(writer, index=False, sheet_name='Cobertura')
+                                if serie is not None and not serie.empty:
+                                    serie.to_excel(writer, index=False, sheet_name='Serie')
+                                if transicoes is not None and not transicoes.empty:
+                                    transicoes.to_excel(writer, index=False, sheet_name='Transicoes')
                             
                             st.download_button(
                                 label="📊 Baixar Excel",
@@ -820,40 +862,23 @@ def main():
                 else:
                     with st.spinner("Carregando imagens de satélite..."):
                         try:
-                            # Converter geometria
+                            # Geometria GeoJSON do imóvel (também é a chave do cache)
                             geom_json = json.loads(gdf_imovel_sel.to_json())
-                            roi = ee.Geometry(geom_json['features'][0]['geometry'])
+                            geometria = geom_json['features'][0]['geometry']
                             
-                            # Obter imagens
-                            img_inicial = obter_imagem_sentinel2(roi, ano_inicial_sat)
-                            img_final = obter_imagem_sentinel2(roi, ano_final_sat)
+                            # Obter imagens (os dois anos em paralelo; anos já vistos vêm do cache local)
+                            imagens = obter_imagens_sentinel2(geometria, [ano_inicial_sat, ano_final_sat])
                             
-                            if img_inicial and img_final:
+                            if imagens:
                                 st.success(f"✅ Imagens carregadas: {ano_inicial_sat} e {ano_final_sat}")
                                 
-                                # Criar visualização
-                                vis_params = {
-                                    'min': 0,
-                                    'max': 3000,
-                                    'bands': ['B4', 'B3', 'B2']
-                                }
-                                
                                 col_img1, col_img2 = st.columns(2)
                                 
-                                with col_img1:
-                                    st.markdown(f"#### Sentinel-2 - {ano_inicial_sat}")
-                                    st.info("🛰️ Imagem disponível para visualização no Earth Engine")
-                                    st.markdown(f"**Período:** Janeiro-Dezembro {ano_inicial_sat}")
-                                
-                                with col_img2:
-                                    st.markdown(f"#### Sentinel-2 - {ano_final_sat}")
-                                    st.info("🛰️ Imagem disponível para visualização no Earth Engine")
-                                    st.markdown(f"**Período:** Janeiro-Dezembro {ano_final_sat}")
-                                
-                                st.markdown("""
-                                **💡 Dica:** As imagens Sentinel-2 foram processadas e estão prontas.
-                                Para visualização interativa completa, considere usar o Google Earth Engine Code Editor.
-                                """)
+                                for coluna, ano in ((col_img1, ano_inicial_sat), (col_img2, ano_final_sat)):
+                                    with coluna:
+                                        st.markdown(f"#### Sentinel-2 - {ano}")
+                                        st.image(imagens[ano], use_column_width=True)
+                                        st.markdown(f"**Período:** Janeiro-Dezembro {ano} (mediana, < {MAX_NUVENS_SENTINEL2}% de nuvens)")
                             else:
                                 st.warning("⚠️ Não foi possível carregar as imagens para este período")
                         
@@ -891,6 +916,8 @@ def main():
                 Ative a camada "🔥 Focos de Fogo 24h" para visualizar.
                 """)
         
+        elif ee_disponivel() and not usar_earth_engine:
+            st.caption("Ative as análises de satélite para consultar MapBiomas, Sentinel-2 e focos de incêndio.")
         else:
             st.info("ℹ️ Google Earth Engine não disponível. Configure as credenciais para usar análise MapBiomas.")
         
@@ -923,6 +950,77 @@ def main():
                         mime="application/pdf"
                     )
         
+        # ==================== EXPORTAÇÃO DA CARTEIRA ====================
+        
+        st.markdown("---")
+        st.markdown("### 📦 Exportar Carteira")
+        st.markdown("Laudos PDF e tabela de conformidade de vários imóveis em um único ZIP")
+        
+        texto_exportacao = st.text_area(
+            f"Códigos dos imóveis, um por linha ou separados por vírgula (até {MAX_IMOVEIS_EXPORTACAO}):"
+        )
+        codigos_exportacao = [
+            codigo.strip() for codigo in texto_exportacao.replace(',', '\n').splitlines() if codigo.strip()
+        ]
+        formato_resumo = st.radio("Tabela de conformidade:", ['csv', 'xlsx'], horizontal=True)
+        
+        if st.button("📦 Gerar ZIP da Carteira"):
+            if not codigos_exportacao:
+                st.warning("⚠️ Informe os códigos dos imóveis. Para a carteira inteira, use `python laudos.py`")
+            elif len(codigos_exportacao) > MAX_IMOVEIS_EXPORTACAO:
+                st.warning(
+                    f"⚠️ {len(codigos_exportacao)} códigos informados (limite no app: {MAX_IMOVEIS_EXPORTACAO}). "
+                    f"Para carteiras maiores, use `python laudos.py`"
+                )
+            else:
+                gdf_exportacao = ler_feicoes_por_atributo(gpkg_path, 'area_imovel', coluna_cod, codigos_exportacao)
+                
+                with st.spinner(f"Gerando {len(gdf_exportacao)} laudos..."):
+                    try:
+                        from compliance_lote import calcular_compliance_lote
+                        from laudos import exportar_carteira
+                        
+                        # A carteira precisa das camadas inteiras (lidas uma vez e mantidas no cache)
+                        camadas = {
+                            camada: ler_geodataframe(gpkg_path, camada) if camada in layers else gpd.GeoDataFrame()
+                            for camada in ('embargos_ibama', 'embargos_icmbio', 'reserva_legal', 'app')
+                        }
+                        
+                        resultado = calcular_compliance_lote(
+                            gdf_exportacao,
+                            camadas['embargos_ibama'],
+                            camadas['embargos_icmbio'],
+                            camadas['reserva_legal'],
+                            camadas['app'],
+                            indice_cpf=indice_cpf,
+                            coluna_cod=coluna_cod,
+                            modo_area='uniao' if descontar_sobreposicoes else 'soma'
+                        )
+                        
+                        arquivo_zip, estatisticas = exportar_carteira(
+                            resultado,
+                            coluna_cod=coluna_cod,
+                            resumo=formato_resumo
+                        )
+                        
+                        # O download_button só aceita bytes/BytesIO (não o arquivo temporário)
+                        with arquivo_zip:
+                            conteudo_zip = arquivo_zip.read()
+                        
+                        st.success(
+                            f"✅ {estatisticas['laudos']} laudos "
+                            f"({estatisticas['bytes_zip'] / 1024 / 1024:.1f} MB compactados)"
+                        )
+                        st.download_button(
+                            label="📥 Baixar ZIP",
+                            data=conteudo_zip,
+                            file_name=f"carteira_esg_{datetime.now().strftime('%Y%m%d')}.zip",
+                            mime="application/zip"
+                        )
+                    
+                    except Exception as e:
+                        st.error(f"❌ Erro ao exportar carteira: {e}")
+        
     except Exception as e:
         st.error(f"❌ Erro ao carregar dados: {e}")
         st.exception(e)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga das camadas: GeoPackage x GeoParquet
+Mede tempo e memória (RSS) de leitura das mesmas camadas em cada formato
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Executado num interpretador novo para cada medição, para que a memória de
+# uma leitura não contamine a seguinte (RSS via /proc: Linux)
+SCRIPT_CARGA = """
+import json, os, resource, sys, time
+import geopandas as gpd
+import pyarrow.dataset, pyarrow.parquet
+import proc
+
+# Bibliotecas de leitura dos dois formatos já carregadas antes da medição
+try:
+    import pyogrio
+except ImportError:
+    import fiona
+
+def rss_atual_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+
+gpkg_path, backend, camadas, colunas, bbox, repeticoes = json.loads(sys.argv[1])
+bbox = tuple(bbox) if bbox else None
+
+def ler():
+    feicoes = 0
+    for camada in camadas:
+        if backend == 'gpkg':
+            gdf = gpd.read_file(gpkg_path, layer=camada, bbox=bbox, columns=colunas)
+        else:
+            gdf = proc.ler_geoparquet(proc.caminho_geoparquet(gpkg_path, camada), colunas=colunas, bbox=bbox)
+        feicoes += len(gdf)
+    return feicoes
+
+rss_base = rss_atual_mb()
+inicio = time.perf_counter()
+feicoes = ler()
+frio = time.perf_counter() - inicio
+rss = rss_atual_mb() - rss_base
+
+quente = []
+for _ in range(repeticoes):
+    inicio = time.perf_counter()
+    ler()
+    quente.append(time.perf_counter() - inicio)
+
+print(json.dumps({
+    'frio': frio,
+    'quente': min(quente) if quente else frio,
+    'feicoes': feicoes,
+    'rss_mb': rss,
+    'rss_pico_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+}))
+"""
+
+
+def medir_carga(gpkg_path, backend, camadas, colunas=None, bbox=None, repeticoes=3):
+    """
+    Lê as camadas em um processo novo e mede tempo e memória
+
+    A primeira leitura (fria) inclui a inicialização das bibliotecas, como
+    num processo recém-aberto; as seguintes (quentes) correspondem às
+    leituras feitas pelo app já em execução.
+
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+        backend (str): 'gpkg' ou 'geoparquet'
+        camadas (list): Camadas a ler
+        colunas (list): Colunas de atributos (None = todas)
+        bbox (tuple): (xmin, ymin, xmax, ymax) para leitura parcial (None = tudo)
+        repeticoes (int): Leituras quentes após a primeira (vale a menor)
+
+    Returns:
+        dict: {'frio', 'quente' (segundos), 'feicoes',
+            'rss_mb' (acréscimo após a primeira leitura), 'rss_pico_mb' (do processo)}
+    """
+    argumentos = json.dumps([gpkg_path, backend, camadas, colunas, list(bbox) if bbox else None, repeticoes])
+    processo = subprocess.run(
+        [sys.executable, '-c', SCRIPT_CARGA, argumentos],
+        env=dict(os.environ, PYTHONPATH=RAIZ + os.pathsep + os.environ.get('PYTHONPATH', '')),
+        capture_output=True,
+        text=True
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(f"Falha na leitura ({backend}):\n{processo.stderr[-2000:]}")
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+
+def janela_central(gpkg_path, camada, fracao):
+    """Retângulo no centro da camada com `fracao` da largura e da altura da extensão"""
+    import fiona
+
+    with fiona.open(gpkg_path, layer=camada) as origem:
+        xmin, ymin, xmax, ymax = origem.bounds
+
+    centro_x, centro_y = (xmin + xmax) / 2, (ymin + ymax) / 2
+    meia_largura, meia_altura = (xmax - xmin) * fracao / 2, (ymax - ymin) * fracao / 2
+    return (centro_x - meia_largura, centro_y - meia_altura, centro_x + meia_largura, centro_y + meia_altura)
+
+
+def main(argv=None):
+    """Ponto de entrada da linha de comando"""
+    parser = argparse.ArgumentParser(description="Compara a carga das camadas em GeoPackage e GeoParquet")
+    parser.add_argument('--gpkg', default=os.path.join(RAIZ, 'car_embargos.gpkg'), help="GeoPackage de origem")
+    parser.add_argument('--camadas', nargs='+', help="Camadas a ler (padrão: todas)")
+    parser.add_argument('--repeticoes', type=int, default=3, help="Leituras quentes por cenário (vale a menor)")
+    parser.add_argument('--janela', type=float, default=0.05,
+                        help="Fração da extensão usada no cenário de leitura por retângulo")
+    parser.add_argument('--colunas', nargs='+', default=['cod_imovel'],
+                        help="Colunas do cenário de projeção, lidas da primeira camada")
+    args = parser.parse_args(argv)
+
+    import fiona
+    from proc import exportar_geoparquet, geoparquet_atualizado
+
+    camadas = args.camadas or fiona.listlayers(args.gpkg)
+    desatualizadas = [c for c in camadas if not geoparquet_atualizado(args.gpkg, c)]
+    if desatualizadas:
+        print(f"💾 Gerando cópia GeoParquet de {', '.join(desatualizadas)}...")
+        exportar_geoparquet(args.gpkg, desatualizadas)
+
+    bbox = janela_central(args.gpkg, camadas[0], args.janela)
+    cenarios = [
+        ('Camadas completas', camadas, None, None),
+        (f"Retângulo ({args.janela:.0%} da extensão de '{camadas[0]}')", camadas, None, bbox),
+        (f"Colunas {', '.join(args.colunas)} de '{camadas[0]}'", camadas[:1], args.colunas, None),
+    ]
+
+    for titulo, camadas_cenario, colunas, bbox_cenario in cenarios:
+        print(f"\n📊 {titulo}")
+        print(f"{'Formato':<12} {'Feições':>10} {'Frio (s)':>10} {'Quente (s)':>11} {'RSS +MB':>10} {'Pico (MB)':>10}")
+        medicoes = {}
+        for backend in ('gpkg', 'geoparquet'):
+            medicao = medir_carga(args.gpkg, backend, camadas_cenario, colunas, bbox_cenario, args.repeticoes)
+            medicoes[backend] = medicao
+            print(
+                f"{backend:<12} {medicao['feicoes']:>10} {medicao['frio']:>10.3f} {medicao['quente']:>11.3f} "
+                f"{medicao['rss_mb']:>10.1f} {medicao['rss_pico_mb']:>10.1f}"
+            )
+        print(
+            f"⚡ GeoParquet: {medicoes['gpkg']['frio'] / medicoes['geoparquet']['frio']:.1f}x (frio), "
+            f"{medicoes['gpkg']['quente'] / medicoes['geoparquet']['quente']:.1f}x (quente)"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except Exception as e:
+        print(f"\n❌ Erro crítico: {e}")
+        sys.exit(1)
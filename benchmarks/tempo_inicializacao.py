@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark de inicialização do app
+Mede o custo de importação (python -X importtime) e o tempo até a primeira renderização
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ORCAMENTO_IMPORTACAO_MS = 3000
+
+# Executado num interpretador novo: mede do import do Streamlit até o fim
+# da primeira execução do script, como numa sessão recém-aberta
+SCRIPT_RENDERIZACAO = """
+import sys, time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=300)
+app.run()
+print(time.perf_counter() - inicio)
+for erro in app.exception:
+    print(erro.message, file=sys.stderr)
+"""
+
+
+def medir_importacao(modulo, diretorio):
+    """
+    Importa um módulo com `-X importtime` em um processo novo
+
+    Args:
+        modulo (str): Módulo a importar (ex.: 'app')
+        diretorio (str): Diretório de trabalho do processo
+
+    Returns:
+        tuple: (acumulado_ms do módulo, lista de (import direto, acumulado_ms),
+            conjunto de todos os módulos carregados)
+    """
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+        cwd=diretorio,
+        env=ambiente,
+        capture_output=True,
+        text=True
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {modulo}:\n{processo.stderr[-2000:]}")
+
+    # O importtime lista os filhos antes do pai, com 2 espaços de recuo por nível
+    diretos = []
+    carregados = set()
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        _, acumulado, nome = linha[len('import time:'):].split('|', 2)
+        nivel = (len(nome) - len(nome.lstrip(' ')) - 1) // 2
+        acumulado_ms = int(acumulado) / 1000
+        carregados.add(nome.strip().split('.')[0])
+
+        if nivel == 1:
+            diretos.append((nome.strip(), acumulado_ms))
+        elif nivel == 0:
+            if nome.strip() == modulo:
+                return acumulado_ms, diretos, carregados
+            diretos = []
+
+    raise RuntimeError(f"Importação de {modulo} não encontrada na saída do importtime")
+
+
+def medir_renderizacao(caminho_app, diretorio):
+    """
+    Tempo até a primeira renderização completa do app (streamlit AppTest)
+
+    Args:
+        caminho_app (str): Caminho do app.py
+        diretorio (str): Diretório de trabalho (onde está o car_embargos.gpkg)
+
+    Returns:
+        float: Segundos, ou None se o Streamlit não estiver instalado
+    """
+    processo = subprocess.run(
+        [sys.executable, '-c', SCRIPT_RENDERIZACAO, caminho_app],
+        cwd=diretorio,
+        capture_output=True,
+        text=True
+    )
+    if processo.returncode != 0:
+        if 'No module named' in processo.stderr:
+            return None
+        raise RuntimeError(f"Falha ao renderizar o app:\n{processo.stderr[-2000:]}")
+    if processo.stderr.strip():
+        print(f"  ⚠️ Exceções na renderização:\n{processo.stderr.strip()[-1000:]}")
+    return float(processo.stdout.strip().splitlines()[0])
+
+
+def main(argv=None):
+    """Ponto de entrada da linha de comando"""
+    parser = argparse.ArgumentParser(description="Mede o tempo de inicialização do app")
+    parser.add_argument('--modulo', default='app', help="Módulo cuja importação é medida")
+    parser.add_argument('--diretorio', default=RAIZ,
+                        help="Diretório de trabalho (com o car_embargos.gpkg, para a renderização)")
+    parser.add_argument('--top', type=int, default=15, help="Quantas importações mais caras listar")
+    parser.add_argument('--orcamento-ms', type=float, default=ORCAMENTO_IMPORTACAO_MS,
+                        help="Orçamento de importação em ms; acima dele o script sai com código 1")
+    parser.add_argument('--sem-renderizacao', action='store_true',
+                        help="Mede apenas a importação")
+    args = parser.parse_args(argv)
+
+    print(f"⏱️ Importando '{args.modulo}' com -X importtime...")
+    try:
+        total_ms, diretos, carregados = medir_importacao(args.modulo, args.diretorio)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"\n{'Import direto':<40} {'Acumulado (ms)':>15}")
+    for nome, acumulado in sorted(diretos, key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{nome:<40} {acumulado:>15.1f}")
+    print(f"\n📦 Importação total: {total_ms:.0f} ms (orçamento: {args.orcamento_ms:.0f} ms)")
+
+    for pesado in ('plotly', 'ee', 'geemap', 'openpyxl', 'reportlab'):
+        if pesado in carregados:
+            print(f"  ⚠️ '{pesado}' é importado na inicialização")
+
+    if not args.sem_renderizacao:
+        segundos = medir_renderizacao(os.path.join(RAIZ, 'app.py'), args.diretorio)
+        if segundos is None:
+            print("ℹ️ Streamlit não instalado: tempo até a primeira renderização não medido")
+        else:
+            print(f"🖥️ Tempo até a primeira renderização: {segundos:.2f} s")
+
+    if total_ms > args.orcamento_ms:
+        print("❌ Orçamento de importação excedido")
+        return 1
+
+    print("✅ Dentro do orçamento")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
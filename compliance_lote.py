@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Compliance em lote para toda a carteira de imóveis CAR
+Calcula embargos, área útil e risco reputacional de todos os imóveis de uma vez
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import fiona
+from shapely.geometry import box
+
+from proc import (
+    ler_geodataframe,
+    obter_indice_cpf,
+    areas_ha,
+    IndiceCamada,
+    MotorAreas,
+    MODOS_AREA,
+    classificar_risco
+)
+
+GPKG_ENTRADA = "car_embargos.gpkg"
+CAMADAS_EMBARGO = ('embargos_ibama', 'embargos_icmbio')
+
+
+def agregar_intersecoes(gdf_imoveis, gdf_camada):
+    """
+    Conta e soma a área das feições que intersectam cada imóvel
+
+    Faz um único `gpd.sjoin` da carteira inteira contra a camada e agrega por
+    imóvel, reproduzindo em lote o filtro por interseção de `app.main`.
+
+    Args:
+        gdf_imoveis (gpd.GeoDataFrame): Imóveis, com índice 0..n-1
+        gdf_camada (gpd.GeoDataFrame): Camada (embargos, RL ou APP)
+
+    Returns:
+        pd.DataFrame: Colunas 'quantidade' e 'area_ha', uma linha por imóvel
+    """
+    resultado = pd.DataFrame(
+        {'quantidade': 0, 'area_ha': 0.0},
+        index=gdf_imoveis.index
+    )
+
+    if gdf_camada.empty:
+        return resultado
+
+    camada = gpd.GeoDataFrame(
+        {
+            'area_ha': areas_ha(gdf_camada),  # projetada em CRS_AREA
+            'ordem': gdf_camada.index.values
+        },
+        geometry=gdf_camada.geometry.values,
+        crs=gdf_camada.crs
+    )
+    pares = gpd.sjoin(
+        gdf_imoveis[[gdf_imoveis.geometry.name]],
+        camada,
+        how='inner',
+        predicate='intersects'
+    )
+
+    # Soma sempre na ordem original das feições: o resultado em ponto
+    # flutuante não depende de como a camada foi recortada ou particionada
+    pares = pares.sort_values('ordem', kind='stable')
+
+    agregado = pares.groupby(level=0)['area_ha'].agg(['size', 'sum'])
+    resultado.loc[agregado.index, 'quantidade'] = agregado['size'].astype('int64')
+    resultado.loc[agregado.index, 'area_ha'] = agregado['sum']
+    return resultado
+
+
+def contar_intersecoes(gdf_imoveis, indice):
+    """
+    Quantidade de feições da camada que intersectam cada imóvel, sem calcular áreas
+
+    Args:
+        gdf_imoveis (gpd.GeoDataFrame): Imóveis, com índice 0..n-1
+        indice (IndiceCamada): Índice da camada (None = camada vazia)
+
+    Returns:
+        np.ndarray: Uma quantidade por imóvel
+    """
+    if indice is None:
+        return np.zeros(len(gdf_imoveis), dtype='int64')
+    alvos, _ = indice.pares(gdf_imoveis)
+    return np.bincount(alvos, minlength=len(gdf_imoveis)).astype('int64')
+
+
+def calcular_compliance_lote(gdf_imoveis, gdf_embargos_ibama, gdf_embargos_icmbio,
+                             gdf_rl, gdf_app, indice_cpf=None, coluna_cod='cod_imovel',
+                             modo_area='soma'):
+    """
+    Calcula a conformidade de todos os imóveis da carteira
+
+    Gera, para cada imóvel, os mesmos números que o app mostra para o imóvel
+    selecionado: embargos IBAMA/ICMBio, quebra de `calcular_area_util` e
+    `calcular_risco_reputacional`.
+
+    Args:
+        gdf_imoveis (gpd.GeoDataFrame): Camada area_imovel
+        gdf_embargos_ibama (gpd.GeoDataFrame): Embargos IBAMA
+        gdf_embargos_icmbio (gpd.GeoDataFrame): Embargos ICMBio
+        gdf_rl (gpd.GeoDataFrame): Reserva Legal
+        gdf_app (gpd.GeoDataFrame): APP
+        indice_cpf (IndiceCpfCnpj): Índice de CPF/CNPJ dos embargos
+        coluna_cod (str): Coluna com o código do imóvel
+        modo_area (str): 'soma' ou 'uniao' (ver `calcular_area_util`)
+
+    Returns:
+        gpd.GeoDataFrame: Uma linha por imóvel, na ordem da entrada
+    """
+    imoveis = gdf_imoveis.reset_index(drop=True)
+
+    if modo_area == 'uniao':
+        # As áreas vêm do motor; das camadas de embargo só interessam as quantidades
+        def indice(gdf_camada):
+            return IndiceCamada(gdf_camada) if not gdf_camada.empty else None
+
+        indice_ibama = indice(gdf_embargos_ibama)
+        indice_icmbio = indice(gdf_embargos_icmbio)
+        motor = MotorAreas(
+            embargos=[indice_ibama, indice_icmbio],
+            reserva_legal=indice(gdf_rl),
+            app=indice(gdf_app)
+        )
+        areas = motor.calcular(imoveis, modo='uniao')
+        embargos_ibama = contar_intersecoes(imoveis, indice_ibama)
+        embargos_icmbio = contar_intersecoes(imoveis, indice_icmbio)
+        area_total = areas['total'].values
+        area_embargada = areas['embargada'].values
+        area_rl = areas['reserva_legal'].values
+        area_app = areas['app'].values
+    else:
+        ibama = agregar_intersecoes(imoveis, gdf_embargos_ibama)
+        icmbio = agregar_intersecoes(imoveis, gdf_embargos_icmbio)
+        embargos_ibama = ibama['quantidade'].values
+        embargos_icmbio = icmbio['quantidade'].values
+        area_total = areas_ha(imoveis)
+        area_embargada = ibama['area_ha'].values + icmbio['area_ha'].values
+        area_rl = agregar_intersecoes(imoveis, gdf_rl)['area_ha'].values
+        area_app = agregar_intersecoes(imoveis, gdf_app)['area_ha'].values
+
+    area_util = area_total - area_embargada - area_rl - area_app
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentual = np.where(area_total > 0, area_util / area_total * 100, 0.0)
+
+    colunas = [c for c in (coluna_cod, 'cpf_cnpj', 'status_validacao') if c in imoveis.columns]
+    resultado = gpd.GeoDataFrame(
+        imoveis[colunas].copy(),
+        geometry=imoveis.geometry.values,
+        crs=imoveis.crs
+    )
+    resultado['embargos_ibama'] = embargos_ibama
+    resultado['embargos_icmbio'] = embargos_icmbio
+    resultado['area_total_ha'] = area_total
+    resultado['area_embargada_ha'] = area_embargada
+    resultado['area_reserva_legal_ha'] = area_rl
+    resultado['area_app_ha'] = area_app
+    resultado['area_util_ha'] = area_util
+    resultado['percentual_util'] = percentual
+
+    return aplicar_risco_reputacional(resultado, indice_cpf)
+
+
+def aplicar_risco_reputacional(gdf_resultado, indice_cpf):
+    """
+    Preenche as colunas de risco reputacional do resultado
+
+    Args:
+        gdf_resultado (gpd.GeoDataFrame): Resultado com a coluna 'cpf_cnpj'
+        indice_cpf (IndiceCpfCnpj): Índice de CPF/CNPJ dos embargos (None = sem informação)
+
+    Returns:
+        gpd.GeoDataFrame: O mesmo resultado, com 'embargos_cpf', 'risco' e 'score_risco'
+    """
+    if indice_cpf is None or 'cpf_cnpj' not in gdf_resultado.columns:
+        gdf_resultado['embargos_cpf'] = 0
+        gdf_resultado['risco'] = "⚪ Sem Informação"
+        gdf_resultado['score_risco'] = 0
+        return gdf_resultado
+
+    # Uma consulta no índice para a carteira inteira
+    cpfs = gdf_resultado['cpf_cnpj']
+    totais = indice_cpf.contar_lote(cpfs)
+    riscos = {total: classificar_risco(total) for total in totais.unique()}
+    gdf_resultado['embargos_cpf'] = totais.values
+    gdf_resultado['risco'] = [riscos[t][0] for t in totais]
+    gdf_resultado['score_risco'] = [riscos[t][1] for t in totais]
+
+    sem_cpf = cpfs.isna().values | (cpfs.astype(str).str.strip() == '').values
+    gdf_resultado.loc[sem_cpf, 'risco'] = "⚪ Sem Informação"
+    gdf_resultado.loc[sem_cpf, 'score_risco'] = 0
+
+    return gdf_resultado
+
+
+# ==================== EXECUÇÃO PARTICIONADA ====================
+
+def particionar_imoveis(gdf_imoveis, num_particoes, coluna_particao=None):
+    """
+    Divide os imóveis em partições espaciais
+
+    Usa a coluna informada (ex.: município) ou, na falta dela, uma grade
+    regular sobre o centro do retângulo envolvente de cada imóvel.
+
+    Args:
+        gdf_imoveis (gpd.GeoDataFrame): Imóveis
+        num_particoes (int): Número aproximado de células da grade
+        coluna_particao (str): Coluna a usar como chave de partição (opcional)
+
+    Returns:
+        list: Arrays de posições (iloc), em ordem determinística
+    """
+    if coluna_particao:
+        chaves = pd.factorize(gdf_imoveis[coluna_particao], sort=True)[0]
+    else:
+        limites = gdf_imoveis.geometry.bounds.values
+        cx = (limites[:, 0] + limites[:, 2]) / 2
+        cy = (limites[:, 1] + limites[:, 3]) / 2
+        lado = max(1, math.ceil(math.sqrt(num_particoes)))
+
+        def celula(valores):
+            minimo, maximo = np.nanmin(valores), np.nanmax(valores)
+            valores = np.nan_to_num(valores, nan=minimo)  # geometrias vazias
+            passo = (maximo - minimo) / lado or 1.0
+            return np.clip(((valores - minimo) / passo).astype(int), 0, lado - 1)
+
+        chaves = celula(cy) * lado + celula(cx)
+
+    grupos = pd.Series(np.arange(len(gdf_imoveis))).groupby(chaves).indices
+    return [grupos[chave] for chave in sorted(grupos)]
+
+
+def _recortar_camada(gdf_camada, limites):
+    """Feições da camada que intersectam o retângulo `limites`"""
+    if gdf_camada.empty:
+        return gdf_camada
+    posicoes = gdf_camada.sindex.query(box(*limites), predicate='intersects')
+    return gdf_camada.iloc[np.sort(posicoes)]
+
+
+def _processar_particao(argumentos):
+    """Executa uma partição no processo trabalhador"""
+    posicoes, imoveis, ibama, icmbio, rl, app, coluna_cod, modo_area = argumentos
+    resultado = calcular_compliance_lote(imoveis, ibama, icmbio, rl, app,
+                                         coluna_cod=coluna_cod, modo_area=modo_area)
+    resultado['_posicao'] = posicoes
+    return resultado
+
+
+def calcular_compliance_paralelo(gdf_imoveis, gdf_embargos_ibama, gdf_embargos_icmbio,
+                                 gdf_rl, gdf_app, indice_cpf=None, coluna_cod='cod_imovel',
+                                 workers=1, coluna_particao=None, modo_area='soma'):
+    """
+    Versão multiprocesso de `calcular_compliance_lote`
+
+    Cada partição recebe apenas as feições das camadas que caem no seu
+    retângulo envolvente, então nenhum imóvel perde interseções na borda.
+    O resultado é reordenado pela posição original e é idêntico ao serial.
+
+    Args:
+        gdf_imoveis (gpd.GeoDataFrame): Camada area_imovel
+        gdf_embargos_ibama (gpd.GeoDataFrame): Embargos IBAMA
+        gdf_embargos_icmbio (gpd.GeoDataFrame): Embargos ICMBio
+        gdf_rl (gpd.GeoDataFrame): Reserva Legal
+        gdf_app (gpd.GeoDataFrame): APP
+        indice_cpf (IndiceCpfCnpj): Índice de CPF/CNPJ dos embargos
+        coluna_cod (str): Coluna com o código do imóvel
+        workers (int): Número de processos
+        coluna_particao (str): Coluna de partição (None = grade espacial)
+        modo_area (str): 'soma' ou 'uniao' (ver `calcular_area_util`)
+
+    Returns:
+        gpd.GeoDataFrame: Uma linha por imóvel, na ordem da entrada
+    """
+    if workers <= 1 or len(gdf_imoveis) < 2:
+        return calcular_compliance_lote(
+            gdf_imoveis, gdf_embargos_ibama, gdf_embargos_icmbio, gdf_rl, gdf_app,
+            indice_cpf=indice_cpf, coluna_cod=coluna_cod, modo_area=modo_area
+        )
+
+    imoveis = gdf_imoveis.reset_index(drop=True)
+
+    # Mais partições que processos para equilibrar a carga entre células densas e vazias
+    particoes = particionar_imoveis(imoveis, workers * 4, coluna_particao)
+
+    def tarefas():
+        for posicoes in particoes:
+            parte = imoveis.iloc[posicoes]
+            limites = parte.total_bounds
+            yield (
+                posicoes,
+                parte,
+                _recortar_camada(gdf_embargos_ibama, limites),
+                _recortar_camada(gdf_embargos_icmbio, limites),
+                _recortar_camada(gdf_rl, limites),
+                _recortar_camada(gdf_app, limites),
+                coluna_cod,
+                modo_area
+            )
+
+    # No máximo duas partições por processo montadas e em trânsito: o
+    # executor.map consumiria o gerador inteiro de uma vez
+    partes = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pendentes = deque()
+        for tarefa in tarefas():
+            pendentes.append(executor.submit(_processar_particao, tarefa))
+            if len(pendentes) >= 2 * workers:
+                partes.append(pendentes.popleft().result())
+        while pendentes:
+            partes.append(pendentes.popleft().result())
+
+    resultado = pd.concat(partes).sort_values('_posicao')
+    resultado = resultado.drop(columns='_posicao').reset_index(drop=True)
+
+    return aplicar_risco_reputacional(gpd.GeoDataFrame(resultado, crs=imoveis.crs), indice_cpf)
+
+
+def salvar_resultado(gdf_resultado, caminho_saida):
+    """
+    Salva a tabela de compliance em Parquet ou GeoPackage
+
+    Args:
+        gdf_resultado (gpd.GeoDataFrame): Resultado de `calcular_compliance_lote`
+        caminho_saida (str): Arquivo .parquet ou .gpkg
+    """
+    extensao = os.path.splitext(caminho_saida)[1].lower()
+
+    if extensao == '.parquet':
+        gdf_resultado.to_parquet(caminho_saida, index=False)
+    elif extensao == '.gpkg':
+        gdf_resultado.to_file(caminho_saida, layer='compliance', driver='GPKG')
+    else:
+        raise ValueError(f"Formato de saída não suportado: {extensao} (use .parquet ou .gpkg)")
+
+
+def carregar_camadas(gpkg_path):
+    """
+    Lê as camadas necessárias para o cálculo em lote
+
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+
+    Returns:
+        dict: {nome_camada: GeoDataFrame} (camadas ausentes ficam vazias)
+    """
+    layers = fiona.listlayers(gpkg_path)
+
+    if 'area_imovel' not in layers:
+        raise ValueError("Camada 'area_imovel' não encontrada no GeoPackage")
+
+    camadas = {}
+    for nome in ('area_imovel', 'embargos_ibama', 'embargos_icmbio', 'reserva_legal', 'app'):
+        camadas[nome] = ler_geodataframe(gpkg_path, nome) if nome in layers else gpd.GeoDataFrame()
+
+    return camadas
+
+
+def executar_lote(gpkg_path, caminho_saida, workers=1, coluna_particao=None, modo_area='soma'):
+    """
+    Executa o compliance da carteira inteira e salva o resultado
+
+    Args:
+        gpkg_path (str): GeoPackage de entrada
+        caminho_saida (str): Arquivo de saída (.parquet ou .gpkg)
+        workers (int): Número de processos
+        coluna_particao (str): Coluna de partição (None = grade espacial)
+        modo_area (str): 'soma' ou 'uniao' (ver `calcular_area_util`)
+
+    Returns:
+        gpd.GeoDataFrame: Resultado salvo
+    """
+    print(f"📂 Lendo camadas de {gpkg_path}...")
+    camadas = carregar_camadas(gpkg_path)
+    gdf_imoveis = camadas['area_imovel']
+
+    coluna_cod = 'cod_imovel' if 'cod_imovel' in gdf_imoveis.columns else gdf_imoveis.columns[0]
+    layers = fiona.listlayers(gpkg_path)
+    indice_cpf = obter_indice_cpf(gpkg_path, [c for c in CAMADAS_EMBARGO if c in layers])
+
+    print(f"⚙️ Calculando compliance de {len(gdf_imoveis)} imóveis ({workers} processo(s))...")
+    inicio = time.perf_counter()
+
+    resultado = calcular_compliance_paralelo(
+        gdf_imoveis,
+        camadas['embargos_ibama'],
+        camadas['embargos_icmbio'],
+        camadas['reserva_legal'],
+        camadas['app'],
+        indice_cpf=indice_cpf,
+        coluna_cod=coluna_cod,
+        workers=workers,
+        coluna_particao=coluna_particao,
+        modo_area=modo_area
+    )
+
+    duracao = time.perf_counter() - inicio
+    taxa = len(resultado) / duracao if duracao > 0 else float('inf')
+    print(f"  ✅ {len(resultado)} imóveis em {duracao:.2f}s ({taxa:,.0f} imóveis/s)")
+
+    salvar_resultado(resultado, caminho_saida)
+    print(f"💾 Resultado salvo em {caminho_saida}")
+
+    return resultado
+
+
+def main(argv=None):
+    """Ponto de entrada da linha de comando"""
+    parser = argparse.ArgumentParser(
+        description="Calcula compliance ESG de todos os imóveis CAR do GeoPackage"
+    )
+    parser.add_argument('--gpkg', default=GPKG_ENTRADA, help="GeoPackage de entrada")
+    parser.add_argument('--saida', default='compliance_carteira.parquet',
+                        help="Arquivo de saída (.parquet ou .gpkg)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f"Número de processos (esta máquina tem {os.cpu_count()} núcleos)")
+    parser.add_argument('--particionar-por', dest='coluna_particao', default=None,
+                        help="Coluna de partição, ex.: município (padrão: grade espacial)")
+    parser.add_argument('--modo-area', dest='modo_area', choices=MODOS_AREA, default='soma',
+                        help="'soma' (áreas brutas) ou 'uniao' (recorta ao imóvel e desconta sobreposições)")
+    args = parser.parse_args(argv)
+
+    executar_lote(args.gpkg, args.saida, workers=args.workers,
+                  coluna_particao=args.coluna_particao, modo_area=args.modo_area)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"\n❌ Erro crítico: {e}")
+        sys.exit(1)
@@ -0,0 +1,902 @@
+"""
+Consultas ao Google Earth Engine com cache persistente em disco
+Evita repetir round trips de reduceRegion para imóveis e anos já analisados
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+
+import pandas as pd
+import requests
+import shapely
+from shapely.geometry import mapping, shape
+
+
+COLECAO_MAPBIOMAS = 'projects/mapbiomas-workspace/public/collection8/mapbiomas_collection80_integration_v1'
+ESCALA_MAPBIOMAS = 30  # metros
+
+CACHE_EE_PADRAO = "cache_earth_engine.sqlite"
+TTL_CACHE_EE = 30 * 24 * 3600  # 30 dias: a coleção MapBiomas é estática entre versões
+MAX_ENTRADAS_CACHE_EE = 5000
+
+# Bandas por requisição na série temporal: 1985-2023 cabe em 2 lotes paralelos
+ANOS_POR_LOTE = 20
+MAX_LOTES_PARALELOS = 4
+
+# Lotes de imóveis por reduceRegions: o corpo da requisição ao Earth Engine
+# é limitado a ~10 MB, então o GeoJSON de cada lote fica bem abaixo disso
+IMOVEIS_POR_LOTE = 500
+BYTES_POR_LOTE = 4 * 1024 * 1024
+
+COLECAO_SENTINEL2 = 'COPERNICUS/S2_SR'
+BANDAS_RGB = ('B4', 'B3', 'B2')
+MAX_NUVENS_SENTINEL2 = 20  # % de nuvens por cena
+DIMENSAO_MINIATURA = 512  # pixels no maior lado
+DIR_MINIATURAS = "cache_sentinel2"
+MAX_MINIATURAS = 200
+
+
+# ==================== INICIALIZAÇÃO ====================
+
+# O pacote `ee` só é importado e inicializado na primeira análise de satélite:
+# quem abre o app apenas para consultar embargos não paga esse custo, e as
+# reexecuções do Streamlit reaproveitam a sessão já autenticada do processo.
+_EE = None
+_EE_INICIALIZADO = False
+_TRAVA_EE = threading.Lock()
+
+
+def ee_disponivel():
+    """
+    Indica se o pacote earthengine-api está instalado, sem importá-lo
+
+    Returns:
+        bool: True se `import ee` é possível
+    """
+    return importlib.util.find_spec('ee') is not None
+
+
+def obter_ee():
+    """
+    Retorna o módulo `ee`, importado na primeira chamada
+
+    Returns:
+        module: Cliente Earth Engine
+    """
+    global _EE
+    if _EE is None:
+        import ee
+        _EE = ee
+    return _EE
+
+
+def inicializar_ee(credenciais_json=None, arquivo_credenciais='service_account.json'):
+    """
+    Inicializa o Earth Engine uma única vez por processo
+
+    Usa, nesta ordem: as credenciais de service account informadas, o arquivo
+    local de credenciais ou a autenticação padrão do ambiente. Chamadas
+    seguintes devolvem o cliente já inicializado sem tocar a rede; em caso de
+    falha nada é memorizado e a próxima chamada tenta de novo.
+
+    Args:
+        credenciais_json (str): JSON da service account (opcional)
+        arquivo_credenciais (str): Arquivo JSON da service account
+
+    Returns:
+        module: Cliente Earth Engine inicializado
+    """
+    global _EE_INICIALIZADO
+    with _TRAVA_EE:
+        ee = obter_ee()
+        if _EE_INICIALIZADO:
+            return ee
+
+        if credenciais_json:
+            email = json.loads(credenciais_json)['client_email']
+            ee.Initialize(ee.ServiceAccountCredentials(email, key_data=credenciais_json))
+        elif os.path.exists(arquivo_credenciais):
+            with open(arquivo_credenciais, 'r') as f:
+                email = json.load(f)['client_email']
+            ee.Initialize(ee.ServiceAccountCredentials(email, arquivo_credenciais))
+        else:
+            ee.Initialize()
+
+        _EE_INICIALIZADO = True
+        return ee
+
+
+# ==================== CACHE PERSISTENTE ====================
+
+def hash_geometria(geometria):
+    """
+    Hash estável de uma geometria GeoJSON
+
+    A geometria é normalizada (ordem de anéis e vértices) e arredondada a
+    ~1 cm antes do hash, então o mesmo imóvel gera a mesma chave mesmo que
+    o GeoJSON venha com outra ordem de coordenadas.
+
+    Args:
+        geometria (dict): Geometria GeoJSON (EPSG:4326)
+
+    Returns:
+        str: Hash SHA-256 em hexadecimal
+    """
+    geom = shapely.normalize(shapely.set_precision(shape(geometria), 1e-7))
+    return hashlib.sha256(shapely.to_wkb(geom)).hexdigest()
+
+
+class CacheEarthEngine:
+    """
+    Cache de resultados do Earth Engine em SQLite
+
+    Cada entrada guarda um valor JSON com a data de criação e do último
+    acesso. Entradas mais velhas que `ttl` são descartadas na leitura e,
+    quando o total passa de `max_entradas`, as menos acessadas saem primeiro.
+    O arquivo é compartilhado entre sessões e reinícios do app.
+    """
+
+    def __init__(self, caminho=CACHE_EE_PADRAO, ttl=TTL_CACHE_EE, max_entradas=MAX_ENTRADAS_CACHE_EE):
+        """
+        Args:
+            caminho (str): Arquivo SQLite do cache
+            ttl (float): Validade das entradas em segundos
+            max_entradas (int): Número máximo de entradas guardadas
+        """
+        self.caminho = caminho
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._trava = threading.Lock()
+        self._estatisticas = {'hits': 0, 'misses': 0, 'expirados': 0, 'descartados': 0}
+
+        with closing(self._conectar()) as conexao, conexao:
+            conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS resultados (
+                    chave TEXT PRIMARY KEY,
+                    valor TEXT NOT NULL,
+                    criado REAL NOT NULL,
+                    acessado REAL NOT NULL
+                )
+                """
+            )
+            conexao.execute("CREATE INDEX IF NOT EXISTS idx_resultados_acessado ON resultados (acessado)")
+
+    def _conectar(self):
+        """Abre uma conexão nova (uma por operação, segura entre threads)"""
+        return sqlite3.connect(self.caminho, timeout=30)
+
+    def _contar(self, contador, quantidade=1):
+        with self._trava:
+            self._estatisticas[contador] += quantidade
+
+    def obter(self, chave):
+        """
+        Lê um valor do cache
+
+        Args:
+            chave (str): Chave da consulta
+
+        Returns:
+            object: Valor guardado, ou None se ausente ou expirado
+        """
+        agora = time.time()
+        with closing(self._conectar()) as conexao, conexao:
+            linha = conexao.execute(
+                "SELECT valor, criado FROM resultados WHERE chave = ?", (chave,)
+            ).fetchone()
+
+            if linha is not None and agora - linha[1] > self.ttl:
+                conexao.execute("DELETE FROM resultados WHERE chave = ?", (chave,))
+                self._contar('expirados')
+                linha = None
+
+            if linha is None:
+                self._contar('misses')
+                return None
+
+            conexao.execute("UPDATE resultados SET acessado = ? WHERE chave = ?", (agora, chave))
+
+        self._contar('hits')
+        return json.loads(linha[0])
+
+    def obter_varios(self, chaves):
+        """
+        Lê vários valores do cache com uma única conexão
+
+        Args:
+            chaves (list): Chaves das consultas
+
+        Returns:
+            dict: {chave: valor} apenas das chaves presentes e válidas
+        """
+        chaves = list(dict.fromkeys(chaves))
+        agora = time.time()
+        encontrados = {}
+
+        with closing(self._conectar()) as conexao, conexao:
+            # Consulta em blocos para respeitar o limite de parâmetros do SQLite
+            for inicio in range(0, len(chaves), 500):
+                bloco = chaves[inicio:inicio + 500]
+                marcadores = ','.join('?' * len(bloco))
+                for chave, valor, criado in conexao.execute(
+                    f"SELECT chave, valor, criado FROM resultados WHERE chave IN ({marcadores})", bloco
+                ):
+                    if agora - criado <= self.ttl:
+                        encontrados[chave] = json.loads(valor)
+
+            conexao.executemany(
+                "UPDATE resultados SET acessado = ? WHERE chave = ?",
+                [(agora, chave) for chave in encontrados]
+            )
+
+        self._contar('hits', len(encontrados))
+        self._contar('misses', len(chaves) - len(encontrados))
+        return encontrados
+
+    def guardar(self, chave, valor):
+        """
+        Grava um valor no cache, descartando entradas excedentes
+
+        Args:
+            chave (str): Chave da consulta
+            valor (object): Valor serializável em JSON
+        """
+        self.guardar_varios({chave: valor})
+
+    def guardar_varios(self, valores):
+        """
+        Grava vários valores em uma única transação, descartando entradas excedentes
+
+        Args:
+            valores (dict): {chave: valor serializável em JSON}
+        """
+        agora = time.time()
+        with closing(self._conectar()) as conexao, conexao:
+            conexao.executemany(
+                "INSERT OR REPLACE INTO resultados (chave, valor, criado, acessado) VALUES (?, ?, ?, ?)",
+                [(chave, json.dumps(valor), agora, agora) for chave, valor in valores.items()]
+            )
+            expirados = conexao.execute(
+                "DELETE FROM resultados WHERE criado < ?", (agora - self.ttl,)
+            ).rowcount
+            descartados = conexao.execute(
+                """
+                DELETE FROM resultados WHERE chave IN (
+                    SELECT chave FROM resultados ORDER BY acessado DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entradas,)
+            ).rowcount
+
+        self._contar('expirados', expirados)
+        self._contar('descartados', descartados)
+
+    def limpar(self):
+        """Remove todas as entradas do cache"""
+        with closing(self._conectar()) as conexao, conexao:
+            conexao.execute("DELETE FROM resultados")
+
+    def estatisticas(self):
+        """
+        Retorna contadores do cache
+
+        Returns:
+            dict: {'hits', 'misses', 'expirados', 'descartados', 'entradas'}
+        """
+        with closing(self._conectar()) as conexao:
+            entradas = conexao.execute("SELECT COUNT(*) FROM resultados").fetchone()[0]
+        with self._trava:
+            estatisticas = dict(self._estatisticas)
+        estatisticas['entradas'] = entradas
+        return estatisticas
+
+
+_CACHE_EE = None
+_TRAVA_CACHE_EE = threading.Lock()
+
+
+def obter_cache_ee():
+    """
+    Retorna o cache padrão do processo (criado na primeira chamada)
+
+    O caminho pode ser trocado pela variável de ambiente CACHE_EARTH_ENGINE.
+
+    Returns:
+        CacheEarthEngine: Cache compartilhado
+    """
+    global _CACHE_EE
+    with _TRAVA_CACHE_EE:
+        if _CACHE_EE is None:
+            _CACHE_EE = CacheEarthEngine(os.environ.get('CACHE_EARTH_ENGINE', CACHE_EE_PADRAO))
+        return _CACHE_EE
+
+
+# ==================== MAPBIOMAS ====================
+
+def mapbiomas_classes():
+    """
+    Retorna dicionário com classes do MapBiomas
+
+    Returns:
+        dict: Dicionário {código: nome}
+    """
+    return {
+        3: 'Formação Florestal',
+        4: 'Formação Savânica',
+        5: 'Mangue',
+        11: 'Área Úmida',
+        12: 'Campo Alagado',
+        15: 'Pastagem',
+        18: 'Agricultura',
+        21: 'Mosaico Agricultura/Pastagem',
+        24: 'Infraestrutura Urbana',
+        25: 'Outras Áreas não Vegetadas',
+        30: 'Mineração',
+        33: 'Rio/Lago/Oceano',
+        41: 'Lavoura Temporária',
+        46: 'Café',
+        47: 'Citrus',
+        48: 'Outras Lavouras Perenes'
+    }
+
+
+def _chave_mapbiomas(colecao, banda, escala, hash_geom):
+    """Chave de cache do histograma de uma banda"""
+    return f"mapbiomas|{colecao}|{banda}|{escala}|{hash_geom}"
+
+
+def _reduzir_bandas(cliente, colecao, bandas, geometria, escala):
+    """
+    Histograma de frequência de várias bandas em um único reduceRegion
+
+    Returns:
+        dict: {banda: {classe: área em hectares}}
+    """
+    imagem = cliente.Image(colecao).select(list(bandas))
+    areas = imagem.reduceRegion(
+        reducer=cliente.Reducer.frequencyHistogram(),
+        geometry=cliente.Geometry(geometria),
+        scale=escala,
+        maxPixels=1e13,
+        bestEffort=True,
+        tileScale=4
+    )
+    histogramas = areas.getInfo()
+
+    # Contagem de pixels -> hectares (30m x 30m = 900m² = 0.09ha)
+    ha_por_pixel = escala * escala / 10000
+    return {
+        banda: {int(classe): float(pixels) * ha_por_pixel for classe, pixels in (histogramas.get(banda) or {}).items()}
+        for banda in bandas
+    }
+
+
+def histogramas_mapbiomas(geometria, anos, escala=ESCALA_MAPBIOMAS, colecao=COLECAO_MAPBIOMAS,
+                          cache=None, cliente=None, anos_por_lote=ANOS_POR_LOTE):
+    """
+    Área por classe MapBiomas de vários anos, com cache em disco por ano
+
+    Os anos já em cache não são consultados; os demais são reduzidos juntos,
+    selecionando todas as bandas `classification_{ano}` na mesma requisição.
+    Séries longas são divididas em lotes de `anos_por_lote` bandas, executados
+    em paralelo.
+
+    Args:
+        geometria (dict): Geometria GeoJSON do imóvel (EPSG:4326)
+        anos (list): Anos da classificação
+        escala (int): Resolução da redução em metros
+        colecao (str): Asset da coleção MapBiomas
+        cache (CacheEarthEngine): Cache a usar (None = `obter_cache_ee()`)
+        cliente (module): Cliente Earth Engine já inicializado (None = `obter_ee()`)
+        anos_por_lote (int): Máximo de bandas por requisição
+
+    Returns:
+        dict: {ano: {classe: área em hectares}}
+    """
+    cache = cache if cache is not None else obter_cache_ee()
+    cliente = cliente if cliente is not None else obter_ee()
+    hash_geom = hash_geometria(geometria)
+
+    anos = sorted(set(int(ano) for ano in anos))
+    chaves = {ano: _chave_mapbiomas(colecao, f'classification_{ano}', escala, hash_geom) for ano in anos}
+    guardados = cache.obter_varios(chaves.values())
+
+    resultado = {}
+    pendentes = []
+    for ano, chave in chaves.items():
+        if chave in guardados:
+            resultado[ano] = {int(classe): area for classe, area in guardados[chave].items()}
+        else:
+            pendentes.append(ano)
+
+    if pendentes:
+        lotes = [
+            [f'classification_{ano}' for ano in pendentes[i:i + anos_por_lote]]
+            for i in range(0, len(pendentes), anos_por_lote)
+        ]
+
+        def reduzir(bandas):
+            return _reduzir_bandas(cliente, colecao, bandas, geometria, escala)
+
+        if len(lotes) == 1:
+            reduzidos = [reduzir(lotes[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(MAX_LOTES_PARALELOS, len(lotes))) as executor:
+                reduzidos = list(executor.map(reduzir, lotes))
+
+        novos = {}
+        for histogramas in reduzidos:
+            for banda, areas in histogramas.items():
+                novos[_chave_mapbiomas(colecao, banda, escala, hash_geom)] = {
+                    str(classe): area for classe, area in areas.items()
+                }
+                resultado[int(banda.rsplit('_', 1)[1])] = areas
+        cache.guardar_varios(novos)
+
+    return resultado
+
+
+def histograma_mapbiomas(geometria, ano, escala=ESCALA_MAPBIOMAS, colecao=COLECAO_MAPBIOMAS,
+                         cache=None, cliente=None):
+    """
+    Área por classe MapBiomas dentro de uma geometria, com cache em disco
+
+    Args:
+        geometria (dict): Geometria GeoJSON do imóvel (EPSG:4326)
+        ano (int): Ano da classificação
+        escala (int): Resolução da redução em metros
+        colecao (str): Asset da coleção MapBiomas
+        cache (CacheEarthEngine): Cache a usar (None = `obter_cache_ee()`)
+        cliente (module): Cliente Earth Engine já inicializado (None = `obter_ee()`)
+
+    Returns:
+        dict: {classe: área em hectares}
+    """
+    return histogramas_mapbiomas(
+        geometria, [ano], escala=escala, colecao=colecao, cache=cache, cliente=cliente
+    )[int(ano)]
+
+
+def serie_mapbiomas(geometria, anos, **opcoes):
+    """
+    Série temporal de uso do solo em formato tabular (ano x classe)
+
+    Args:
+        geometria (dict): Geometria GeoJSON do imóvel (EPSG:4326)
+        anos (list): Anos da série
+        **opcoes: Repassadas a `histogramas_mapbiomas` (escala, colecao, cache, cliente)
+
+    Returns:
+        pd.DataFrame: Colunas 'ano', 'classe', 'nome_classe' e 'area_ha', uma linha por ano e classe
+    """
+    histogramas = histogramas_mapbiomas(geometria, anos, **opcoes)
+    classes = mapbiomas_classes()
+
+    linhas = [
+        {'ano': ano, 'classe': classe, 'area_ha': area}
+        for ano, areas in sorted(histogramas.items())
+        for classe, area in sorted(areas.items())
+    ]
+    serie = pd.DataFrame(linhas, columns=['ano', 'classe', 'area_ha'])
+    serie.insert(2, 'nome_classe', [classes.get(c, f'Classe {c}') for c in serie['classe']])
+    return serie
+
+
+# ==================== TRANSIÇÕES ====================
+
+def _decodificar_transicoes(histograma, ha_por_pixel):
+    """
+    Converte o histograma de códigos de*100+para na tabela esparsa de transições
+
+    Returns:
+        pd.DataFrame: Colunas 'de', 'para', 'nome_de', 'nome_para' e 'area_ha'
+    """
+    classes = mapbiomas_classes()
+    linhas = []
+    for codigo, pixels in sorted(histograma.items(), key=lambda item: int(float(item[0]))):
+        de, para = divmod(int(float(codigo)), 100)
+        linhas.append({
+            'de': de,
+            'para': para,
+            'nome_de': classes.get(de, f'Classe {de}'),
+            'nome_para': classes.get(para, f'Classe {para}'),
+            'area_ha': float(pixels) * ha_por_pixel
+        })
+    return pd.DataFrame(linhas, columns=['de', 'para', 'nome_de', 'nome_para', 'area_ha'])
+
+
+def matriz_transicao_mapbiomas(geometria, ano_inicial, ano_final, escala=ESCALA_MAPBIOMAS,
+                               colecao=COLECAO_MAPBIOMAS, cache=None, cliente=None):
+    """
+    Hectares que passaram de cada classe para cada classe entre dois anos
+
+    As duas bandas são combinadas no servidor em um único código por pixel
+    (classe_inicial * 100 + classe_final) e reduzidas com um histograma de
+    frequência, em uma só requisição. O resultado é guardado no mesmo cache
+    dos histogramas anuais.
+
+    Args:
+        geometria (dict): Geometria GeoJSON do imóvel (EPSG:4326)
+        ano_inicial (int): Ano de origem
+        ano_final (int): Ano de destino
+        escala (int): Resolução da redução em metros
+        colecao (str): Asset da coleção MapBiomas
+        cache (CacheEarthEngine): Cache a usar (None = `obter_cache_ee()`)
+        cliente (module): Cliente Earth Engine já inicializado (None = `obter_ee()`)
+
+    Returns:
+        pd.DataFrame: Transições com área (uma linha por par de classes observado),
+            incluindo as permanências (de == para)
+    """
+    cache = cache if cache is not None else obter_cache_ee()
+    cliente = cliente if cliente is not None else obter_ee()
+
+    banda_de = f'classification_{ano_inicial}'
+    banda_para = f'classification_{ano_final}'
+    chave = f"transicao|{colecao}|{banda_de}|{banda_para}|{escala}|{hash_geometria(geometria)}"
+    ha_por_pixel = escala * escala / 10000
+
+    histograma = cache.obter(chave)
+    if histograma is None:
+        imagem = cliente.Image(colecao)
+        codificada = imagem.select(banda_de).multiply(100).add(imagem.select(banda_para)).rename('transicao')
+        areas = codificada.reduceRegion(
+            reducer=cliente.Reducer.frequencyHistogram(),
+            geometry=cliente.Geometry(geometria),
+            scale=escala,
+            maxPixels=1e13,
+            bestEffort=True,
+            tileScale=4
+        )
+        histograma = areas.getInfo().get('transicao') or {}
+        cache.guardar(chave, histograma)
+
+    return _decodificar_transicoes(histograma, ha_por_pixel)
+
+
+def tabela_transicao(transicoes):
+    """
+    Pivota as transições em matriz classe inicial x classe final
+
+    Args:
+        transicoes (pd.DataFrame): Resultado de `matriz_transicao_mapbiomas`
+
+    Returns:
+        pd.DataFrame: Área em hectares, linhas = classe inicial, colunas = classe final
+    """
+    return transicoes.pivot_table(
+        index='nome_de', columns='nome_para', values='area_ha', aggfunc='sum', fill_value=0.0
+    )
+
+
+def matrizes_transicao_lote(geometrias, ano_inicial, ano_final, max_paralelo=MAX_LOTES_PARALELOS, **opcoes):
+    """
+    Transições de vários imóveis, em paralelo e com cache
+
+    Args:
+        geometrias (dict): {código do imóvel: geometria GeoJSON}
+        ano_inicial (int): Ano de origem
+        ano_final (int): Ano de destino
+        max_paralelo (int): Requisições simultâneas ao Earth Engine
+        **opcoes: Repassadas a `matriz_transicao_mapbiomas` (escala, colecao, cache, cliente)
+
+    Returns:
+        pd.DataFrame: Transições de todos os imóveis, com a coluna 'cod_imovel'
+    """
+    codigos = list(geometrias)
+
+    def calcular(codigo):
+        return matriz_transicao_mapbiomas(geometrias[codigo], ano_inicial, ano_final, **opcoes)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_paralelo)) as executor:
+        resultados = list(executor.map(calcular, codigos))
+
+    partes = [
+        transicoes.assign(cod_imovel=codigo)
+        for codigo, transicoes in zip(codigos, resultados)
+    ]
+    colunas = ['cod_imovel', 'de', 'para', 'nome_de', 'nome_para', 'area_ha']
+    if not partes:
+        return pd.DataFrame(columns=colunas)
+    return pd.concat(partes, ignore_index=True)[colunas]
+
+
+# ==================== LOTE DE IMÓVEIS ====================
+
+def _lotes_por_tamanho(itens, max_itens, max_bytes):
+    """
+    Agrupa (codigo, geometria, tamanho) em lotes limitados por quantidade e bytes
+
+    Um imóvel maior que `max_bytes` sozinho vira um lote próprio.
+    """
+    lote, bytes_lote = [], 0
+    for item in itens:
+        if lote and (len(lote) >= max_itens or bytes_lote + item[2] > max_bytes):
+            yield lote
+            lote, bytes_lote = [], 0
+        lote.append(item)
+        bytes_lote += item[2]
+    if lote:
+        yield lote
+
+
+def _reduzir_lote(cliente, colecao, bandas, lote, escala):
+    """
+    Histogramas de um lote de imóveis em um único reduceRegions
+
+    Returns:
+        dict: {codigo: {banda: {classe: pixels}}}
+    """
+    # A feição leva só a posição no lote: o código pode não ser serializável (ex.: numpy)
+    colecao_imoveis = cliente.FeatureCollection([
+        cliente.Feature(cliente.Geometry(geometria), {'posicao': posicao})
+        for posicao, (_, geometria, _) in enumerate(lote)
+    ])
+    reduzida = cliente.Image(colecao).select(list(bandas)).reduceRegions(
+        collection=colecao_imoveis,
+        reducer=cliente.Reducer.frequencyHistogram(),
+        scale=escala,
+        tileScale=4
+    )
+
+    resultado = {}
+    for feicao in reduzida.getInfo()['features']:
+        propriedades = feicao['properties']
+        if len(bandas) == 1:
+            # Com uma banda só, o Earth Engine nomeia a saída pelo redutor
+            histogramas = {bandas[0]: propriedades.get(bandas[0], propriedades.get('histogram'))}
+        else:
+            histogramas = {banda: propriedades.get(banda) for banda in bandas}
+        resultado[lote[int(propriedades['posicao'])][0]] = {banda: h or {} for banda, h in histogramas.items()}
+    return resultado
+
+
+def iterar_mapbiomas_lote(geometrias, anos, escala=ESCALA_MAPBIOMAS, colecao=COLECAO_MAPBIOMAS,
+                          cache=None, cliente=None, imoveis_por_lote=IMOVEIS_POR_LOTE,
+                          bytes_por_lote=BYTES_POR_LOTE, max_paralelo=MAX_LOTES_PARALELOS):
+    """
+    Cobertura MapBiomas de muitos imóveis, entregue lote a lote
+
+    Imóveis e anos já em cache saem primeiro, sem chamada remota. Os demais
+    são enviados como FeatureCollection em lotes limitados por quantidade e
+    tamanho do GeoJSON, cada lote em um `reduceRegions` com histograma de
+    frequência por banda. Até `max_paralelo` lotes rodam ao mesmo tempo e
+    cada um é entregue assim que termina.
+
+    Args:
+        geometrias (dict): {código do imóvel: geometria GeoJSON (EPSG:4326)}
+        anos (list): Anos da classificação
+        escala (int): Resolução da redução em metros
+        colecao (str): Asset da coleção MapBiomas
+        cache (CacheEarthEngine): Cache a usar (None = `obter_cache_ee()`)
+        cliente (module): Cliente Earth Engine já inicializado (None = `obter_ee()`)
+        imoveis_por_lote (int): Máximo de imóveis por requisição
+        bytes_por_lote (int): Máximo de bytes de GeoJSON por requisição
+        max_paralelo (int): Requisições simultâneas
+
+    Yields:
+        pd.DataFrame: Colunas 'cod_imovel', 'ano', 'classe', 'nome_classe' e 'area_ha'
+    """
+    cache = cache if cache is not None else obter_cache_ee()
+    cliente = cliente if cliente is not None else obter_ee()
+    anos = sorted(set(int(ano) for ano in anos))
+    bandas = [f'classification_{ano}' for ano in anos]
+    ha_por_pixel = escala * escala / 10000
+    classes = mapbiomas_classes()
+
+    def tabela(areas_por_imovel):
+        linhas = [
+            (codigo, int(banda.rsplit('_', 1)[1]), classe, area)
+            for codigo, areas in areas_por_imovel.items()
+            for banda, histograma in areas.items()
+            for classe, area in sorted(histograma.items())
+        ]
+        df = pd.DataFrame(linhas, columns=['cod_imovel', 'ano', 'classe', 'area_ha'])
+        df.insert(3, 'nome_classe', [classes.get(c, f'Classe {c}') for c in df['classe']])
+        return df
+
+    # Separa o que já está em cache (uma leitura só para a carteira inteira)
+    hashes = {codigo: hash_geometria(geometria) for codigo, geometria in geometrias.items()}
+    guardados = cache.obter_varios(
+        _chave_mapbiomas(colecao, banda, escala, hash_geom)
+        for hash_geom in hashes.values()
+        for banda in bandas
+    )
+
+    em_cache, pendentes = {}, []
+    for codigo, geometria in geometrias.items():
+        chaves = {banda: _chave_mapbiomas(colecao, banda, escala, hashes[codigo]) for banda in bandas}
+        if all(chave in guardados for chave in chaves.values()):
+            em_cache[codigo] = {
+                banda: {int(classe): area for classe, area in guardados[chave].items()}
+                for banda, chave in chaves.items()
+            }
+        else:
+            pendentes.append((codigo, geometria))
+
+    if em_cache:
+        yield tabela(em_cache)
+
+    if not pendentes:
+        return
+
+    lotes = list(_lotes_por_tamanho(
+        ((codigo, geometria, len(json.dumps(geometria))) for codigo, geometria in pendentes),
+        imoveis_por_lote,
+        bytes_por_lote
+    ))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_paralelo, len(lotes)))) as executor:
+        futuros = [
+            executor.submit(_reduzir_lote, cliente, colecao, bandas, lote, escala)
+            for lote in lotes
+        ]
+        for futuro in as_completed(futuros):
+            areas_lote, novos = {}, {}
+            for codigo, histogramas in futuro.result().items():
+                areas = {}
+                for banda, histograma in histogramas.items():
+                    areas[banda] = {int(float(c)): float(p) * ha_por_pixel for c, p in histograma.items()}
+                    chave = _chave_mapbiomas(colecao, banda, escala, hashes[codigo])
+                    novos[chave] = {str(classe): area for classe, area in areas[banda].items()}
+                areas_lote[codigo] = areas
+            cache.guardar_varios(novos)
+            yield tabela(areas_lote)
+
+
+def mapbiomas_lote(gdf_imoveis, anos, coluna_cod='cod_imovel', **opcoes):
+    """
+    Tabela de cobertura MapBiomas por imóvel para uma carteira inteira
+
+    Args:
+        gdf_imoveis (gpd.GeoDataFrame): Imóveis (qualquer CRS)
+        anos (list): Anos da classificação
+        coluna_cod (str): Coluna com o código do imóvel
+        **opcoes: Repassadas a `iterar_mapbiomas_lote`
+
+    Returns:
+        pd.DataFrame: Colunas 'cod_imovel', 'ano', 'classe', 'nome_classe' e 'area_ha',
+            ordenadas por imóvel, ano e classe
+    """
+    imoveis = gdf_imoveis.to_crs(4326) if gdf_imoveis.crs is not None else gdf_imoveis
+    geometrias = {
+        codigo: mapping(geometria)
+        for codigo, geometria in zip(imoveis[coluna_cod], imoveis.geometry)
+        if geometria is not None and not geometria.is_empty
+    }
+
+    partes = list(iterar_mapbiomas_lote(geometrias, anos, **opcoes))
+    if not partes:
+        return pd.DataFrame(columns=['cod_imovel', 'ano', 'classe', 'nome_classe', 'area_ha'])
+    return pd.concat(partes, ignore_index=True).sort_values(
+        ['cod_imovel', 'ano', 'classe'], ignore_index=True
+    )
+
+
+# ==================== SENTINEL-2 ====================
+
+def composicao_sentinel2(geometria, ano, bandas=BANDAS_RGB, max_nuvens=MAX_NUVENS_SENTINEL2, cliente=None):
+    """
+    Mosaico mediano Sentinel-2 de um ano, recortado ao imóvel
+
+    Args:
+        geometria (dict): Geometria GeoJSON do imóvel (EPSG:4326)
+        ano (int): Ano das cenas
+        bandas (tuple): Bandas a selecionar
+        max_nuvens (float): Percentual máximo de nuvens por cena
+        cliente (module): Cliente Earth Engine já inicializado (None = `obter_ee()`)
+
+    Returns:
+        ee.Image: Composição mediana (objeto do servidor, ainda não calculado)
+    """
+    cliente = cliente if cliente is not None else obter_ee()
+    roi = cliente.Geometry(geometria)
+    colecao = cliente.ImageCollection(COLECAO_SENTINEL2) \
+        .filterBounds(roi) \
+        .filterDate(f'{ano}-01-01', f'{ano}-12-31') \
+        .filter(cliente.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', max_nuvens)) \
+        .select(list(bandas))
+    return colecao.median().clip(roi)
+
+
+def _podar_miniaturas(diretorio, max_arquivos):
+    """Remove as miniaturas menos usadas além de `max_arquivos`"""
+    arquivos = [
+        os.path.join(diretorio, nome) for nome in os.listdir(diretorio) if nome.endswith('.png')
+    ]
+    if len(arquivos) <= max_arquivos:
+        return
+    arquivos.sort(key=os.path.getmtime, reverse=True)
+    for caminho in arquivos[max_arquivos:]:
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+
+def miniatura_sentinel2(geometria, ano, bandas=BANDAS_RGB, max_nuvens=MAX_NUVENS_SENTINEL2,
+                        dimensao=DIMENSAO_MINIATURA, cache=None, cliente=None,
+                        diretorio=DIR_MINIATURAS, max_miniaturas=MAX_MINIATURAS):
+    """
+    PNG da composição Sentinel-2 de um ano, com cache local
+
+    A imagem é renderizada pelo Earth Engine (getThumbURL), baixada e gravada
+    em `diretorio`; a URL e o arquivo ficam registrados no cache pela chave
+    (geometria, ano, bandas, nuvens, dimensão). Um ano já visto é lido do
+    disco sem chamada remota. Ao passar de `max_miniaturas`, os arquivos
+    usados há mais tempo são removidos.
+
+    Args:
+        geometria (dict): Geometria GeoJSON do imóvel (EPSG:4326)
+        ano (int): Ano das cenas
+        bandas (tuple): Bandas RGB
+        max_nuvens (float): Percentual máximo de nuvens por cena
+        dimensao (int): Tamanho do maior lado em pixels
+        cache (CacheEarthEngine): Cache a usar (None = `obter_cache_ee()`)
+        cliente (module): Cliente Earth Engine já inicializado (None = `obter_ee()`)
+        diretorio (str): Pasta das miniaturas
+        max_miniaturas (int): Máximo de arquivos mantidos na pasta
+
+    Returns:
+        bytes: Conteúdo PNG
+    """
+    cache = cache if cache is not None else obter_cache_ee()
+    chave = (
+        f"sentinel2|{COLECAO_SENTINEL2}|{ano}|{','.join(bandas)}|{max_nuvens}|{dimensao}|"
+        f"{hash_geometria(geometria)}"
+    )
+    arquivo = os.path.join(diretorio, hashlib.sha256(chave.encode()).hexdigest() + '.png')
+
+    guardado = cache.obter(chave)
+    if guardado is not None and os.path.exists(arquivo):
+        os.utime(arquivo)  # marca como usada para a poda
+        with open(arquivo, 'rb') as f:
+            return f.read()
+
+    cliente = cliente if cliente is not None else obter_ee()
+    imagem = composicao_sentinel2(geometria, ano, bandas, max_nuvens, cliente)
+    url = imagem.getThumbURL({
+        'region': geometria,
+        'dimensions': dimensao,
+        'format': 'png',
+        'bands': list(bandas),
+        'min': 0,
+        'max': 3000
+    })
+
+    resposta = requests.get(url, timeout=120)
+    resposta.raise_for_status()
+
+    os.makedirs(diretorio, exist_ok=True)
+    with open(arquivo, 'wb') as f:
+        f.write(resposta.content)
+    cache.guardar(chave, {'url': url, 'arquivo': os.path.basename(arquivo)})
+    _podar_miniaturas(diretorio, max_miniaturas)
+
+    return resposta.content
+
+
+def miniaturas_sentinel2(geometria, anos, **opcoes):
+    """
+    Miniaturas Sentinel-2 de vários anos, buscadas em paralelo
+
+    Args:
+        geometria (dict): Geometria GeoJSON do imóvel (EPSG:4326)
+        anos (list): Anos das composições
+        **opcoes: Repassadas a `miniatura_sentinel2`
+
+    Returns:
+        dict: {ano: bytes PNG}
+    """
+    anos = list(dict.fromkeys(int(ano) for ano in anos))
+    with ThreadPoolExecutor(max_workers=max(1, len(anos))) as executor:
+        imagens = executor.map(lambda ano: miniatura_sentinel2(geometria, ano, **opcoes), anos)
+        return dict(zip(anos, imagens))
@@ -10,6 +10,8 @@ from shapely.geometry import Polygon, Point
 from datetime import datetime
 import random
 
+from proc import exportar_geoparquet
+
 def gerar_dados_exemplo():
     """
     Gera GeoPackage de exemplo com imóveis CAR e embargos fictícios
@@ -197,6 +199,10 @@ def gerar_dados_exemplo():
     gdf_rl.to_file(gpkg_path, layer='reserva_legal', driver='GPKG')
     gdf_app.to_file(gpkg_path, layer='app', driver='GPKG')
     
+    # Cópia colunar das camadas, lida pelo app no lugar do GeoPackage
+    print("💾 Salvando cópia GeoParquet...")
+    exportar_geoparquet(gpkg_path)
+    
     print(f"\n✅ Dados de exemplo criados com sucesso!")
     print(f"📁 Arquivo: {gpkg_path}")
     print(f"📊 Estatísticas:")
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Geração de laudos de conformidade ESG em PDF
+Um laudo por imóvel: individual (botão do app) ou em lote para a carteira inteira
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.pdfgen import canvas
+
+LARGURA, ALTURA = A4
+LAUDOS_POR_BLOCO = 50
+LINHAS_POR_BLOCO_RESUMO = 5000
+FORMATOS_RESUMO = ('csv', 'xlsx')
+# Acima disso o arquivo de exportação sai da memória e passa para o disco
+MAX_MEMORIA_EXPORTACAO = 32 * 1024 * 1024
+
+
+# ==================== DESENHO DO LAUDO ====================
+
+def _desenhar_elementos_fixos(pdf):
+    """Desenha os elementos iguais em todos os laudos (título, separador, rodapé)"""
+    pdf.setFont("Helvetica-Bold", 20)
+    pdf.drawString(2*cm, ALTURA - 2*cm, "LAUDO DE CONFORMIDADE ESG")
+    pdf.line(2*cm, ALTURA - 4*cm, LARGURA - 2*cm, ALTURA - 4*cm)
+    pdf.setFont("Helvetica", 8)
+    pdf.drawString(2*cm, 2*cm, "Sistema de Compliance ESG - Rondônia")
+    pdf.drawString(2*cm, 1.5*cm, "Desenvolvido por Ruan Almeida")
+
+
+def desenhar_laudo(pdf, dados_imovel, embargos_ibama, embargos_icmbio, areas, risco, data=None):
+    """
+    Desenha a página de um laudo em um canvas do reportlab
+
+    Args:
+        pdf (canvas.Canvas): Canvas de destino
+        dados_imovel (dict): Dados do imóvel
+        embargos_ibama (int): Número de embargos IBAMA
+        embargos_icmbio (int): Número de embargos ICMBio
+        areas (dict): Áreas calculadas
+        risco (tuple): (mensagem, score)
+        data (datetime): Data de emissão (None = agora)
+    """
+    data = data or datetime.now()
+    _desenhar_elementos_fixos(pdf)
+
+    # Cabeçalho
+    pdf.setFont("Helvetica", 12)
+    pdf.drawString(2*cm, ALTURA - 3*cm, f"Imóvel: {dados_imovel.get('cod_imovel', 'N/A')}")
+    pdf.drawString(2*cm, ALTURA - 3.7*cm, f"Data: {data.strftime('%d/%m/%Y %H:%M')}")
+
+    # Status de Embargos
+    y_pos = ALTURA - 5*cm
+    pdf.setFont("Helvetica-Bold", 14)
+    pdf.drawString(2*cm, y_pos, "STATUS DE EMBARGOS")
+
+    pdf.setFont("Helvetica", 11)
+    y_pos -= 0.8*cm
+    pdf.drawString(2*cm, y_pos, f"Embargos IBAMA: {embargos_ibama}")
+    y_pos -= 0.6*cm
+    pdf.drawString(2*cm, y_pos, f"Embargos ICMBio: {embargos_icmbio}")
+
+    # Status geral
+    y_pos -= 1*cm
+    pdf.setFont("Helvetica-Bold", 14)
+    if embargos_ibama + embargos_icmbio == 0:
+        pdf.setFillColorRGB(0, 0.5, 0)
+        pdf.drawString(2*cm, y_pos, "✓ APROVADO - Sem Embargos")
+    else:
+        pdf.setFillColorRGB(0.8, 0, 0)
+        pdf.drawString(2*cm, y_pos, "✗ REPROVADO - Com Embargos Ativos")
+
+    # Resetar cor
+    pdf.setFillColorRGB(0, 0, 0)
+
+    # Risco Reputacional
+    y_pos -= 1.5*cm
+    pdf.setFont("Helvetica-Bold", 14)
+    pdf.drawString(2*cm, y_pos, "RISCO REPUTACIONAL")
+
+    pdf.setFont("Helvetica", 11)
+    y_pos -= 0.8*cm
+    pdf.drawString(2*cm, y_pos, f"{risco[0]}")
+    y_pos -= 0.6*cm
+    pdf.drawString(2*cm, y_pos, f"Score: {risco[1]}/100")
+
+    # Áreas
+    y_pos -= 1.5*cm
+    pdf.setFont("Helvetica-Bold", 14)
+    pdf.drawString(2*cm, y_pos, "ANÁLISE DE ÁREAS")
+
+    pdf.setFont("Helvetica", 11)
+    y_pos -= 0.8*cm
+    pdf.drawString(2*cm, y_pos, f"Área Total: {areas['total']:.2f} ha")
+    y_pos -= 0.6*cm
+    pdf.drawString(2*cm, y_pos, f"Área Embargada: {areas['embargada']:.2f} ha")
+    y_pos -= 0.6*cm
+    pdf.drawString(2*cm, y_pos, f"Reserva Legal: {areas['reserva_legal']:.2f} ha")
+    y_pos -= 0.6*cm
+    pdf.drawString(2*cm, y_pos, f"APP: {areas['app']:.2f} ha")
+    y_pos -= 0.6*cm
+    pdf.setFont("Helvetica-Bold", 11)
+    pdf.drawString(2*cm, y_pos, f"Área Útil Explorável: {areas['util']:.2f} ha ({areas['percentual_util']:.1f}%)")
+
+    pdf.showPage()
+
+
+def gerar_laudo_pdf(dados_imovel, embargos_ibama, embargos_icmbio, areas, risco, data=None):
+    """
+    Gera o PDF de conformidade de um imóvel
+
+    Args:
+        dados_imovel (dict): Dados do imóvel
+        embargos_ibama (int): Número de embargos IBAMA
+        embargos_icmbio (int): Número de embargos ICMBio
+        areas (dict): Áreas calculadas
+        risco (tuple): (mensagem, score)
+        data (datetime): Data de emissão (None = agora)
+
+    Returns:
+        bytes: PDF em bytes
+    """
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    desenhar_laudo(pdf, dados_imovel, embargos_ibama, embargos_icmbio, areas, risco, data)
+    pdf.save()
+    return buffer.getvalue()
+
+
+# ==================== LOTE ====================
+
+def argumentos_laudo(linha, coluna_cod='cod_imovel'):
+    """
+    Converte uma linha do resultado de `compliance_lote` nos argumentos do laudo
+
+    Args:
+        linha (dict): Linha do resultado (colunas de `calcular_compliance_lote`)
+        coluna_cod (str): Coluna com o código do imóvel
+
+    Returns:
+        tuple: (dados_imovel, embargos_ibama, embargos_icmbio, areas, risco)
+    """
+    dados_imovel = {'cod_imovel': linha[coluna_cod], 'status': linha.get('status_validacao', 'N/A')}
+    areas = {
+        'total': linha['area_total_ha'],
+        'embargada': linha['area_embargada_ha'],
+        'reserva_legal': linha['area_reserva_legal_ha'],
+        'app': linha['area_app_ha'],
+        'util': linha['area_util_ha'],
+        'percentual_util': linha['percentual_util']
+    }
+    risco = (linha.get('risco', "⚪ Sem Informação"), linha.get('score_risco', 0))
+    return (
+        dados_imovel,
+        int(linha['embargos_ibama']),
+        int(linha['embargos_icmbio']),
+        areas,
+        risco
+    )
+
+
+def nome_arquivo_laudo(codigo, data):
+    """Nome do PDF de um imóvel (o mesmo usado pelo botão do app)"""
+    codigo_seguro = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in str(codigo))
+    return f"laudo_esg_{codigo_seguro}_{data.strftime('%Y%m%d')}.pdf"
+
+
+def _gerar_bloco(argumentos):
+    """Gera os laudos de um bloco de linhas no processo trabalhador"""
+    linhas, coluna_cod, data = argumentos
+    return [
+        (nome_arquivo_laudo(linha[coluna_cod], data), gerar_laudo_pdf(*argumentos_laudo(linha, coluna_cod), data=data))
+        for linha in linhas
+    ]
+
+
+def _blocos(resultado, colunas, coluna_cod, data, laudos_por_bloco):
+    """Divide o resultado em blocos de linhas, convertidos só quando pedidos"""
+    for inicio in range(0, len(resultado), laudos_por_bloco):
+        linhas = resultado.iloc[inicio:inicio + laudos_por_bloco][colunas].to_dict('records')
+        yield linhas, coluna_cod, data
+
+
+def _gravar_resumo(resultado, arquivo, formato):
+    """
+    Grava a tabela de conformidade em um arquivo aberto, em blocos de linhas
+
+    Args:
+        resultado (pd.DataFrame): Tabela de compliance, sem a geometria
+        arquivo (file): Arquivo binário de destino (ex.: entrada de um ZIP)
+        formato (str): 'csv' ou 'xlsx'
+    """
+    blocos = (
+        resultado.iloc[inicio:inicio + LINHAS_POR_BLOCO_RESUMO]
+        for inicio in range(0, len(resultado), LINHAS_POR_BLOCO_RESUMO)
+    )
+
+    if formato == 'csv':
+        # utf-8-sig para o Excel reconhecer a acentuação
+        texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+        texto.write(','.join(map(str, resultado.columns)) + '\n')
+        for bloco in blocos:
+            bloco.to_csv(texto, header=False, index=False)
+        texto.flush()
+        texto.detach()
+        return
+
+    # Modo somente escrita: o openpyxl descarrega as linhas em disco à medida que chegam
+    from openpyxl import Workbook
+
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet('Compliance')
+    aba.append(list(resultado.columns))
+    for bloco in blocos:
+        for linha in bloco.astype(object).where(bloco.notna(), None).itertuples(index=False):
+            aba.append(list(linha))
+    planilha.save(arquivo)
+
+
+def gerar_laudos_lote(resultado, destino, coluna_cod='cod_imovel', workers=1,
+                      laudos_por_bloco=LAUDOS_POR_BLOCO, data=None, resumo=None):
+    """
+    Gera um laudo por imóvel a partir do resultado de um compliance em lote
+
+    Os imóveis são divididos em blocos processados por `workers` processos
+    (cada bloco é uma única tarefa, para diluir o custo de enviar as linhas
+    e receber os PDFs entre processos). Os PDFs são gravados à medida que os
+    blocos terminam, na ordem da entrada, e no máximo dois blocos por
+    processo ficam pendentes: a memória usada não cresce com a carteira.
+
+    Args:
+        resultado (pd.DataFrame): Saída de `compliance_lote.calcular_compliance_lote`
+        destino (str | file): Pasta, arquivo .zip ou objeto de arquivo (gravado como ZIP)
+        coluna_cod (str): Coluna com o código do imóvel
+        workers (int): Número de processos
+        laudos_por_bloco (int): Laudos por tarefa enviada a um processo
+        data (datetime): Data de emissão comum a todos os laudos (None = agora)
+        resumo (str): Inclui a tabela de conformidade ('csv' ou 'xlsx'); None = só os laudos
+
+    Returns:
+        dict: {'laudos', 'paginas', 'bytes', 'segundos', 'paginas_por_segundo'}
+    """
+    if resumo is not None and resumo not in FORMATOS_RESUMO:
+        raise ValueError(f"Formato de resumo inválido: {resumo} (use {' ou '.join(FORMATOS_RESUMO)})")
+
+    data = data or datetime.now()
+    colunas = [c for c in resultado.columns if c != 'geometry']
+    blocos = _blocos(resultado, colunas, coluna_cod, data, laudos_por_bloco)
+
+    em_pasta = isinstance(destino, str) and not destino.lower().endswith('.zip')
+    if em_pasta:
+        os.makedirs(destino, exist_ok=True)
+        arquivo_zip = None
+    else:
+        arquivo_zip = zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    inicio = time.perf_counter()
+    total_laudos, total_bytes = 0, 0
+
+    def gravar(laudos):
+        nonlocal total_laudos, total_bytes
+        for nome, conteudo in laudos:
+            if arquivo_zip is not None:
+                arquivo_zip.writestr(nome, conteudo)
+            else:
+                with open(os.path.join(destino, nome), 'wb') as f:
+                    f.write(conteudo)
+            total_laudos += 1
+            total_bytes += len(conteudo)
+
+    try:
+        if resumo is not None:
+            nome_resumo = f"compliance_{data.strftime('%Y%m%d')}.{resumo}"
+            if arquivo_zip is not None:
+                with arquivo_zip.open(nome_resumo, 'w') as f:
+                    _gravar_resumo(resultado[colunas], f, resumo)
+            else:
+                with open(os.path.join(destino, nome_resumo), 'wb') as f:
+                    _gravar_resumo(resultado[colunas], f, resumo)
+
+        if workers <= 1:
+            for bloco in blocos:
+                gravar(_gerar_bloco(bloco))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pendentes = deque()
+                for bloco in blocos:
+                    pendentes.append(executor.submit(_gerar_bloco, bloco))
+                    if len(pendentes) >= 2 * workers:
+                        gravar(pendentes.popleft().result())
+                while pendentes:
+                    gravar(pendentes.popleft().result())
+    finally:
+        if arquivo_zip is not None:
+            arquivo_zip.close()
+
+    segundos = time.perf_counter() - inicio
+    # Cada laudo ocupa uma página
+    return {
+        'laudos': total_laudos,
+        'paginas': total_laudos,
+        'bytes': total_bytes,
+        'segundos': segundos,
+        'paginas_por_segundo': total_laudos / segundos if segundos > 0 else float('inf')
+    }
+
+
+def exportar_carteira(resultado, coluna_cod='cod_imovel', resumo='csv', workers=1,
+                      max_memoria=MAX_MEMORIA_EXPORTACAO, data=None):
+    """
+    Exporta laudos e tabela de conformidade em um ZIP, sem montá-lo em memória
+
+    O ZIP é escrito aos poucos em um arquivo temporário que fica em memória
+    até `max_memoria` bytes e depois passa para o disco, então o consumo por
+    exportação é limitado qualquer que seja o número de imóveis.
+
+    Args:
+        resultado (pd.DataFrame): Saída de `compliance_lote.calcular_compliance_lote`
+        coluna_cod (str): Coluna com o código do imóvel
+        resumo (str): Formato da tabela de conformidade ('csv' ou 'xlsx')
+        workers (int): Número de processos para os laudos
+        max_memoria (int): Bytes mantidos em memória antes de usar o disco
+        data (datetime): Data de emissão (None = agora)
+
+    Returns:
+        tuple: (arquivo temporário posicionado no início, estatísticas de `gerar_laudos_lote`)
+    """
+    arquivo = tempfile.SpooledTemporaryFile(max_size=max_memoria, suffix='.zip')
+    try:
+        estatisticas = gerar_laudos_lote(
+            resultado,
+            arquivo,
+            coluna_cod=coluna_cod,
+            workers=workers,
+            data=data,
+            resumo=resumo
+        )
+    except Exception:
+        arquivo.close()
+        raise
+
+    estatisticas['bytes_zip'] = arquivo.tell()
+    arquivo.seek(0)
+    return arquivo, estatisticas
+
+
+def carregar_resultado(caminho):
+    """
+    Lê a saída de `compliance_lote.py` (.parquet ou .gpkg)
+
+    Args:
+        caminho (str): Arquivo de resultado
+
+    Returns:
+        pd.DataFrame: Tabela de compliance, sem a geometria
+    """
+    extensao = os.path.splitext(caminho)[1].lower()
+
+    if extensao == '.parquet':
+        resultado = pd.read_parquet(caminho)
+    elif extensao == '.gpkg':
+        import geopandas as gpd
+        resultado = gpd.read_file(caminho, layer='compliance', ignore_geometry=True)
+    else:
+        raise ValueError(f"Formato de entrada não suportado: {extensao} (use .parquet ou .gpkg)")
+
+    return resultado.drop(columns=['geometry'], errors='ignore')
+
+
+def main(argv=None):
+    """Ponto de entrada da linha de comando"""
+    parser = argparse.ArgumentParser(
+        description="Gera um laudo PDF por imóvel a partir do resultado do compliance em lote"
+    )
+    parser.add_argument('--entrada', default='compliance_carteira.parquet',
+                        help="Resultado de compliance_lote.py (.parquet ou .gpkg)")
+    parser.add_argument('--saida', default='laudos.zip', help="Arquivo .zip ou pasta de destino")
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f"Número de processos (esta máquina tem {os.cpu_count()} núcleos)")
+    parser.add_argument('--resumo', choices=FORMATOS_RESUMO,
+                        help="Inclui a tabela de conformidade na saída, em CSV ou XLSX")
+    args = parser.parse_args(argv)
+
+    print(f"📂 Lendo {args.entrada}...")
+    resultado = carregar_resultado(args.entrada)
+    coluna_cod = 'cod_imovel' if 'cod_imovel' in resultado.columns else resultado.columns[0]
+
+    print(f"📄 Gerando {len(resultado)} laudos ({args.workers} processo(s))...")
+    estatisticas = gerar_laudos_lote(
+        resultado,
+        args.saida,
+        coluna_cod=coluna_cod,
+        workers=args.workers,
+        resumo=args.resumo
+    )
+
+    print(
+        f"  ✅ {estatisticas['laudos']} laudos ({estatisticas['bytes'] / 1024 / 1024:.1f} MB) "
+        f"em {estatisticas['segundos']:.2f}s ({estatisticas['paginas_por_segundo']:,.0f} páginas/s)"
+    )
+    print(f"💾 Laudos salvos em {args.saida}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"\n❌ Erro crítico: {e}")
+        sys.exit(1)
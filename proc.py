@@ -3,24 +3,1044 @@ Funções auxiliares para processamento de dados CAR e embargos
 Sistema de Compliance ESG - Rondônia
 """
 
+import importlib.util
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
 import geopandas as gpd
 import fiona
-from shapely import wkb
+import shapely
+from shapely import STRtree
 import folium
 
 
-def ler_geodataframe(gpkg_path, layer_name):
+# ==================== CACHE DE CAMADAS ====================
+
+# Cache compartilhado pelo processo inteiro: o Streamlit reexecuta app.py a
+# cada interação, mas este módulo é importado uma única vez, então todas as
+# sessões enxergam as mesmas camadas já lidas.
+_CACHE_CAMADAS = {}
+_TRAVAS_CAMADAS = {}
+_TRAVA_CACHE = threading.Lock()
+_ESTATISTICAS_CACHE = {'hits': 0, 'misses': 0, 'invalidacoes': 0}
+
+# Recortes recentes (vizinhança e linha do imóvel selecionado), em LRU,
+# cada um com seus artefatos derivados (ex.: índice espacial)
+_CACHE_RECORTES = OrderedDict()
+MAX_CACHE_RECORTES = 64
+
+# Esquema (colunas e CRS, sem linhas) de cada camada, por versão do arquivo
+_CACHE_ESQUEMAS = {}
+
+# Leitura por retângulo com o FID das feições (ver `_ler_camada`)
+_PYOGRIO_DISPONIVEL = importlib.util.find_spec('pyogrio') is not None
+
+
+def assinatura_arquivo(caminho):
+    """
+    Retorna a assinatura (mtime, tamanho) de um arquivo
+    
+    Args:
+        caminho (str): Caminho do arquivo
+        
+    Returns:
+        tuple: (mtime em nanossegundos, tamanho em bytes)
+    """
+    info = os.stat(caminho)
+    return (info.st_mtime_ns, info.st_size)
+
+
+def _trava_camada(chave):
+    """Retorna a trava exclusiva de uma camada, criando-a se necessário"""
+    with _TRAVA_CACHE:
+        return _TRAVAS_CAMADAS.setdefault(chave, threading.Lock())
+
+
+def _chave_camada(gpkg_path, layer_name, colunas=None, geometria=True):
+    """Chave do cache: a camada inteira ou uma projeção de colunas dela"""
+    chave = (os.path.abspath(gpkg_path), layer_name)
+    if colunas is None and geometria:
+        return chave
+    return chave + (None if colunas is None else tuple(colunas), geometria)
+
+
+def _projetar_colunas(gdf, colunas, geometria=True):
+    """Mantém apenas `colunas` (as que existirem) e, se pedida, a geometria"""
+    if colunas is None and geometria:
+        return gdf
+    
+    nome_geometria = gdf.geometry.name if isinstance(gdf, gpd.GeoDataFrame) else None
+    atributos = [c for c in (gdf.columns if colunas is None else colunas) if c in gdf.columns and c != nome_geometria]
+    if not geometria:
+        return pd.DataFrame(gdf[atributos])
+    return gdf[atributos + [nome_geometria]]
+
+
+def _obter_recorte(chave):
+    """Entrada {'gdf', 'derivados'} de um recorte já lido (ou None), marcada como recente"""
+    with _TRAVA_CACHE:
+        if chave in _CACHE_RECORTES:
+            _CACHE_RECORTES.move_to_end(chave)
+            _ESTATISTICAS_CACHE['hits'] += 1
+            return _CACHE_RECORTES[chave]
+    return None
+
+
+def _guardar_recorte(chave, gdf):
+    """Guarda um recorte no LRU, descartando os mais antigos, e devolve sua entrada"""
+    entrada = {'gdf': gdf, 'derivados': {}}
+    with _TRAVA_CACHE:
+        _ESTATISTICAS_CACHE['misses'] += 1
+        _CACHE_RECORTES[chave] = entrada
+        while len(_CACHE_RECORTES) > MAX_CACHE_RECORTES:
+            _CACHE_RECORTES.popitem(last=False)
+    return entrada
+
+
+def ler_geodataframe(gpkg_path, layer_name, usar_cache=True, bbox=None, mask=None, colunas=None,
+                     geometria=True):
     """
     Lê camada de GeoPackage
     
+    A leitura é memorizada por (caminho, camada, mtime, tamanho): enquanto o
+    arquivo não mudar, chamadas seguintes devolvem o mesmo GeoDataFrame sem
+    tocar o disco. O objeto devolvido é compartilhado e não deve ser alterado
+    in-place. Se a camada tiver uma cópia GeoParquet atualizada (ver
+    `atualizar_geoparquet`), ela é lida no lugar do GeoPackage.
+    
+    Com `colunas` (e/ou `geometria=False`), só esses atributos são lidos, e
+    a projeção é memorizada como uma camada à parte. Com `bbox` ou `mask`, só
+    as feições que intersectam o recorte são devolvidas: o envelope vai para
+    o R-tree do GeoPackage (ou para as estatísticas dos grupos do GeoParquet)
+    e o teste exato é feito em seguida. Se a camada inteira já estiver em
+    memória, projeções e recortes saem dela, sem ler o disco.
+    
     Args:
         gpkg_path (str): Caminho para o arquivo .gpkg
         layer_name (str): Nome da camada a ser lida
+        usar_cache (bool): Se False, sempre lê do disco
+        bbox (tuple): (xmin, ymin, xmax, ymax) no CRS da camada
+        mask (shapely.Geometry | gpd.GeoDataFrame | gpd.GeoSeries): Geometria de
+            recorte; GeoDataFrame/GeoSeries com CRS são reprojetados para o da camada
+        colunas (list): Atributos a ler (None = todos; [] = só a geometria)
+        geometria (bool): Se False, não lê a geometria (sem bbox/mask)
+        
+    Returns:
+        gpd.GeoDataFrame: GeoDataFrame com a camada lida (pd.DataFrame se geometria=False)
+    """
+    if bbox is not None or mask is not None:
+        return _ler_recorte(gpkg_path, layer_name, bbox, mask, colunas, usar_cache)['gdf']
+    
+    if not usar_cache:
+        return _ler_camada(gpkg_path, layer_name, colunas=colunas, geometria=geometria)
+    
+    chave = _chave_camada(gpkg_path, layer_name, colunas, geometria)
+    
+    # Uma trava por camada evita que várias sessões leiam o mesmo arquivo
+    # em paralelo quando o cache está frio
+    with _trava_camada(chave):
+        versao = assinatura_arquivo(gpkg_path)
+        entrada = _CACHE_CAMADAS.get(chave)
+        
+        if entrada is not None and entrada['versao'] == versao:
+            with _TRAVA_CACHE:
+                _ESTATISTICAS_CACHE['hits'] += 1
+            return entrada['gdf']
+        
+        completa = _CACHE_CAMADAS.get(_chave_camada(gpkg_path, layer_name)) if len(chave) > 2 else None
+        if completa is not None and completa['versao'] == versao:
+            gdf = _projetar_colunas(completa['gdf'], colunas, geometria)
+        else:
+            gdf = _ler_camada(gpkg_path, layer_name, colunas=colunas, geometria=geometria)
+        
+        with _TRAVA_CACHE:
+            _ESTATISTICAS_CACHE['misses'] += 1
+            _CACHE_CAMADAS[chave] = {'versao': versao, 'gdf': gdf, 'derivados': {}}
+        return gdf
+
+
+def _geometria_recorte(gpkg_path, layer_name, bbox, mask):
+    """Converte bbox/mask em uma única geometria shapely no CRS da camada"""
+    recorte = shapely.box(*bbox) if bbox is not None else None
+    
+    if mask is not None:
+        if isinstance(mask, (gpd.GeoDataFrame, gpd.GeoSeries)):
+            crs = crs_camada(gpkg_path, layer_name)
+            if mask.crs is not None and crs is not None and mask.crs != crs:
+                mask = mask.to_crs(crs)
+            mask = shapely.union_all(np.asarray(mask.geometry.values))
+        recorte = mask if recorte is None else shapely.intersection(recorte, mask)
+    
+    return recorte
+
+
+def _ler_recorte(gpkg_path, layer_name, bbox, mask, colunas, usar_cache):
+    """
+    Feições da camada que intersectam bbox/mask (ver `ler_geodataframe`)
+    
+    Returns:
+        dict: Entrada {'gdf', 'derivados'} do recorte (a mesma do cache, se usado)
+    """
+    recorte = _geometria_recorte(gpkg_path, layer_name, bbox, mask)
+    if shapely.is_empty(recorte):
+        vazio = _projetar_colunas(_esquema_camada(gpkg_path, layer_name), colunas).copy()
+        return {'gdf': vazio, 'derivados': {}}
+    
+    versao = assinatura_arquivo(gpkg_path)
+    chave = _chave_camada(gpkg_path, layer_name) + (
+        versao, None if colunas is None else tuple(colunas), shapely.to_wkb(recorte)
+    )
+    
+    if usar_cache:
+        entrada = _obter_recorte(chave)
+        if entrada is not None:
+            return entrada
+    
+    completa = _CACHE_CAMADAS.get(_chave_camada(gpkg_path, layer_name)) if usar_cache else None
+    if completa is not None and completa['versao'] == versao:
+        gdf = completa['gdf']
+        posicoes = np.sort(gdf.sindex.query(recorte, predicate='intersects'))
+        gdf = _projetar_colunas(gdf.iloc[posicoes], colunas).reset_index(drop=True)
+    else:
+        gdf = _ler_camada(gpkg_path, layer_name, colunas=colunas, bbox=tuple(shapely.bounds(recorte)))
+        # O filtro do disco é pelo envelope; o teste exato fica por conta do shapely
+        shapely.prepare(recorte)
+        gdf = gdf[shapely.intersects(recorte, np.asarray(gdf.geometry.values))].reset_index(drop=True)
+    
+    if usar_cache:
+        return _guardar_recorte(chave, gdf)
+    return {'gdf': gdf, 'derivados': {}}
+
+
+def obter_derivado_recorte(gpkg_path, layer_name, nome, construtor, bbox=None, mask=None, colunas=None):
+    """
+    Retorna um artefato derivado de um recorte da camada (ver `ler_geodataframe`)
+    
+    O artefato fica junto do recorte no cache: é construído uma vez por
+    recorte e versão do arquivo e sai do LRU com ele.
+    
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+        layer_name (str): Nome da camada
+        nome (str): Identificador do artefato
+        construtor (callable): Função que recebe o GeoDataFrame recortado e constrói o artefato
+        bbox (tuple): (xmin, ymin, xmax, ymax) no CRS da camada
+        mask (shapely.Geometry | gpd.GeoDataFrame | gpd.GeoSeries): Geometria de recorte
+        colunas (list): Atributos lidos no recorte
+        
+    Returns:
+        object: Artefato construído por `construtor`
+    """
+    entrada = _ler_recorte(gpkg_path, layer_name, bbox, mask, colunas, usar_cache=True)
+    derivados = entrada['derivados']
+    if nome not in derivados:
+        artefato = construtor(entrada['gdf'])
+        with _TRAVA_CACHE:
+            derivados.setdefault(nome, artefato)
+    return derivados[nome]
+
+
+def ler_feicoes_por_atributo(gpkg_path, layer_name, coluna, valores, usar_cache=True):
+    """
+    Feições cujo atributo `coluna` está em `valores`, sem ler o resto da camada
+    
+    O filtro vai para o GeoPackage como cláusula WHERE (com pyogrio) ou para
+    o GeoParquet como filtro do Arrow; se a camada inteira já estiver em
+    memória, a seleção sai dela.
+    
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+        layer_name (str): Nome da camada
+        coluna (str): Atributo filtrado (ex.: 'cod_imovel')
+        valores (list): Valores aceitos
+        usar_cache (bool): Se False, sempre lê do disco
+        
+    Returns:
+        gpd.GeoDataFrame: Feições encontradas, na ordem da camada
+    """
+    valores = list(valores)
+    versao = assinatura_arquivo(gpkg_path)
+    chave = _chave_camada(gpkg_path, layer_name) + (versao, 'atributo', coluna, tuple(valores))
+    
+    if usar_cache:
+        entrada = _obter_recorte(chave)
+        if entrada is not None:
+            return entrada['gdf']
+    
+    completa = _CACHE_CAMADAS.get(_chave_camada(gpkg_path, layer_name)) if usar_cache else None
+    if completa is not None and completa['versao'] == versao:
+        gdf = completa['gdf']
+        gdf = gdf[gdf[coluna].isin(valores)].reset_index(drop=True)
+    else:
+        gdf = _ler_camada(gpkg_path, layer_name, atributos={coluna: valores})
+    
+    if usar_cache:
+        _guardar_recorte(chave, gdf)
+    return gdf
+
+
+def _esquema_camada(gpkg_path, layer_name):
+    """Camada sem linhas (colunas, tipos e CRS), lida uma vez por versão do arquivo"""
+    chave = _chave_camada(gpkg_path, layer_name)
+    versao = assinatura_arquivo(gpkg_path)
+    
+    entrada = _CACHE_ESQUEMAS.get(chave)
+    if entrada is not None and entrada['versao'] == versao:
+        return entrada['gdf']
+    
+    completa = _CACHE_CAMADAS.get(chave)
+    if completa is not None and completa['versao'] == versao:
+        esquema = completa['gdf'].iloc[0:0]
+    else:
+        esquema = gpd.read_file(gpkg_path, layer=layer_name, rows=1).iloc[0:0]
+    
+    with _TRAVA_CACHE:
+        _CACHE_ESQUEMAS[chave] = {'versao': versao, 'gdf': esquema}
+    return esquema
+
+
+def crs_camada(gpkg_path, layer_name):
+    """
+    CRS de uma camada, sem ler as feições (memorizado por versão do arquivo)
+    
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+        layer_name (str): Nome da camada
+        
+    Returns:
+        pyproj.CRS: CRS da camada (None se não definido)
+    """
+    return _esquema_camada(gpkg_path, layer_name).crs
+
+
+def obter_derivado_camada(gpkg_path, layer_name, nome, construtor, colunas=None, geometria=True):
+    """
+    Retorna um artefato derivado de uma camada (índice, projeção, etc.)
+    
+    O artefato é construído uma única vez por versão da camada e descartado
+    junto com ela quando o arquivo muda ou o cache é invalidado.
+    
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+        layer_name (str): Nome da camada
+        nome (str): Identificador do artefato
+        construtor (callable): Função que recebe o GeoDataFrame e constrói o artefato
+        colunas (list): Constrói a partir de uma projeção de colunas (ver `ler_geodataframe`)
+        geometria (bool): Se False, a projeção não inclui a geometria
+        
+    Returns:
+        object: Artefato construído por `construtor`
+    """
+    gdf = ler_geodataframe(gpkg_path, layer_name, colunas=colunas, geometria=geometria)
+    chave = _chave_camada(gpkg_path, layer_name, colunas, geometria)
+    
+    with _trava_camada(chave):
+        entrada = _CACHE_CAMADAS.get(chave)
+        if entrada is None or entrada['gdf'] is not gdf:
+            # Camada recarregada entre as duas chamadas: constrói sem guardar
+            return construtor(gdf)
+        
+        if nome not in entrada['derivados']:
+            entrada['derivados'][nome] = construtor(gdf)
+        return entrada['derivados'][nome]
+
+
+def registrar_escrita_camada(gpkg_path, layer_name):
+    """
+    Informa ao cache que apenas uma camada do arquivo foi reescrita
+    
+    A assinatura (mtime, tamanho) é do arquivo inteiro, então qualquer escrita
+    invalidaria todas as camadas do GeoPackage. Quem escreve sabe qual camada
+    mudou: ela (com suas projeções e recortes) é descartada e as demais são
+    revalidadas com a nova assinatura, preservando seus artefatos derivados
+    (índices espaciais, índice de CPF/CNPJ).
+    
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+        layer_name (str): Camada que acabou de ser escrita
+    """
+    caminho = os.path.abspath(gpkg_path)
+    versao = assinatura_arquivo(gpkg_path)
+    
+    with _TRAVA_CACHE:
+        for chave in list(_CACHE_CAMADAS):
+            if chave[0] != caminho:
+                continue
+            if chave[1] == layer_name:
+                del _CACHE_CAMADAS[chave]
+                _ESTATISTICAS_CACHE['invalidacoes'] += 1
+            else:
+                _CACHE_CAMADAS[chave]['versao'] = versao
+        for chave in list(_CACHE_ESQUEMAS):
+            if chave[0] == caminho:
+                if chave[1] == layer_name:
+                    del _CACHE_ESQUEMAS[chave]
+                else:
+                    _CACHE_ESQUEMAS[chave]['versao'] = versao
+        # Recortes das outras camadas saem do LRU sozinhos (a chave inclui a versão)
+        for chave in [chave for chave in _CACHE_RECORTES if chave[:2] == (caminho, layer_name)]:
+            del _CACHE_RECORTES[chave]
+
+
+def estatisticas_cache_camadas():
+    """
+    Retorna contadores do cache de camadas
+    
+    Returns:
+        dict: {'hits', 'misses', 'invalidacoes', 'camadas'}
+    """
+    with _TRAVA_CACHE:
+        estatisticas = dict(_ESTATISTICAS_CACHE)
+        estatisticas['camadas'] = len(_CACHE_CAMADAS)
+    return estatisticas
+
+
+# ==================== GEOPARQUET ====================
+
+# Cópia colunar opcional das camadas, em <arquivo>_geoparquet/<camada>.parquet.
+# As linhas são ordenadas pela curva de Hilbert e gravadas em grupos com o
+# envelope de cada feição em colunas próprias: as estatísticas de cada grupo
+# permitem descartar grupos inteiros fora de um retângulo sem decodificá-los.
+LINHAS_POR_GRUPO_PARQUET = 2000
+COLUNAS_ENVELOPE = ('_xmin', '_ymin', '_xmax', '_ymax')
+COLUNA_ORDEM = '_ordem'
+CHAVE_ALTERACAO = b'gpkg_last_change'
+
+
+def caminho_geoparquet(gpkg_path, layer_name):
+    """
+    Caminho da cópia GeoParquet de uma camada do GeoPackage
+    
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+        layer_name (str): Nome da camada
+        
+    Returns:
+        str: Caminho do arquivo .parquet (pode não existir)
+    """
+    return os.path.join(os.path.splitext(gpkg_path)[0] + '_geoparquet', f'{layer_name}.parquet')
+
+
+def _ultima_alteracao_camada(gpkg_path, layer_name):
+    """Retorna o `last_change` da camada em gpkg_contents (None se ausente)"""
+    import sqlite3
+    from contextlib import closing
+    
+    with closing(sqlite3.connect(f'file:{gpkg_path}?mode=ro', uri=True)) as conexao:
+        linha = conexao.execute(
+            "SELECT last_change FROM gpkg_contents WHERE lower(table_name) = lower(?)",
+            (layer_name,)
+        ).fetchone()
+    return linha[0] if linha else None
+
+
+def escrever_geoparquet(gdf, caminho, alteracao=None, linhas_por_grupo=LINHAS_POR_GRUPO_PARQUET):
+    """
+    Grava um GeoDataFrame como GeoParquet ordenado espacialmente
+    
+    O arquivo segue a especificação GeoParquet 1.0 (geometria em WKB) e pode
+    ser lido por `gpd.read_parquet`; as colunas auxiliares de envelope e de
+    ordem original são removidas por `ler_geoparquet`. A escrita é atômica.
+    
+    Args:
+        gdf (gpd.GeoDataFrame): Camada a gravar
+        caminho (str): Arquivo .parquet de destino
+        alteracao (str): `last_change` da camada no GeoPackage de origem
+        linhas_por_grupo (int): Linhas por grupo de linhas do Parquet
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    geometria = gdf.geometry
+    limites = geometria.bounds
+    
+    # Ordenação pela curva de Hilbert dos centros dos envelopes (geometrias
+    # vazias ou ausentes vão para o início e nunca passam no filtro de envelope)
+    centros_x = ((limites['minx'] + limites['maxx']) / 2).to_numpy()
+    centros_y = ((limites['miny'] + limites['maxy']) / 2).to_numpy()
+    validos = ~np.isnan(centros_x)
+    ordem = np.arange(len(gdf))
+    if validos.any():
+        distancias = np.zeros(len(gdf), dtype=np.int64)
+        pontos = gpd.GeoSeries(gpd.points_from_xy(centros_x[validos], centros_y[validos]))
+        distancias[validos] = pontos.hilbert_distance(total_bounds=geometria.total_bounds) + 1
+        ordem = np.argsort(distancias, kind='stable')
+    
+    atributos = pd.DataFrame(gdf.drop(columns=geometria.name)).iloc[ordem].reset_index(drop=True)
+    atributos[COLUNA_ORDEM] = ordem
+    for coluna, origem in zip(COLUNAS_ENVELOPE, ('minx', 'miny', 'maxx', 'maxy')):
+        atributos[coluna] = limites[origem].to_numpy()[ordem]
+    
+    tabela = pa.Table.from_pandas(atributos, preserve_index=False)
+    tabela = tabela.append_column(
+        geometria.name,
+        pa.array(shapely.to_wkb(geometria.values[ordem]), type=pa.binary())
+    )
+    
+    metadados_geo = {
+        'version': '1.0.0',
+        'primary_column': geometria.name,
+        'columns': {
+            geometria.name: {
+                'encoding': 'WKB',
+                'geometry_types': sorted(geometria.geom_type.dropna().unique().tolist()),
+                'crs': gdf.crs.to_json_dict() if gdf.crs is not None else None,
+                'bbox': [float(v) for v in geometria.total_bounds] if validos.any() else []
+            }
+        }
+    }
+    metadados = dict(tabela.schema.metadata or {})
+    metadados[b'geo'] = json.dumps(metadados_geo).encode('utf-8')
+    if alteracao is not None:
+        metadados[CHAVE_ALTERACAO] = str(alteracao).encode('utf-8')
+    
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    pq.write_table(tabela.replace_schema_metadata(metadados), temporario, row_group_size=linhas_por_grupo)
+    os.replace(temporario, caminho)
+
+
+def ler_geoparquet(caminho, colunas=None, bbox=None, geometria=True, atributos=None):
+    """
+    Lê um GeoParquet gravado por `escrever_geoparquet`
+    
+    Apenas as colunas pedidas são decodificadas e, com `bbox`, os grupos de
+    linhas cujo envelope não toca o retângulo nem chegam a ser lidos.
+    
+    Args:
+        caminho (str): Arquivo .parquet
+        colunas (list): Colunas de atributos a ler (None = todas; as ausentes são ignoradas)
+        bbox (tuple): (xmin, ymin, xmax, ymax) no CRS da camada (None = tudo)
+        geometria (bool): Se False, não lê nem decodifica a geometria
+        atributos (dict): {coluna: valores aceitos} (None = sem filtro)
+        
+    Returns:
+        gpd.GeoDataFrame: Feições na ordem original da camada (pd.DataFrame se geometria=False)
+    """
+    import pyarrow.dataset as ds
+    
+    dataset = ds.dataset(caminho, format='parquet')
+    metadados_geo = json.loads(dataset.schema.metadata[b'geo'])
+    coluna_geometria = metadados_geo['primary_column']
+    crs = metadados_geo['columns'][coluna_geometria].get('crs', 'OGC:CRS84')
+    
+    nomes = [nome for nome in dataset.schema.names if nome not in COLUNAS_ENVELOPE + (coluna_geometria,)]
+    if colunas is not None:
+        nomes = [c for c in colunas if c in nomes] + [COLUNA_ORDEM]
+    if geometria:
+        nomes.append(coluna_geometria)
+    
+    filtro = None
+    if bbox is not None:
+        xmin, ymin, xmax, ymax = bbox
+        filtro = (
+            (ds.field('_xmax') >= xmin) & (ds.field('_xmin') <= xmax)
+            & (ds.field('_ymax') >= ymin) & (ds.field('_ymin') <= ymax)
+        )
+    for coluna, valores in (atributos or {}).items():
+        condicao = ds.field(coluna).isin(list(valores))
+        filtro = condicao if filtro is None else filtro & condicao
+    
+    tabela = dataset.to_table(columns=nomes, filter=filtro)
+    tabela_atributos = tabela.drop_columns([coluna_geometria]) if geometria else tabela
+    
+    # Volta à ordem da camada original (o arquivo está em ordem espacial)
+    resultado = tabela_atributos.to_pandas()
+    ordem = np.argsort(resultado.pop(COLUNA_ORDEM).to_numpy(), kind='stable')
+    resultado = resultado.iloc[ordem].reset_index(drop=True)
+    if not geometria:
+        return resultado
+    
+    geometrias = shapely.from_wkb(tabela.column(coluna_geometria).to_numpy(zero_copy_only=False))
+    resultado[coluna_geometria] = geometrias[ordem]
+    return gpd.GeoDataFrame(resultado, geometry=coluna_geometria, crs=crs)
+
+
+def geoparquet_atualizado(gpkg_path, layer_name):
+    """
+    Indica se a cópia GeoParquet da camada corresponde ao GeoPackage atual
+    
+    Compara o `last_change` gravado no Parquet com o de gpkg_contents, que o
+    GDAL e a sincronização incremental atualizam a cada escrita na camada.
+    
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+        layer_name (str): Nome da camada
+        
+    Returns:
+        bool: True se o Parquet existe e está em dia
+    """
+    caminho = caminho_geoparquet(gpkg_path, layer_name)
+    if not os.path.exists(caminho):
+        return False
+    
+    import pyarrow.parquet as pq
+    
+    metadados = pq.read_schema(caminho).metadata or {}
+    alteracao = metadados.get(CHAVE_ALTERACAO)
+    return alteracao is not None and alteracao.decode('utf-8') == _ultima_alteracao_camada(gpkg_path, layer_name)
+
+
+def _clausula_in(coluna, valores):
+    """Cláusula SQL `coluna IN (...)` para o filtro de atributos do OGR"""
+    literais = []
+    for valor in valores:
+        if isinstance(valor, (bool, np.bool_)):
+            literais.append(str(int(valor)))
+        elif isinstance(valor, (int, np.integer)):
+            literais.append(str(int(valor)))
+        elif isinstance(valor, (float, np.floating)):
+            literais.append(repr(float(valor)))
+        else:
+            literais.append("'" + str(valor).replace("'", "''") + "'")
+    nome = coluna.replace('"', '""')
+    return f'"{nome}" IN ({", ".join(literais)})'
+
+
+def _ler_camada(gpkg_path, layer_name, colunas=None, bbox=None, geometria=True, atributos=None):
+    """Lê a camada do GeoParquet quando atualizado, senão do GeoPackage"""
+    usar_geoparquet = os.environ.get('BACKEND_CAMADAS', 'auto') != 'gpkg'
+    if usar_geoparquet and geoparquet_atualizado(gpkg_path, layer_name):
+        return ler_geoparquet(
+            caminho_geoparquet(gpkg_path, layer_name),
+            colunas=colunas,
+            bbox=bbox,
+            geometria=geometria,
+            atributos=atributos
+        )
+    
+    opcoes = {'columns': list(colunas)} if colunas is not None else {}
+    if not geometria:
+        opcoes['ignore_geometry'] = True
+    
+    if (bbox is not None or atributos) and _PYOGRIO_DISPONIVEL:
+        if atributos:
+            opcoes['where'] = ' AND '.join(_clausula_in(coluna, valores) for coluna, valores in atributos.items())
+        # Com filtro espacial o OGR devolve as feições na ordem do R-tree;
+        # o FID restaura a ordem da camada
+        gdf = gpd.read_file(gpkg_path, layer=layer_name, bbox=bbox, engine='pyogrio', fid_as_index=True, **opcoes)
+        gdf = gdf.sort_index().reset_index(drop=True)
+    else:
+        if atributos and colunas is not None:
+            opcoes['columns'] = list(colunas) + list(atributos)
+        gdf = gpd.read_file(gpkg_path, layer=layer_name, bbox=bbox, **opcoes)
+        for coluna, valores in (atributos or {}).items():
+            gdf = gdf[gdf[coluna].isin(list(valores))].reset_index(drop=True)
+    
+    return _projetar_colunas(gdf, colunas, geometria)
+
+
+def atualizar_geoparquet(gpkg_path, layer_name, gdf=None):
+    """
+    Regrava a cópia GeoParquet de uma camada recém-escrita no GeoPackage
+    
+    Deve ser chamada depois de cada escrita na camada (como
+    `registrar_escrita_camada`); até lá, a cópia antiga é ignorada e a
+    camada é lida do GeoPackage.
+    
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+        layer_name (str): Camada que acabou de ser escrita
+        gdf (gpd.GeoDataFrame): Conteúdo gravado (None = relê do GeoPackage)
+        
+    Returns:
+        str: Caminho do arquivo .parquet gravado
+    """
+    if gdf is None:
+        gdf = gpd.read_file(gpkg_path, layer=layer_name)
+    
+    caminho = caminho_geoparquet(gpkg_path, layer_name)
+    escrever_geoparquet(gdf, caminho, alteracao=_ultima_alteracao_camada(gpkg_path, layer_name))
+    return caminho
+
+
+def exportar_geoparquet(gpkg_path, layers=None):
+    """
+    Gera a cópia GeoParquet de várias camadas de um GeoPackage existente
+    
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+        layers (list): Camadas a exportar (None = todas)
+        
+    Returns:
+        dict: {camada: caminho do .parquet}
+    """
+    layers = layers if layers is not None else fiona.listlayers(gpkg_path)
+    return {camada: atualizar_geoparquet(gpkg_path, camada) for camada in layers}
+
+
+# ==================== ÍNDICE ESPACIAL ====================
+
+class IndiceCamada:
+    """
+    Índice espacial (STRtree) de uma camada para consultas de interseção
+    
+    Substitui o `gpd.sjoin` por imóvel: a árvore é construída uma vez por
+    versão da camada (ver `obter_indice_camada`) e cada consulta custa apenas
+    a busca na árvore.
+    """
+    
+    def __init__(self, gdf):
+        """
+        Args:
+            gdf (gpd.GeoDataFrame): Camada a indexar
+        """
+        self.gdf = gdf
+        self.arvore = STRtree(np.asarray(gdf.geometry.values))
+        self._projetadas = None
+        self._areas_ha = None
+        self._trava_projecao = threading.Lock()
+    
+    def __len__(self):
+        return len(self.gdf)
+    
+    @property
+    def geometrias_projetadas(self):
+        """Geometrias da camada em CRS_AREA (inválidas já reparadas), projetadas na primeira consulta"""
+        if self._projetadas is None:
+            with self._trava_projecao:
+                if self._projetadas is None:
+                    # RL/APP do SICAR não passam por `sanear_geometrias`: recortes e uniões
+                    # de polígonos auto-intersectantes falham no GEOS
+                    self._projetadas = _reparar_poligonos(projetar_geometrias(self.gdf))
+        return self._projetadas
+    
+    @property
+    def areas_ha(self):
+        """Área de cada feição em hectares (CRS_AREA)"""
+        if self._areas_ha is None:
+            self._areas_ha = shapely.area(self.geometrias_projetadas) / 10000  # m² -> ha
+        return self._areas_ha
+    
+    def _geometrias_alvo(self, gdf_alvo):
+        """Geometrias de consulta no CRS da camada"""
+        if self.gdf.crs is not None and gdf_alvo.crs is not None and gdf_alvo.crs != self.gdf.crs:
+            gdf_alvo = gdf_alvo.to_crs(self.gdf.crs)
+        return np.asarray(gdf_alvo.geometry.values)
+    
+    def consultar(self, geometria):
+        """
+        Posições das feições que intersectam uma geometria
+        
+        Args:
+            geometria (shapely.Geometry): Geometria de consulta
+            
+        Returns:
+            np.ndarray: Posições (iloc) ordenadas
+        """
+        return np.sort(self.arvore.query(geometria, predicate='intersects'))
+    
+    def filtrar(self, gdf_alvo):
+        """
+        Feições da camada que intersectam alguma geometria de `gdf_alvo`
+        
+        Args:
+            gdf_alvo (gpd.GeoDataFrame): Geometrias de consulta (ex.: imóvel selecionado)
+            
+        Returns:
+            gpd.GeoDataFrame: Subconjunto da camada, na ordem original
+        """
+        _, posicoes = self.arvore.query(self._geometrias_alvo(gdf_alvo), predicate='intersects')
+        return self.gdf.iloc[np.unique(posicoes)]
+    
+    def pares(self, gdf_alvo):
+        """
+        Pares (alvo, feição) que se intersectam, ordenados por alvo e feição
+        
+        A árvore descarta pelo retângulo envolvente antes do teste exato.
+        A ordem fixa (ordem original das feições) torna as somas determinísticas.
+        
+        Args:
+            gdf_alvo (gpd.GeoDataFrame): Geometrias de consulta
+            
+        Returns:
+            tuple: (np.ndarray de posições dos alvos, np.ndarray de posições na camada)
+        """
+        if len(gdf_alvo) == 0 or len(self.gdf) == 0:
+            vazio = np.zeros(0, dtype='int64')
+            return vazio, vazio
+        
+        alvos, posicoes = self.arvore.query(self._geometrias_alvo(gdf_alvo), predicate='intersects')
+        ordem = np.lexsort((posicoes, alvos))
+        return alvos[ordem], posicoes[ordem]
+    
+    def somar_areas(self, gdf_alvo):
+        """
+        Quantidade e área (ha) das feições que intersectam cada geometria alvo
+        
+        Uma única consulta na árvore para todos os alvos; as áreas vêm de
+        `areas_ha`, sem reprojetar a camada a cada chamada.
+        
+        Args:
+            gdf_alvo (gpd.GeoDataFrame): Geometrias de consulta (ex.: imóveis)
+            
+        Returns:
+            tuple: (np.ndarray de quantidades, np.ndarray de áreas em ha), um valor por alvo
+        """
+        n = len(gdf_alvo)
+        if n == 0 or len(self.gdf) == 0:
+            return np.zeros(n, dtype='int64'), np.zeros(n)
+        
+        alvos, posicoes = self.pares(gdf_alvo)
+        quantidades = np.bincount(alvos, minlength=n).astype('int64')
+        areas = np.bincount(alvos, weights=self.areas_ha[posicoes], minlength=n)
+        return quantidades, areas
+
+
+def obter_indice_camada(gpkg_path, layer_name, mask=None):
+    """
+    Retorna o índice espacial de uma camada, construído uma vez por versão
+    
+    Com `mask`, indexa só as feições que a intersectam (só geometrias, o
+    mesmo recorte de `ler_geodataframe(..., mask=mask, colunas=[])`), e o
+    índice fica em cache junto do recorte.
+    
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+        layer_name (str): Nome da camada
+        mask (shapely.Geometry | gpd.GeoDataFrame | gpd.GeoSeries): Recorte (None = camada inteira)
+        
+    Returns:
+        IndiceCamada: Índice da camada
+    """
+    if mask is not None:
+        return obter_derivado_recorte(gpkg_path, layer_name, 'indice_espacial', IndiceCamada, mask=mask, colunas=[])
+    return obter_derivado_camada(gpkg_path, layer_name, 'indice_espacial', IndiceCamada)
+
+
+# ==================== ÁREAS ====================
+
+# Albers cônica de áreas iguais no elipsoide do SIRGAS 2000 (GRS80), com
+# paralelos-padrão cruzando Rondônia: a área planar é a área no elipsoide em
+# qualquer ponto do estado (a Policônica, EPSG:5880, não é equivalente e
+# superestima 0,5-2% aqui). As camadas ficam em graus (EPSG:4326), onde
+# `.area` não é m².
+CRS_AREA = (
+    "+proj=aea +lat_0=-11 +lon_0=-63 +lat_1=-9 +lat_2=-13 "
+    "+x_0=0 +y_0=0 +ellps=GRS80 +units=m +no_defs"
+)
+
+
+def projetar_geometrias(gdf, crs_area=CRS_AREA):
+    """
+    Geometrias de um GeoDataFrame em um CRS métrico
+    
+    Camadas sem CRS definido são consideradas já métricas e não são transformadas.
+    
+    Args:
+        gdf (gpd.GeoDataFrame): Camada de entrada
+        crs_area (str): CRS de destino
+        
+    Returns:
+        np.ndarray: Geometrias shapely projetadas
+    """
+    geometrias = gdf.geometry
+    if gdf.crs is not None and not gdf.crs.equals(crs_area):
+        geometrias = geometrias.to_crs(crs_area)
+    return np.asarray(geometrias.values)
+
+
+def areas_ha(gdf, crs_area=CRS_AREA):
+    """
+    Área de cada feição em hectares, calculada em `crs_area`
+    
+    Args:
+        gdf (gpd.GeoDataFrame): Camada de entrada
+        crs_area (str): CRS métrico usado no cálculo
+        
+    Returns:
+        np.ndarray: Áreas em hectares, alinhadas às linhas de `gdf`
+    """
+    if gdf.empty:
+        return np.zeros(0)
+    return shapely.area(projetar_geometrias(gdf, crs_area)) / 10000  # m² -> ha
+
+
+MODOS_AREA = ('soma', 'uniao')
+
+
+def _recortar_ao_imovel(geometrias, imoveis):
+    """
+    Recorta cada geometria ao imóvel correspondente (arrays alinhados, em CRS_AREA)
+    
+    Os imóveis são preparados uma vez; feições inteiramente contidas no imóvel
+    são aproveitadas sem calcular a interseção, que é a operação cara quando o
+    imóvel tem milhares de fragmentos de APP.
+    """
+    shapely.prepare(imoveis)
+    dentro = shapely.contains_properly(imoveis, geometrias)
+    recortes = geometrias.copy()
+    fora = ~dentro
+    if fora.any():
+        recortes[fora] = shapely.intersection(geometrias[fora], imoveis[fora])
+    return recortes
+
+
+def _unir_por_imovel(recortes, alvos, n):
+    """União dos recortes de cada imóvel (geometria vazia quando não há nenhum)"""
+    unioes = np.full(n, shapely.Polygon(), dtype=object)
+    if len(alvos):
+        grupos = pd.Series(np.arange(len(alvos))).groupby(alvos).indices
+        for alvo, posicoes in grupos.items():
+            unioes[alvo] = shapely.union_all(recortes[posicoes])
+    return unioes
+
+
+def quebrar_areas_uniao(imoveis, embargos, reserva_legal, app):
+    """
+    Quebra de áreas sem dupla contagem, a partir das uniões já recortadas
+    
+    Cada hectare é contado uma única vez, com prioridade embargo > Reserva
+    Legal > APP: a RL informada é a parte fora de embargos e a APP, a parte
+    fora de embargos e RL.
+    
+    Args:
+        imoveis (np.ndarray): Geometrias dos imóveis em CRS_AREA
+        embargos (np.ndarray): União dos embargos recortados, por imóvel
+        reserva_legal (np.ndarray): União da RL recortada, por imóvel
+        app (np.ndarray): União da APP recortada, por imóvel
+        
+    Returns:
+        dict: Arrays 'total', 'embargada', 'reserva_legal', 'app' em hectares
+    """
+    rl_livre = shapely.difference(reserva_legal, embargos)
+    app_livre = shapely.difference(app, shapely.union(embargos, reserva_legal))
+    return {
+        'total': shapely.area(imoveis) / 10000,
+        'embargada': shapely.area(embargos) / 10000,
+        'reserva_legal': shapely.area(rl_livre) / 10000,
+        'app': shapely.area(app_livre) / 10000
+    }
+
+
+class MotorAreas:
+    """
+    Quebra de áreas (total, embargada, RL, APP, útil) para vários imóveis de uma vez
+    
+    Usa os índices espaciais das camadas de restrição, que guardam as áreas já
+    projetadas em CRS_AREA: cada camada é reprojetada uma vez por versão do
+    arquivo, e só os imóveis consultados são transformados a cada chamada.
+    """
+    
+    def __init__(self, embargos=(), reserva_legal=None, app=None):
+        """
+        Args:
+            embargos (list): Índices (IndiceCamada) das camadas de embargo
+            reserva_legal (IndiceCamada): Índice da Reserva Legal (opcional)
+            app (IndiceCamada): Índice da APP (opcional)
+        """
+        self.embargos = [indice for indice in embargos if indice is not None]
+        self.reserva_legal = reserva_legal
+        self.app = app
+    
+    @staticmethod
+    def _somar(indices, gdf_imoveis):
+        """Soma as áreas de várias camadas por imóvel"""
+        total = np.zeros(len(gdf_imoveis))
+        for indice in indices:
+            if indice is not None:
+                total += indice.somar_areas(gdf_imoveis)[1]
+        return total
+    
+    @staticmethod
+    def _unir(indices, gdf_imoveis, imoveis):
+        """Recorta as feições de várias camadas a cada imóvel e as une"""
+        alvos, pedacos = [], []
+        for indice in indices:
+            if indice is None:
+                continue
+            alvos_camada, posicoes = indice.pares(gdf_imoveis)
+            alvos.append(alvos_camada)
+            pedacos.append(_recortar_ao_imovel(
+                indice.geometrias_projetadas[posicoes],
+                imoveis[alvos_camada]
+            ))
+        
+        if not alvos:
+            return _unir_por_imovel(np.zeros(0, dtype=object), np.zeros(0, dtype='int64'), len(imoveis))
+        return _unir_por_imovel(np.concatenate(pedacos), np.concatenate(alvos), len(imoveis))
+    
+    def calcular(self, gdf_imoveis, modo='soma'):
+        """
+        Calcula a quebra de áreas de cada imóvel
+        
+        Args:
+            gdf_imoveis (gpd.GeoDataFrame): Imóveis
+            modo (str): 'soma' (áreas brutas das feições que tocam o imóvel) ou
+                'uniao' (feições recortadas ao imóvel, sem sobreposições)
+            
+        Returns:
+            pd.DataFrame: Colunas de `calcular_area_util`, uma linha por imóvel
+        """
+        if modo not in MODOS_AREA:
+            raise ValueError(f"Modo de área inválido: {modo} (use {' ou '.join(MODOS_AREA)})")
+        
+        if modo == 'uniao':
+            imoveis = shapely.make_valid(projetar_geometrias(gdf_imoveis))
+            quebra = quebrar_areas_uniao(
+                imoveis,
+                self._unir(self.embargos, gdf_imoveis, imoveis),
+                self._unir([self.reserva_legal], gdf_imoveis, imoveis),
+                self._unir([self.app], gdf_imoveis, imoveis)
+            )
+            area_total = quebra['total']
+            area_embargada = quebra['embargada']
+            area_rl = quebra['reserva_legal']
+            area_app = quebra['app']
+        else:
+            area_total = areas_ha(gdf_imoveis)
+            area_embargada = self._somar(self.embargos, gdf_imoveis)
+            area_rl = self._somar([self.reserva_legal], gdf_imoveis)
+            area_app = self._somar([self.app], gdf_imoveis)
+        
+        area_util = area_total - area_embargada - area_rl - area_app
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percentual = np.where(area_total > 0, area_util / area_total * 100, 0.0)
+        
+        return pd.DataFrame(
+            {
+                'total': area_total,
+                'embargada': area_embargada,
+                'reserva_legal': area_rl,
+                'app': area_app,
+                'util': area_util,
+                'percentual_util': percentual
+            },
+            index=gdf_imoveis.index
+        )
+
+
+def obter_motor_areas(gpkg_path, layers=None, mask=None):
+    """
+    Monta o motor de áreas com os índices em cache das camadas presentes
+    
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+        layers (list): Camadas existentes no arquivo (None = consulta o arquivo)
+        mask (gpd.GeoDataFrame): Usa só a vizinhança destes imóveis (None = camadas inteiras)
         
     Returns:
-        gpd.GeoDataFrame: GeoDataFrame com a camada lida
+        MotorAreas: Motor pronto para `calcular` (sobre imóveis contidos em `mask`, se informado)
     """
-    return gpd.read_file(gpkg_path, layer=layer_name)
+    if layers is None:
+        layers = fiona.listlayers(gpkg_path)
+    
+    def indice(nome):
+        if nome not in layers:
+            return None
+        indice_camada = obter_indice_camada(gpkg_path, nome, mask=mask)
+        return indice_camada if len(indice_camada) else None
+    
+    return MotorAreas(
+        embargos=[indice('embargos_ibama'), indice('embargos_icmbio')],
+        reserva_legal=indice('reserva_legal'),
+        app=indice('app')
+    )
 
 
 def selecionar_imovel_car(gdf, codigo, coluna_cod):
@@ -41,7 +1061,130 @@ def selecionar_imovel_car(gdf, codigo, coluna_cod):
     return gdf_sel, centroid.y, centroid.x, bounds[1], bounds[3], bounds[0], bounds[2]
 
 
-def inserir_geojson_folium(gdf, col_popup, label, layer_name, color, mapa):
+# ==================== PREPARAÇÃO PARA O MAPA ====================
+
+# Cache LRU dos GeoJSON já preparados (por imóvel, camada, zoom e colunas)
+_CACHE_RENDER = OrderedDict()
+_TRAVA_RENDER = threading.Lock()
+MAX_CACHE_RENDER = 256
+
+# Metros por pixel no zoom 0 do Web Mercator, no equador
+METROS_POR_PIXEL_Z0 = 156543.03392
+METROS_POR_GRAU = 111320
+
+
+def tolerancia_zoom(zoom, latitude=0.0, pixels=0.5):
+    """
+    Tolerância de simplificação (em graus) invisível num nível de zoom
+    
+    Args:
+        zoom (float): Nível de zoom do mapa
+        latitude (float): Latitude de referência
+        pixels (float): Desvio máximo admitido, em pixels de tela
+        
+    Returns:
+        float: Tolerância em graus
+    """
+    metros_por_pixel = METROS_POR_PIXEL_Z0 * math.cos(math.radians(latitude)) / 2 ** zoom
+    return metros_por_pixel * pixels / METROS_POR_GRAU
+
+
+def zoom_para_extensao(bounds, largura_px, altura_px, zoom_maximo=18):
+    """
+    Maior nível de zoom em que uma extensão cabe no mapa (Web Mercator)
+    
+    Args:
+        bounds (tuple): (lon_min, lat_min, lon_max, lat_max) em graus
+        largura_px (int): Largura do mapa em pixels
+        altura_px (int): Altura do mapa em pixels
+        zoom_maximo (int): Zoom usado quando a extensão é um ponto
+        
+    Returns:
+        int: Nível de zoom
+    """
+    lon_min, lat_min, lon_max, lat_max = bounds
+    
+    def y_mercator(latitude):
+        return math.log(math.tan(math.pi / 4 + math.radians(latitude) / 2))
+    
+    # Fração do mundo (256 px no zoom 0) ocupada pela extensão em cada eixo
+    fracao_x = (lon_max - lon_min) / 360
+    fracao_y = (y_mercator(lat_max) - y_mercator(lat_min)) / (2 * math.pi)
+    zooms = [zoom_maximo]
+    if fracao_x > 0:
+        zooms.append(math.log2(largura_px / 256 / fracao_x))
+    if fracao_y > 0:
+        zooms.append(math.log2(altura_px / 256 / fracao_y))
+    return max(0, min(zoom_maximo, math.floor(min(zooms))))
+
+
+def preparar_geojson(gdf, zoom, colunas=(), chave=None, medir_original=False):
+    """
+    Reduz o GeoJSON enviado ao navegador sem diferença visível no zoom
+    
+    Mantém só as colunas usadas em tooltip/popup (descartando, por exemplo,
+    `index_right` de sjoins), simplifica as geometrias com tolerância de
+    meio pixel no zoom informado e arredonda as coordenadas para a grade
+    correspondente. Com `chave`, o resultado fica em cache.
+    
+    Args:
+        gdf (gpd.GeoDataFrame): Feições a desenhar
+        zoom (float): Maior zoom em que o detalhe deve ser preservado
+        colunas (tuple): Colunas a manter
+        chave (tuple): Identificação estável do conteúdo (ex.: arquivo, versão, camada, imóvel)
+        medir_original (bool): Serializa também o GeoDataFrame original para
+            medir 'bytes_antes' (custa tanto quanto a preparação; só para diagnóstico)
+        
+    Returns:
+        tuple: (dict GeoJSON, dict com 'bytes_antes' (None sem `medir_original`),
+            'bytes_depois', 'vertices_antes', 'vertices_depois')
+    """
+    colunas = tuple(c for c in colunas if c in gdf.columns)
+    chave_cache = (chave, zoom, colunas, medir_original) if chave is not None else None
+    
+    if chave_cache is not None:
+        with _TRAVA_RENDER:
+            if chave_cache in _CACHE_RENDER:
+                _CACHE_RENDER.move_to_end(chave_cache)
+                return _CACHE_RENDER[chave_cache]
+    
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(4326)
+    
+    geometrias = np.asarray(gdf.geometry.values)
+    latitude = float(np.nanmean(gdf.total_bounds[[1, 3]])) if len(gdf) else 0.0
+    tolerancia = tolerancia_zoom(zoom, latitude)
+    
+    # Grade de arredondamento: potência de 10 abaixo da tolerância
+    grade = 10 ** math.floor(math.log10(tolerancia))
+    simplificadas = shapely.set_precision(
+        shapely.simplify(geometrias, tolerancia, preserve_topology=True),
+        grade
+    )
+    
+    reduzido = gpd.GeoDataFrame(gdf[list(colunas)].copy(), geometry=simplificadas, crs=4326)
+    reduzido = reduzido[~reduzido.geometry.is_empty & reduzido.geometry.notna()]
+    
+    # Mantém o id das feições: o folium não precisa acrescentá-lo ao dict em cache
+    texto = reduzido.to_json()
+    geojson = json.loads(texto)
+    estatisticas = {
+        'bytes_antes': len(gdf.to_json(default=str)) if medir_original else None,
+        'bytes_depois': len(texto),
+        'vertices_antes': int(shapely.get_num_coordinates(geometrias).sum()),
+        'vertices_depois': int(shapely.get_num_coordinates(simplificadas).sum())
+    }
+    
+    resultado = (geojson, estatisticas)
+    if chave_cache is not None:
+        with _TRAVA_RENDER:
+            _CACHE_RENDER[chave_cache] = resultado
+            while len(_CACHE_RENDER) > MAX_CACHE_RENDER:
+                _CACHE_RENDER.popitem(last=False)
+    return resultado
+
+
+def inserir_geojson_folium(gdf, col_popup, label, layer_name, color, mapa, zoom=None, chave=None):
     """
     Adiciona GeoJSON ao mapa Folium
     
@@ -52,12 +1195,18 @@ def inserir_geojson_folium(gdf, col_popup, label, layer_name, color, mapa):
         layer_name (str): Nome da camada
         color (str): Cor da camada
         mapa (folium.Map): Mapa Folium
+        zoom (float): Se informado, prepara o GeoJSON com `preparar_geojson`
+        chave (tuple): Chave de cache repassada a `preparar_geojson`
         
     Returns:
         folium.Map: Mapa atualizado
     """
+    dados = gdf
+    if zoom is not None:
+        dados, _ = preparar_geojson(gdf, zoom, colunas=(col_popup,), chave=chave)
+    
     geojson = folium.GeoJson(
-        gdf,
+        dados,
         name=layer_name,
         style_function=lambda x: {
             'fillColor': color,
@@ -86,6 +1235,101 @@ def mostrar_status(nome, quantidade):
     return f"{emoji} {nome}: {quantidade}"
 
 
+# ==================== LIMPEZA DE GEOMETRIAS ====================
+
+_TIPOS_POLIGONAIS = (3, 6)  # Polygon, MultiPolygon (shapely.get_type_id)
+
+
+def _manter_poligonos(reparadas, originais):
+    """
+    Descarta as partes não poligonais geradas pelo `make_valid`
+    
+    O reparo de um polígono pode devolver uma GeometryCollection com linhas
+    e pontos colapsados; para camadas de área só interessa a parte poligonal.
+    
+    Args:
+        reparadas (np.ndarray): Geometrias após `make_valid`
+        originais (np.ndarray): Geometrias antes do reparo
+        
+    Returns:
+        np.ndarray: Geometrias reparadas, poligonais quando a original era
+    """
+    colecoes = (
+        np.isin(shapely.get_type_id(originais), _TIPOS_POLIGONAIS)
+        & ~np.isin(shapely.get_type_id(reparadas), _TIPOS_POLIGONAIS)
+    )
+    
+    for i in np.flatnonzero(colecoes):
+        partes = shapely.get_parts(reparadas[i])
+        poligonais = partes[np.isin(shapely.get_type_id(partes), _TIPOS_POLIGONAIS)]
+        reparadas[i] = shapely.union_all(poligonais)
+    
+    return reparadas
+
+
+def _reparar_poligonos(geometrias):
+    """
+    Repara (`make_valid`) só as geometrias inválidas, mantendo as partes poligonais
+    
+    Args:
+        geometrias (np.ndarray): Geometrias (não é alterado)
+        
+    Returns:
+        np.ndarray: Cópia com as inválidas reparadas
+    """
+    geometrias = np.array(geometrias, dtype=object)
+    invalidas = ~(shapely.is_missing(geometrias) | shapely.is_empty(geometrias)) & ~shapely.is_valid(geometrias)
+    if invalidas.any():
+        geometrias[invalidas] = _manter_poligonos(
+            shapely.make_valid(geometrias[invalidas]),
+            geometrias[invalidas]
+        )
+    return geometrias
+
+
+def sanear_geometrias(gdf):
+    """
+    Converte para 2D, repara geometrias inválidas e remove as vazias
+    
+    Todas as etapas são vetorizadas (Shapely 2) e o reparo só é aplicado às
+    linhas realmente inválidas, em vez de `buffer(0)` na camada inteira.
+    
+    Args:
+        gdf (gpd.GeoDataFrame): GeoDataFrame a limpar (não é alterado)
+        
+    Returns:
+        tuple: (GeoDataFrame limpo, dict com o número de linhas tocadas em
+            cada etapa: 'entrada', 'z_removido', 'reparadas', 'removidas')
+    """
+    relatorio = {'entrada': len(gdf), 'z_removido': 0, 'reparadas': 0, 'removidas': 0}
+    
+    if gdf.empty:
+        return gdf, relatorio
+    
+    geometrias = np.array(gdf.geometry.values, dtype=object)
+    
+    # 1. Remover coordenada Z
+    com_z = shapely.has_z(geometrias)
+    if com_z.any():
+        geometrias[com_z] = shapely.force_2d(geometrias[com_z])
+    relatorio['z_removido'] = int(com_z.sum())
+    
+    # 2. Reparar apenas as inválidas
+    vazias = shapely.is_missing(geometrias) | shapely.is_empty(geometrias)
+    relatorio['reparadas'] = int((~vazias & ~shapely.is_valid(geometrias)).sum())
+    geometrias = _reparar_poligonos(geometrias)
+    
+    # 3. Remover nulas/vazias (inclusive as que o reparo esvaziou)
+    manter = ~(shapely.is_missing(geometrias) | shapely.is_empty(geometrias))
+    relatorio['removidas'] = int((~manter).sum())
+    
+    gdf_limpo = gdf[manter].copy()
+    gdf_limpo[gdf.geometry.name] = gpd.GeoSeries(
+        geometrias[manter], index=gdf_limpo.index, crs=gdf.crs
+    )
+    return gdf_limpo, relatorio
+
+
 def validar_geometria(gdf):
     """
     Remove geometrias inválidas e converte Z para 2D
@@ -96,16 +1340,158 @@ def validar_geometria(gdf):
     Returns:
         gpd.GeoDataFrame: GeoDataFrame validado
     """
-    def remove_z(geom):
-        if geom and geom.has_z:
-            return wkb.loads(wkb.dumps(geom, output_dimension=2))
-        return geom
+    gdf_limpo, _ = sanear_geometrias(gdf)
+    return gdf_limpo
+
+
+# ==================== ÍNDICE CPF/CNPJ ====================
+
+def normalizar_cpf_cnpj(valor):
+    """
+    Normaliza CPF/CNPJ mantendo apenas os dígitos
     
-    gdf['geometry'] = gdf.geometry.apply(remove_z).buffer(0)
-    return gdf[~gdf.geometry.is_empty].dropna(subset=['geometry'])
+    Args:
+        valor (str): CPF/CNPJ em qualquer formatação
+        
+    Returns:
+        str: Somente dígitos ('' se vazio/nulo)
+    """
+    if valor is None or (isinstance(valor, (float, np.floating)) and np.isnan(valor)):
+        return ''
+    if isinstance(valor, (int, np.integer, float, np.floating)) and not isinstance(valor, bool):
+        # Gravado como número: sem o '.0' dos floats e com os zeros à esquerda
+        digitos = str(int(valor))
+        return digitos.zfill(11 if len(digitos) <= 11 else 14)
+    return ''.join(c for c in str(valor) if c.isdigit())
+
 
+def _normalizar_coluna_cpf(serie):
+    """Versão vetorizada de `normalizar_cpf_cnpj` para uma coluna inteira"""
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        digitos = serie.round().astype('Int64').astype(str)
+        digitos = digitos.str.zfill(11).where(digitos.str.len() <= 11, digitos.str.zfill(14))
+        return digitos.where(serie.notna(), '')
+    return serie.fillna('').astype(str).str.replace(r'\D', '', regex=True)
 
-def contar_embargos_por_cpf(cpf_cnpj, gdf_embargos_ibama, gdf_embargos_icmbio):
+
+def indexar_cpf_cnpj(gdf):
+    """
+    Constrói o mapa CPF/CNPJ normalizado -> posições das linhas da camada
+    
+    Args:
+        gdf (gpd.GeoDataFrame): Camada de embargos
+        
+    Returns:
+        dict: {cpf_cnpj: np.ndarray de posições (iloc)}
+    """
+    if gdf.empty or 'cpf_cnpj' not in gdf.columns:
+        return {}
+    
+    chaves = _normalizar_coluna_cpf(gdf['cpf_cnpj'])
+    grupos = pd.Series(np.arange(len(gdf))).groupby(chaves.values).indices
+    grupos.pop('', None)
+    return grupos
+
+
+class IndiceCpfCnpj:
+    """
+    Índice hash de CPF/CNPJ -> embargos, por camada
+    
+    Cada camada é indexada separadamente, então a atualização de uma fonte
+    (ex.: só IBAMA) reconstrói apenas a parte correspondente.
+    """
+    
+    def __init__(self, camadas=None):
+        """
+        Args:
+            camadas (dict): {nome_camada: GeoDataFrame} a indexar
+        """
+        self.camadas = {}
+        for nome, gdf in (camadas or {}).items():
+            self.atualizar_camada(nome, gdf)
+    
+    def atualizar_camada(self, nome, gdf):
+        """
+        (Re)indexa uma única camada
+        
+        Args:
+            nome (str): Nome da camada
+            gdf (gpd.GeoDataFrame): Conteúdo atual da camada
+        """
+        self.camadas[nome] = indexar_cpf_cnpj(gdf)
+    
+    def linhas(self, cpf_cnpj):
+        """
+        Posições dos embargos de um CPF/CNPJ em cada camada
+        
+        Args:
+            cpf_cnpj (str): CPF/CNPJ em qualquer formatação
+            
+        Returns:
+            dict: {nome_camada: np.ndarray de posições}
+        """
+        chave = normalizar_cpf_cnpj(cpf_cnpj)
+        vazio = np.array([], dtype=np.intp)
+        return {nome: mapa.get(chave, vazio) for nome, mapa in self.camadas.items()}
+    
+    def contar(self, cpf_cnpj):
+        """
+        Total de embargos de um CPF/CNPJ em todas as camadas
+        
+        Args:
+            cpf_cnpj (str): CPF/CNPJ em qualquer formatação
+            
+        Returns:
+            int: Total de embargos
+        """
+        chave = normalizar_cpf_cnpj(cpf_cnpj)
+        return sum(len(mapa.get(chave, ())) for mapa in self.camadas.values())
+    
+    def contar_lote(self, cpfs_cnpjs):
+        """
+        Total de embargos para muitos CPFs/CNPJs de uma vez
+        
+        Args:
+            cpfs_cnpjs (iterable): CPFs/CNPJs em qualquer formatação
+            
+        Returns:
+            pd.Series: Totais, alinhados à entrada
+        """
+        serie = pd.Series(cpfs_cnpjs)
+        chaves = _normalizar_coluna_cpf(serie)
+        total = pd.Series(0, index=serie.index, dtype='int64')
+        
+        for mapa in self.camadas.values():
+            contagens = pd.Series({chave: len(pos) for chave, pos in mapa.items()}, dtype='int64')
+            total += chaves.map(contagens).fillna(0).astype('int64')
+        
+        return total
+
+
+def obter_indice_cpf(gpkg_path, layer_names):
+    """
+    Retorna o índice de CPF/CNPJ das camadas de embargo de um GeoPackage
+    
+    Cada camada é indexada uma vez por versão (ver `obter_derivado_camada`),
+    a partir apenas da coluna cpf_cnpj; montar o objeto combinado custa
+    apenas referências aos mapas prontos.
+    
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+        layer_names (list): Camadas de embargo a incluir
+        
+    Returns:
+        IndiceCpfCnpj: Índice combinado
+    """
+    indice = IndiceCpfCnpj()
+    for nome in layer_names:
+        indice.camadas[nome] = obter_derivado_camada(
+            gpkg_path, nome, 'indice_cpf', indexar_cpf_cnpj, colunas=['cpf_cnpj']
+        )
+    return indice
+
+
+def contar_embargos_por_cpf(cpf_cnpj, gdf_embargos_ibama, gdf_embargos_icmbio, indice=None):
     """
     Conta total de embargos de um CPF/CNPJ em todas as propriedades
     
@@ -113,40 +1499,45 @@ def contar_embargos_por_cpf(cpf_cnpj, gdf_embargos_ibama, gdf_embargos_icmbio):
         cpf_cnpj (str): CPF/CNPJ do proprietário
         gdf_embargos_ibama (gpd.GeoDataFrame): Embargos IBAMA
         gdf_embargos_icmbio (gpd.GeoDataFrame): Embargos ICMBio
+        indice (IndiceCpfCnpj): Índice pré-computado (consulta O(1) em vez de varredura)
         
     Returns:
         int: Total de embargos
     """
+    if indice is not None:
+        return indice.contar(cpf_cnpj)
+    
+    chave = normalizar_cpf_cnpj(cpf_cnpj)
+    if not chave:
+        # Como no índice: CPF/CNPJ vazio não casa com os embargos sem CPF/CNPJ
+        return 0
+    
     total_ibama = 0
     total_icmbio = 0
     
     if not gdf_embargos_ibama.empty and 'cpf_cnpj' in gdf_embargos_ibama.columns:
-        total_ibama = gdf_embargos_ibama[
-            gdf_embargos_ibama['cpf_cnpj'] == cpf_cnpj
-        ].shape[0]
+        total_ibama = int(
+            (_normalizar_coluna_cpf(gdf_embargos_ibama['cpf_cnpj']) == chave).sum()
+        )
     
     if not gdf_embargos_icmbio.empty and 'cpf_cnpj' in gdf_embargos_icmbio.columns:
-        total_icmbio = gdf_embargos_icmbio[
-            gdf_embargos_icmbio['cpf_cnpj'] == cpf_cnpj
-        ].shape[0]
+        total_icmbio = int(
+            (_normalizar_coluna_cpf(gdf_embargos_icmbio['cpf_cnpj']) == chave).sum()
+        )
     
     return total_ibama + total_icmbio
 
 
-def calcular_risco_reputacional(cpf_cnpj, gdf_embargos_ibama, gdf_embargos_icmbio):
+def classificar_risco(total_embargos):
     """
-    Calcula score de risco reputacional baseado em embargos
+    Converte total de embargos em (mensagem, score) de risco reputacional
     
     Args:
-        cpf_cnpj (str): CPF/CNPJ do proprietário
-        gdf_embargos_ibama (gpd.GeoDataFrame): Embargos IBAMA
-        gdf_embargos_icmbio (gpd.GeoDataFrame): Embargos ICMBio
+        total_embargos (int): Total de embargos do CPF/CNPJ
         
     Returns:
         tuple: (mensagem, score)
     """
-    total_embargos = contar_embargos_por_cpf(cpf_cnpj, gdf_embargos_ibama, gdf_embargos_icmbio)
-    
     if total_embargos == 0:
         return "✅ Baixo Risco", 10
     elif total_embargos <= 2:
@@ -155,23 +1546,76 @@ def calcular_risco_reputacional(cpf_cnpj, gdf_embargos_ibama, gdf_embargos_icmbi
         return "❌ Alto Risco", 90
 
 
-def calcular_area_util(gdf_imovel, gdf_embargos, gdf_rl, gdf_app):
+def calcular_risco_reputacional(cpf_cnpj, gdf_embargos_ibama, gdf_embargos_icmbio, indice=None):
+    """
+    Calcula score de risco reputacional baseado em embargos
+    
+    Args:
+        cpf_cnpj (str): CPF/CNPJ do proprietário
+        gdf_embargos_ibama (gpd.GeoDataFrame): Embargos IBAMA
+        gdf_embargos_icmbio (gpd.GeoDataFrame): Embargos ICMBio
+        indice (IndiceCpfCnpj): Índice pré-computado (opcional)
+        
+    Returns:
+        tuple: (mensagem, score)
+    """
+    total_embargos = contar_embargos_por_cpf(
+        cpf_cnpj, gdf_embargos_ibama, gdf_embargos_icmbio, indice=indice
+    )
+    return classificar_risco(total_embargos)
+
+
+def calcular_area_util(gdf_imovel, gdf_embargos, gdf_rl, gdf_app, modo='soma'):
     """
     Calcula área realmente explorável
     
+    As áreas são medidas em CRS_AREA (projeção de áreas iguais, mesmo com
+    camadas em graus). Para muitos imóveis ou consultas repetidas, prefira `MotorAreas`,
+    que reaproveita a projeção das camadas.
+    
+    No modo 'soma' as áreas das feições são somadas como estão; no modo
+    'uniao' cada camada é recortada ao imóvel e unida, dentro e entre camadas,
+    para que sobreposições (ex.: IBAMA + ICMBio, RL + APP) contem uma vez só.
+    
     Args:
         gdf_imovel (gpd.GeoDataFrame): GeoDataFrame do imóvel
         gdf_embargos (gpd.GeoDataFrame): GeoDataFrame de embargos
         gdf_rl (gpd.GeoDataFrame): GeoDataFrame de Reserva Legal
         gdf_app (gpd.GeoDataFrame): GeoDataFrame de APP
+        modo (str): 'soma' ou 'uniao'
         
     Returns:
         dict: Dicionário com áreas calculadas
     """
-    area_total = gdf_imovel.geometry.area.sum() / 10000  # m² -> ha
-    area_embargada = gdf_embargos.geometry.area.sum() / 10000 if not gdf_embargos.empty else 0
-    area_rl = gdf_rl.geometry.area.sum() / 10000 if not gdf_rl.empty else 0
-    area_app = gdf_app.geometry.area.sum() / 10000 if not gdf_app.empty else 0
+    if modo not in MODOS_AREA:
+        raise ValueError(f"Modo de área inválido: {modo} (use {' ou '.join(MODOS_AREA)})")
+    
+    if modo == 'uniao':
+        imovel = shapely.make_valid(shapely.union_all(projetar_geometrias(gdf_imovel)))
+        
+        def unir(gdf):
+            if gdf.empty:
+                return shapely.Polygon()
+            geometrias = _reparar_poligonos(projetar_geometrias(gdf))
+            return shapely.union_all(
+                _recortar_ao_imovel(geometrias, np.full(len(geometrias), imovel, dtype=object))
+            )
+        
+        quebra = quebrar_areas_uniao(
+            np.array([imovel], dtype=object),
+            np.array([unir(gdf_embargos)], dtype=object),
+            np.array([unir(gdf_rl)], dtype=object),
+            np.array([unir(gdf_app)], dtype=object)
+        )
+        area_total = float(quebra['total'][0])
+        area_embargada = float(quebra['embargada'][0])
+        area_rl = float(quebra['reserva_legal'][0])
+        area_app = float(quebra['app'][0])
+    else:
+        area_total = areas_ha(gdf_imovel).sum()
+        area_embargada = areas_ha(gdf_embargos).sum() if not gdf_embargos.empty else 0
+        area_rl = areas_ha(gdf_rl).sum() if not gdf_rl.empty else 0
+        area_app = areas_ha(gdf_app).sum() if not gdf_app.empty else 0
     
     area_util = area_total - area_embargada - area_rl - area_app
     percentual = (area_util / area_total) * 100 if area_total > 0 else 0
@@ -203,3 +1647,104 @@ def cor_por_status(status):
         'Declarado': 'gray'
     }
     return cores.get(status, 'white')
+
+
+# ==================== BUSCA DE IMÓVEIS ====================
+
+MAX_SUGESTOES_IMOVEIS = 20
+_CARACTERES_CPF_CNPJ = set('0123456789.-/ ')  # dígitos e a pontuação de CPF/CNPJ
+
+
+class IndiceImoveis:
+    """
+    Índice ordenado de códigos CAR e CPF/CNPJ para busca por prefixo
+    
+    Os códigos (em maiúsculas) e os CPF/CNPJ (só dígitos) ficam em vetores
+    ordenados: os que começam com o termo digitado formam uma faixa contínua,
+    encontrada por busca binária, sem varrer a carteira nem montar a lista
+    completa de códigos.
+    """
+    
+    def __init__(self, atributos, coluna_cod='cod_imovel'):
+        """
+        Args:
+            atributos (pd.DataFrame): Colunas `coluna_cod` e (opcional) cpf_cnpj da camada area_imovel
+            coluna_cod (str): Coluna com o código do imóvel
+        """
+        codigos = atributos[coluna_cod].to_numpy(dtype=object)
+        chaves = atributos[coluna_cod].astype(str).str.upper().to_numpy(dtype=object)
+        ordem = np.argsort(chaves, kind='stable')
+        self.codigos = codigos
+        self.chaves_codigo = chaves[ordem]
+        self.ordem_codigo = ordem
+        
+        if 'cpf_cnpj' in atributos.columns:
+            cpfs = _normalizar_coluna_cpf(atributos['cpf_cnpj']).to_numpy(dtype=object)
+        else:
+            cpfs = np.full(len(atributos), '', dtype=object)
+        ordem = np.argsort(cpfs, kind='stable')
+        self.chaves_cpf = cpfs[ordem]
+        self.ordem_cpf = ordem
+    
+    def __len__(self):
+        return len(self.codigos)
+    
+    @staticmethod
+    def _faixa(chaves, prefixo):
+        """Início e fim da faixa de `chaves` (ordenadas) que começa com `prefixo`"""
+        inicio = np.searchsorted(chaves, prefixo, side='left')
+        fim = np.searchsorted(chaves, prefixo + '\uffff', side='left')
+        return inicio, fim
+    
+    def buscar(self, termo, limite=MAX_SUGESTOES_IMOVEIS):
+        """
+        Códigos de imóveis cujo código ou CPF/CNPJ começa com `termo`
+        
+        Args:
+            termo (str): Início do código CAR ou do CPF/CNPJ (só dígitos, pontos, traços e barras)
+            limite (int): Máximo de códigos devolvidos
+            
+        Returns:
+            list: Até `limite` códigos, primeiro os que casam pelo código (em ordem alfabética)
+        """
+        termo = (termo or '').strip()
+        inicio, fim = self._faixa(self.chaves_codigo, termo.upper())
+        posicoes = list(self.ordem_codigo[inicio:min(fim, inicio + limite)])
+        
+        # Só termos com cara de CPF/CNPJ: "RO-100" não deve casar com CPFs "100..."
+        digitos = normalizar_cpf_cnpj(termo) if set(termo) <= _CARACTERES_CPF_CNPJ else ''
+        if digitos and len(posicoes) < limite:
+            inicio, fim = self._faixa(self.chaves_cpf, digitos)
+            vistos = set(posicoes)
+            for posicao in self.ordem_cpf[inicio:fim]:
+                if len(posicoes) >= limite:
+                    break
+                if posicao not in vistos:
+                    posicoes.append(posicao)
+                    vistos.add(posicao)
+        
+        return [self.codigos[posicao] for posicao in posicoes]
+
+
+def obter_indice_imoveis(gpkg_path, layer_name='area_imovel', coluna_cod='cod_imovel'):
+    """
+    Retorna o índice de busca dos imóveis, construído uma vez por versão
+    
+    Lê apenas as colunas do código e do CPF/CNPJ, sem geometrias.
+    
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+        layer_name (str): Camada de imóveis
+        coluna_cod (str): Coluna com o código do imóvel
+        
+    Returns:
+        IndiceImoveis: Índice da camada
+    """
+    return obter_derivado_camada(
+        gpkg_path,
+        layer_name,
+        f'indice_imoveis_{coluna_cod}',
+        lambda atributos: IndiceImoveis(atributos, coluna_cod),
+        colunas=[coluna_cod, 'cpf_cnpj'],
+        geometria=False
+    )
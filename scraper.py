@@ -5,12 +5,21 @@ Atualiza a base de dados local com informações recentes
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import geopandas as gpd
 import pandas as pd
-from shapely import wkb
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import argparse
 import os
 import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from proc import registrar_escrita_camada, sanear_geometrias, atualizar_geoparquet
+from sincronizacao import sincronizar_camada, substituir_camada, gravar_camada
 
 # URLs oficiais (APIs públicas)
 URL_IBAMA_EMBARGOS = "https://servicos.ibama.gov.br/ctf/publico/areasembargadas/downloadshape.php"
@@ -18,147 +27,539 @@ URL_ICMBIO_EMBARGOS = "https://geoserver.icmbio.gov.br/geoserver/ows"
 
 GPKG_OUTPUT = "car_embargos.gpkg"
 UF_FILTRO = "RO"  # Rondônia
+TIMEOUT_DOWNLOAD = 60  # segundos
+TAMANHO_PAGINA = 5000  # feições por requisição no modo paginado
 
+# Fontes de embargo: cada uma vira uma camada do GeoPackage. Uma nova fonte
+# só precisa ser registrada aqui; o download é feito em paralelo com as demais.
+# 'campo_id' identifica o embargo entre execuções na sincronização incremental.
+FONTES_EMBARGO = [
+    {
+        'nome': 'IBAMA',
+        'camada': 'embargos_ibama',
+        'url': URL_IBAMA_EMBARGOS,
+        'campo_id': 'num_tad',  # número do Termo de Embargo
+        'params': {
+            'service': 'WFS',
+            'version': '2.0.0',
+            'request': 'GetFeature',
+            'typeName': 'embargos',
+            'outputFormat': 'json',
+            'cql_filter': f"uf='{UF_FILTRO}'"
+        }
+    },
+    {
+        'nome': 'ICMBio',
+        'camada': 'embargos_icmbio',
+        'url': URL_ICMBIO_EMBARGOS,
+        'campo_id': None,  # sem id estável: identifica pelo conteúdo
+        'params': {
+            'service': 'WFS',
+            'version': '1.0.0',
+            'request': 'GetFeature',
+            'typeName': 'embargos_icmbio',
+            'outputFormat': 'json',
+            'cql_filter': f"uf='{UF_FILTRO}'"
+        }
+    }
+]
 
-def limpar_geometrias(gdf):
+
+def limpar_geometrias(gdf, rotulo=None):
     """
     Remove geometrias inválidas e converte para 2D
     
     Args:
         gdf (gpd.GeoDataFrame): GeoDataFrame a limpar
+        rotulo (str): Nome da fonte, para identificar a mensagem (opcional)
         
     Returns:
         gpd.GeoDataFrame: GeoDataFrame limpo
     """
-    def remove_z(geom):
-        if geom and geom.has_z:
-            return wkb.loads(wkb.dumps(geom, output_dimension=2))
-        return geom
-    
-    print("  → Limpando geometrias...")
-    gdf['geometry'] = gdf.geometry.apply(remove_z).buffer(0)
-    gdf = gdf[~gdf.geometry.is_empty].dropna(subset=['geometry'])
-    gdf = gdf[gdf.geometry.is_valid]
+    gdf, relatorio = sanear_geometrias(gdf)
+    print(
+        f"  → Geometrias {rotulo or ''} limpas: "
+        f"{relatorio['z_removido']} com Z convertidas para 2D, "
+        f"{relatorio['reparadas']} reparadas, "
+        f"{relatorio['removidas']} removidas (de {relatorio['entrada']})"
+    )
     
     return gdf
 
 
-def baixar_embargos_ibama():
+def atualizar_copia_geoparquet(gpkg_path, camada):
     """
-    Baixa embargos do IBAMA e filtra por Rondônia
+    Regrava a cópia GeoParquet de uma camada recém-escrita no GeoPackage
+
+    Se falhar, a cópia antiga é ignorada pelo app (que volta a ler o
+    GeoPackage), então o erro apenas é informado.
+
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+        camada (str): Camada que acabou de ser escrita
+    """
+    try:
+        atualizar_geoparquet(gpkg_path, camada)
+    except Exception as e:
+        print(f"  ⚠️ Cópia GeoParquet de '{camada}' não atualizada: {e}")
+
+
+def criar_sessao_http(num_conexoes=len(FONTES_EMBARGO)):
+    """
+    Cria sessão HTTP com pool de conexões keep-alive
     
+    Args:
+        num_conexoes (int): Conexões simultâneas por host
+        
     Returns:
-        gpd.GeoDataFrame: GeoDataFrame com embargos IBAMA
+        requests.Session: Sessão compartilhada pelos downloads
+    """
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=num_conexoes, pool_maxsize=num_conexoes)
+    sessao.mount('https://', adaptador)
+    sessao.mount('http://', adaptador)
+    return sessao
+
+
+def baixar_embargos(fonte, sessao=None, limpar=True):
     """
-    print("📥 Baixando embargos IBAMA...")
+    Baixa os embargos de uma fonte WFS e filtra por Rondônia
     
-    try:
-        # IBAMA disponibiliza via WFS
-        params = {
-            'service': 'WFS',
-            'version': '2.0.0',
-            'request': 'GetFeature',
-            'typeName': 'embargos',
-            'outputFormat': 'json',
-            'cql_filter': f"uf='{UF_FILTRO}'"
-        }
+    Args:
+        fonte (dict): Entrada de FONTES_EMBARGO
+        sessao (requests.Session): Sessão HTTP compartilhada (opcional)
+        limpar (bool): Se False, devolve as feições como vieram da fonte
         
-        response = requests.get(URL_IBAMA_EMBARGOS, params=params, timeout=60)
+    Returns:
+        gpd.GeoDataFrame: GeoDataFrame com os embargos da fonte
+    """
+    print(f"📥 Baixando embargos {fonte['nome']}...")
+    cliente = sessao or requests
+    
+    try:
+        response = cliente.get(fonte['url'], params=fonte['params'], timeout=TIMEOUT_DOWNLOAD)
         
         if response.status_code == 200:
             gdf = gpd.read_file(response.text)
-            gdf = limpar_geometrias(gdf)
-            print(f"  ✅ {len(gdf)} embargos IBAMA baixados")
+            if limpar:
+                gdf = limpar_geometrias(gdf, fonte['nome'])
+            print(f"  ✅ {len(gdf)} embargos {fonte['nome']} baixados")
             return gdf
         else:
-            print(f"  ❌ Erro HTTP {response.status_code}")
+            print(f"  ❌ {fonte['nome']}: Erro HTTP {response.status_code}")
             return gpd.GeoDataFrame()
             
     except Exception as e:
-        print(f"  ❌ Erro: {e}")
+        print(f"  ❌ {fonte['nome']}: Erro: {e}")
         return gpd.GeoDataFrame()
 
 
-def baixar_embargos_icmbio():
+def _parametros_pagina(fonte, inicio, tamanho_pagina):
+    """Parâmetros WFS de uma página (startIndex + count/maxFeatures)"""
+    params = dict(fonte['params'])
+    params['startIndex'] = inicio
+    
+    if str(params.get('version', '')).startswith('2'):
+        params['count'] = tamanho_pagina
+    else:
+        params['maxFeatures'] = tamanho_pagina
+    
+    return params
+
+
+def paginas_wfs(fonte, sessao=None, tamanho_pagina=TAMANHO_PAGINA):
     """
-    Baixa embargos do ICMBio e filtra por Rondônia
+    Percorre uma fonte WFS página a página
     
+    Só uma página (JSON + GeoDataFrame) fica em memória por vez, então o pico
+    de memória depende de `tamanho_pagina`, não do total de embargos.
+    
+    Args:
+        fonte (dict): Entrada de FONTES_EMBARGO
+        sessao (requests.Session): Sessão HTTP compartilhada (opcional)
+        tamanho_pagina (int): Feições por requisição
+        
+    Yields:
+        gpd.GeoDataFrame: Feições da página, ainda sem limpeza
+    """
+    cliente = sessao or requests
+    inicio = 0
+    
+    while True:
+        response = cliente.get(
+            fonte['url'],
+            params=_parametros_pagina(fonte, inicio, tamanho_pagina),
+            timeout=TIMEOUT_DOWNLOAD
+        )
+        response.raise_for_status()
+        
+        feicoes = response.json().get('features', [])
+        if not feicoes:
+            return
+        
+        yield gpd.GeoDataFrame.from_features(feicoes, crs='EPSG:4326')
+        
+        if len(feicoes) < tamanho_pagina:
+            return
+        inicio += len(feicoes)
+
+
+# Escritas no mesmo GeoPackage precisam ser serializadas entre as threads
+_TRAVA_ESCRITA = threading.Lock()
+
+
+def baixar_embargos_paginado(fonte, sessao=None, gpkg_path=GPKG_OUTPUT, tamanho_pagina=TAMANHO_PAGINA):
+    """
+    Baixa uma fonte WFS em páginas, gravando cada página num GeoPackage provisório
+    
+    O GeoPackage de destino não é tocado durante o download: depois da
+    última página a camada é trocada numa única transação
+    (`sincronizacao.substituir_camada`), então o app continua lendo a versão
+    anterior até lá. Se alguma requisição falhar, a camada anterior fica
+    intacta e a função devolve None, para que a atualização não seja dada
+    como concluída com embargos faltando.
+    
+    Args:
+        fonte (dict): Entrada de FONTES_EMBARGO
+        sessao (requests.Session): Sessão HTTP compartilhada (opcional)
+        gpkg_path (str): GeoPackage de destino
+        tamanho_pagina (int): Feições por requisição
+        
     Returns:
-        gpd.GeoDataFrame: GeoDataFrame com embargos ICMBio
+        int: Total de embargos gravados (None se o download falhou)
     """
-    print("📥 Baixando embargos ICMBio...")
+    print(f"📥 Baixando embargos {fonte['nome']} (paginado, {tamanho_pagina} por página)...")
+    camada = fonte['camada']
+    total = 0
     
     try:
-        params = {
-            'service': 'WFS',
-            'version': '1.0.0',
-            'request': 'GetFeature',
-            'typeName': 'embargos_icmbio',
-            'outputFormat': 'json',
-            'cql_filter': f"uf='{UF_FILTRO}'"
-        }
+        with tempfile.TemporaryDirectory() as pasta:
+            provisorio = os.path.join(pasta, f"{camada}.gpkg")
+            
+            for numero, pagina in enumerate(paginas_wfs(fonte, sessao, tamanho_pagina), start=1):
+                pagina = limpar_geometrias(pagina, f"{fonte['nome']} p{numero}")
+                if pagina.empty:
+                    continue
+                pagina.to_file(provisorio, layer=camada, driver='GPKG', mode='w' if total == 0 else 'a')
+                total += len(pagina)
+            
+            # Todas as páginas chegaram: só agora a camada em uso é substituída
+            if total:
+                with _TRAVA_ESCRITA:
+                    substituir_camada(gpkg_path, camada, provisorio)
+                    registrar_escrita_camada(gpkg_path, camada)
+                    atualizar_copia_geoparquet(gpkg_path, camada)
         
-        response = requests.get(URL_ICMBIO_EMBARGOS, params=params, timeout=60)
+        print(f"  ✅ {total} embargos {fonte['nome']} gravados")
+        return total
         
-        if response.status_code == 200:
-            gdf = gpd.read_file(response.text)
-            gdf = limpar_geometrias(gdf)
-            print(f"  ✅ {len(gdf)} embargos ICMBio baixados")
-            return gdf
-        else:
-            print(f"  ❌ Erro HTTP {response.status_code}")
-            return gpd.GeoDataFrame()
-            
     except Exception as e:
-        print(f"  ❌ Erro: {e}")
-        return gpd.GeoDataFrame()
+        print(f"  ❌ {fonte['nome']}: Erro: {e} (camada '{camada}' mantida como estava)")
+        return None
+
+
+def _fonte(camada):
+    """Retorna a fonte registrada para uma camada"""
+    return next(fonte for fonte in FONTES_EMBARGO if fonte['camada'] == camada)
+
+
+def baixar_embargos_ibama(sessao=None):
+    """
+    Baixa embargos do IBAMA e filtra por Rondônia
+    
+    Returns:
+        gpd.GeoDataFrame: GeoDataFrame com embargos IBAMA
+    """
+    return baixar_embargos(_fonte('embargos_ibama'), sessao)
+
+
+def baixar_embargos_icmbio(sessao=None):
+    """
+    Baixa embargos do ICMBio e filtra por Rondônia
+    
+    Returns:
+        gpd.GeoDataFrame: GeoDataFrame com embargos ICMBio
+    """
+    return baixar_embargos(_fonte('embargos_icmbio'), sessao)
+
+
+def baixar_todas_fontes(fontes=FONTES_EMBARGO, baixar=baixar_embargos):
+    """
+    Baixa todas as fontes em paralelo sobre uma sessão HTTP compartilhada
+    
+    O tempo total é o da fonte mais lenta, não a soma das fontes.
+    
+    Args:
+        fontes (list): Fontes a baixar (padrão: FONTES_EMBARGO)
+        baixar (callable): Função (fonte, sessao) -> resultado de cada fonte
+        
+    Returns:
+        dict: {camada: (resultado, segundos)}, na ordem de `fontes`
+    """
+    def baixar_cronometrado(fonte):
+        inicio = time.perf_counter()
+        resultado = baixar(fonte, sessao)
+        return resultado, time.perf_counter() - inicio
+    
+    with criar_sessao_http(len(fontes)) as sessao:
+        with ThreadPoolExecutor(max_workers=len(fontes)) as executor:
+            resultados = list(executor.map(baixar_cronometrado, fontes))
+    
+    return {fonte['camada']: resultado for fonte, resultado in zip(fontes, resultados)}
 
 
-def atualizar_geopackage():
+def sincronizar_fontes(resultados):
+    """
+    Aplica nas camadas apenas o delta entre a fonte e o GeoPackage
+    
+    Args:
+        resultados (dict): {camada: (GeoDataFrame bruto, segundos)}
+        
+    Returns:
+        bool: True se alguma camada foi sincronizada
+    """
+    sucesso = False
+    
+    for fonte in FONTES_EMBARGO:
+        camada = fonte['camada']
+        gdf_bruto = resultados[camada][0]
+        
+        if gdf_bruto.empty:
+            continue
+        
+        try:
+            delta = sincronizar_camada(
+                GPKG_OUTPUT,
+                camada,
+                gdf_bruto,
+                lambda gdf: limpar_geometrias(gdf, fonte['nome']),
+                campo_id=fonte.get('campo_id')
+            )
+            registrar_escrita_camada(GPKG_OUTPUT, camada)
+            atualizar_copia_geoparquet(GPKG_OUTPUT, camada)
+            print(
+                f"🔁 '{camada}': +{delta['inseridos']} inseridos, "
+                f"~{delta['atualizados']} alterados, -{delta['removidos']} removidos, "
+                f"{delta['inalterados']} inalterados"
+            )
+            sucesso = True
+        except Exception as e:
+            print(f"❌ Erro ao sincronizar embargos {fonte['nome']}: {e}")
+    
+    return sucesso
+
+
+def atualizar_geopackage(paginado=False, tamanho_pagina=TAMANHO_PAGINA, incremental=False, progresso=None):
     """
     Atualiza o GeoPackage com dados recentes
     
+    Args:
+        paginado (bool): Baixa e grava em páginas, com memória constante
+        tamanho_pagina (int): Feições por requisição no modo paginado
+        incremental (bool): Aplica só inserções/alterações/remoções (delta)
+        progresso (callable): Recebe (fração 0-1, mensagem) a cada etapa (opcional)
+        
     Returns:
         bool: True se atualização foi bem-sucedida
     """
+    if paginado and incremental:
+        raise ValueError("Os modos paginado e incremental não podem ser combinados")
+    
+    def notificar(fracao, mensagem):
+        if progresso is not None:
+            progresso(fracao, mensagem)
+    
     print("🔄 Iniciando atualização da base de dados...")
     print(f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
     
-    # Baixar dados
-    gdf_ibama = baixar_embargos_ibama()
-    gdf_icmbio = baixar_embargos_icmbio()
+    # Baixar dados (fontes em paralelo)
+    if paginado:
+        def baixar_fonte(fonte, sessao):
+            return baixar_embargos_paginado(fonte, sessao, GPKG_OUTPUT, tamanho_pagina)
+    elif incremental:
+        # A limpeza fica para depois do diff: só o que mudou é limpo
+        def baixar_fonte(fonte, sessao):
+            return baixar_embargos(fonte, sessao, limpar=False)
+    else:
+        baixar_fonte = baixar_embargos
+    
+    concluidas = []
+    
+    def baixar(fonte, sessao):
+        resultado = baixar_fonte(fonte, sessao)
+        concluidas.append(fonte['nome'])
+        notificar(
+            0.8 * len(concluidas) / len(FONTES_EMBARGO),
+            f"{fonte['nome']} baixado ({len(concluidas)}/{len(FONTES_EMBARGO)})"
+        )
+        return resultado
+    
+    notificar(0.0, f"Baixando {len(FONTES_EMBARGO)} fontes...")
+    inicio = time.perf_counter()
+    resultados = baixar_todas_fontes(FONTES_EMBARGO, baixar=baixar)
+    duracao_total = time.perf_counter() - inicio
+    notificar(0.8, "Gravando camadas...")
+    
+    print("\n⏱️ Tempo de download:")
+    for fonte in FONTES_EMBARGO:
+        print(f"   - {fonte['nome']}: {resultados[fonte['camada']][1]:.1f}s")
+    print(f"   - Total (paralelo): {duracao_total:.1f}s\n")
+    
+    if paginado:
+        # As camadas já foram gravadas durante o download; a atualização só
+        # está concluída se todas as fontes chegaram até a última página
+        falhas = [fonte['nome'] for fonte in FONTES_EMBARGO if resultados[fonte['camada']][0] is None]
+        total_embargos = sum(resultado or 0 for resultado, _ in resultados.values())
+        sucesso = not falhas
+        
+        if sucesso:
+            print("✅ Atualização concluída!")
+            print(f"📊 Total: {total_embargos} embargos em Rondônia")
+        else:
+            print(f"❌ Falha no download de {', '.join(falhas)}: camadas mantidas como estavam")
+        return sucesso
+    
+    if incremental:
+        sucesso = sincronizar_fontes(resultados)
+        print("\n✅ Sincronização concluída!" if sucesso else "\n❌ Nenhum dado foi atualizado")
+        return sucesso
     
     # Salvar no GeoPackage
     sucesso = False
+    total_embargos = 0
     
-    if not gdf_ibama.empty:
-        try:
-            gdf_ibama.to_file(GPKG_OUTPUT, layer='embargos_ibama', driver='GPKG')
-            print(f"💾 Camada 'embargos_ibama' atualizada")
-            sucesso = True
-        except Exception as e:
-            print(f"❌ Erro ao salvar embargos IBAMA: {e}")
-    
-    if not gdf_icmbio.empty:
+    for fonte in FONTES_EMBARGO:
+        camada = fonte['camada']
+        gdf = resultados[camada][0]
+        
+        if gdf.empty:
+            continue
+        
         try:
-            gdf_icmbio.to_file(GPKG_OUTPUT, layer='embargos_icmbio', driver='GPKG')
-            print(f"💾 Camada 'embargos_icmbio' atualizada")
+            # Montada à parte e trocada de uma vez: o app não lê a camada pela metade
+            gravar_camada(GPKG_OUTPUT, camada, gdf)
+            registrar_escrita_camada(GPKG_OUTPUT, camada)
+            atualizar_copia_geoparquet(GPKG_OUTPUT, camada)
+            print(f"💾 Camada '{camada}' atualizada")
             sucesso = True
+            total_embargos += len(gdf)
         except Exception as e:
-            print(f"❌ Erro ao salvar embargos ICMBio: {e}")
+            print(f"❌ Erro ao salvar embargos {fonte['nome']}: {e}")
     
     if sucesso:
         print("\n✅ Atualização concluída!")
-        print(f"📊 Total: {len(gdf_ibama) + len(gdf_icmbio)} embargos em Rondônia")
+        print(f"📊 Total: {total_embargos} embargos em Rondônia")
     else:
         print("\n❌ Nenhum dado foi atualizado")
     
     return sucesso
 
 
+# ==================== ATUALIZAÇÃO EM SEGUNDO PLANO ====================
+
+# Estado compartilhado pelo processo: todas as sessões do Streamlit veem a
+# mesma tarefa, e no máximo uma atualização roda por vez.
+_TRAVA_TAREFAS = threading.Lock()
+_TAREFAS = {}
+_MAX_TAREFAS_HISTORICO = 10
+
+
+def _executar_tarefa(tarefa, opcoes):
+    """Corpo da thread de atualização: executa e registra o resultado na tarefa"""
+    def progresso(fracao, mensagem):
+        with _TRAVA_TAREFAS:
+            tarefa['progresso'] = fracao
+            tarefa['mensagem'] = mensagem
+    
+    try:
+        sucesso = atualizar_geopackage(progresso=progresso, **opcoes)
+        estado = 'concluida' if sucesso else 'falhou'
+        mensagem = "Base atualizada" if sucesso else "Nenhum dado foi atualizado"
+    except Exception as e:
+        estado, mensagem = 'falhou', str(e)
+    
+    with _TRAVA_TAREFAS:
+        tarefa.update(estado=estado, mensagem=mensagem, progresso=1.0, fim=datetime.now())
+
+
+def iniciar_atualizacao_background(**opcoes):
+    """
+    Inicia a atualização numa thread do próprio processo
+    
+    Se já houver uma atualização em andamento, nenhuma nova é criada e o id
+    da tarefa em curso é devolvido. Cada camada é montada à parte e trocada
+    no GeoPackage de uma vez (`sincronizacao.substituir_camada`), então as
+    sessões continuam lendo a versão anterior, em cache, até a troca.
+    
+    Args:
+        **opcoes: Repassadas a `atualizar_geopackage` (paginado, incremental, ...)
+        
+    Returns:
+        tuple: (id da tarefa, True se uma nova tarefa foi iniciada)
+    """
+    with _TRAVA_TAREFAS:
+        for tarefa in _TAREFAS.values():
+            if tarefa['estado'] == 'executando':
+                return tarefa['id'], False
+        
+        tarefa = {
+            'id': uuid.uuid4().hex[:8],
+            'estado': 'executando',
+            'progresso': 0.0,
+            'mensagem': "Iniciando...",
+            'inicio': datetime.now(),
+            'fim': None
+        }
+        _TAREFAS[tarefa['id']] = tarefa
+        
+        while len(_TAREFAS) > _MAX_TAREFAS_HISTORICO:
+            del _TAREFAS[next(iter(_TAREFAS))]
+    
+    threading.Thread(
+        target=_executar_tarefa,
+        args=(tarefa, opcoes),
+        name=f"atualizacao-{tarefa['id']}",
+        daemon=True
+    ).start()
+    
+    return tarefa['id'], True
+
+
+def status_atualizacao(id_tarefa=None):
+    """
+    Consulta o andamento de uma atualização em segundo plano
+    
+    Args:
+        id_tarefa (str): Id da tarefa (None = a mais recente)
+        
+    Returns:
+        dict: Cópia do estado da tarefa ('id', 'estado', 'progresso',
+            'mensagem', 'inicio', 'fim'), ou None se não houver
+    """
+    with _TRAVA_TAREFAS:
+        if id_tarefa is None:
+            tarefa = next(reversed(_TAREFAS.values()), None)
+        else:
+            tarefa = _TAREFAS.get(id_tarefa)
+        return dict(tarefa) if tarefa else None
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Atualiza embargos IBAMA/ICMBio no GeoPackage")
+    parser.add_argument('--paginado', action='store_true',
+                        help="Baixa em páginas WFS, gravando cada página (memória constante)")
+    parser.add_argument('--tamanho-pagina', type=int, default=TAMANHO_PAGINA,
+                        help=f"Feições por página no modo paginado (padrão: {TAMANHO_PAGINA})")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Aplica apenas inserções, alterações e remoções desde a última execução")
+    args = parser.parse_args()
+    
     try:
-        atualizar_geopackage()
+        atualizar_geopackage(
+            paginado=args.paginado,
+            tamanho_pagina=args.tamanho_pagina,
+            incremental=args.incremental
+        )
     except Exception as e:
         print(f"\n❌ Erro crítico: {e}")
         sys.exit(1)
@@ -0,0 +1,552 @@
+"""
+Sincronização incremental de camadas de embargo no GeoPackage
+Aplica apenas inserções, alterações e remoções em vez de reescrever a camada
+"""
+
+import math
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+from contextlib import closing
+from datetime import date, datetime
+
+import numpy as np
+import geopandas as gpd
+import pandas as pd
+import shapely
+
+# O estado da sincronização fica num SQLite ao lado do GeoPackage, anexado
+# à mesma conexão: assim ele não aparece como camada para o OGR/fiona e é
+# confirmado na mesma transação que as alterações da camada.
+SUFIXO_ESTADO = ".sync"
+TABELA_ESTADO = "estado.sync_estado"
+
+
+# ==================== IMPRESSÃO DIGITAL DAS FEIÇÕES ====================
+
+def calcular_impressoes(gdf, campo_id=None):
+    """
+    Calcula chave e hash de conteúdo de cada feição
+
+    A chave identifica o embargo entre execuções (campo de id da fonte, ou o
+    próprio hash quando a fonte não tem id). O hash cobre geometria (WKB) e
+    atributos: se mudar, o embargo foi alterado.
+
+    Args:
+        gdf (gpd.GeoDataFrame): Feições como vieram da fonte (antes da limpeza)
+        campo_id (str): Coluna com o identificador do embargo (opcional)
+
+    Returns:
+        pd.DataFrame: Colunas 'chave' e 'hash', com o mesmo índice de `gdf`
+    """
+    atributos = gdf.drop(columns=gdf.geometry.name)
+    atributos = atributos[sorted(atributos.columns)].astype(str)
+    wkb = pd.Series(
+        shapely.to_wkb(np.asarray(gdf.geometry.values), hex=True, output_dimension=3),
+        index=gdf.index
+    ).fillna('')
+
+    hash_atributos = pd.util.hash_pandas_object(atributos, index=False).values
+    hash_geometria = pd.util.hash_pandas_object(wkb, index=False).values
+    hashes = pd.Series(
+        [f"{a:016x}{g:016x}" for a, g in zip(hash_atributos, hash_geometria)],
+        index=gdf.index
+    )
+
+    if campo_id and campo_id in gdf.columns:
+        chaves = gdf[campo_id].astype(str)
+    else:
+        chaves = hashes.copy()
+
+    # Chaves repetidas na fonte viram chave#n para continuarem únicas
+    repeticao = chaves.groupby(chaves).cumcount()
+    chaves = chaves.where(repeticao == 0, chaves + '#' + repeticao.astype(str))
+
+    return pd.DataFrame({'chave': chaves, 'hash': hashes}, index=gdf.index)
+
+
+# ==================== ACESSO DIRETO AO GEOPACKAGE ====================
+
+def _envelope_gpkg(blob):
+    """
+    Lê o envelope (minx, maxx, miny, maxy) de uma geometria GeoPackage
+
+    Returns:
+        tuple: Envelope, ou None se a geometria for vazia
+    """
+    if blob is None:
+        return None
+
+    flags = blob[3]
+    if flags & 0b10000:  # geometria vazia
+        return None
+
+    ordem = '<' if flags & 1 else '>'
+    indicador = (flags >> 1) & 0b111
+    if indicador:
+        return struct.unpack(f'{ordem}4d', blob[8:40])
+
+    tamanhos = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}
+    minx, miny, maxx, maxy = shapely.from_wkb(bytes(blob[8 + tamanhos[indicador]:])).bounds
+    return (minx, maxx, miny, maxy)
+
+
+def _registrar_funcoes_st(conexao):
+    """
+    Registra as funções ST_* usadas pelos gatilhos do índice R-tree
+
+    O GDAL cria gatilhos que chamam ST_MinX, ST_IsEmpty etc. a cada escrita;
+    sem elas o SQLite puro não consegue inserir nem alterar geometrias.
+    """
+    def coordenada(i):
+        def funcao(blob):
+            envelope = _envelope_gpkg(blob)
+            return None if envelope is None else envelope[i]
+        return funcao
+
+    conexao.create_function('ST_MinX', 1, coordenada(0), deterministic=True)
+    conexao.create_function('ST_MaxX', 1, coordenada(1), deterministic=True)
+    conexao.create_function('ST_MinY', 1, coordenada(2), deterministic=True)
+    conexao.create_function('ST_MaxY', 1, coordenada(3), deterministic=True)
+    conexao.create_function(
+        'ST_IsEmpty', 1,
+        lambda blob: 1 if blob is None or _envelope_gpkg(blob) is None else 0,
+        deterministic=True
+    )
+
+
+def _geometria_gpkg(geometria, srs_id):
+    """Codifica uma geometria Shapely no formato binário do GeoPackage"""
+    minx, miny, maxx, maxy = geometria.bounds
+    # 'GP', versão 0, flags: little-endian (bit 0) + envelope xy (indicador 1)
+    cabecalho = b'GP' + bytes([0, 0b011]) + struct.pack('<i4d', srs_id, minx, maxx, miny, maxy)
+    return cabecalho + shapely.to_wkb(geometria, byte_order=1, output_dimension=2)
+
+
+# Tipo simples -> tipo multi correspondente, para ajustar à camada declarada
+_CLASSES_MULTI = {
+    'POINT': shapely.MultiPoint,
+    'LINESTRING': shapely.MultiLineString,
+    'POLYGON': shapely.MultiPolygon
+}
+
+
+def _ajustar_ao_tipo(geometria, tipo):
+    """
+    Converte uma geometria para o tipo declarado da camada
+
+    Polígonos viram MultiPolygon numa camada MULTIPOLYGON e coleções (como as
+    geradas pelo `make_valid`) ficam só com as partes do tipo da camada.
+
+    Args:
+        geometria (shapely.Geometry): Geometria a gravar
+        tipo (str): geometry_type_name da camada (ex.: 'MULTIPOLYGON')
+
+    Returns:
+        shapely.Geometry: Geometria do tipo da camada, ou None se não couber nele
+    """
+    if tipo == 'GEOMETRY' or geometria.geom_type.upper() == tipo:
+        return geometria
+
+    simples = tipo[len('MULTI'):] if tipo.startswith('MULTI') else tipo
+    # Dois níveis: coleção -> multis -> partes simples
+    partes = [
+        parte for parte in shapely.get_parts(shapely.get_parts(geometria))
+        if parte.geom_type.upper() == simples
+    ]
+    if not partes or simples not in _CLASSES_MULTI:
+        return None
+    if tipo.startswith('MULTI'):
+        return _CLASSES_MULTI[simples](partes)
+    return partes[0] if len(partes) == 1 else None
+
+
+def _promover_multi(gdf):
+    """Converte os polígonos simples em MultiPolygon (camada declarada como MULTIPOLYGON)"""
+    geometrias = np.array(gdf.geometry.values, dtype=object)
+    poligonos = shapely.get_type_id(geometrias) == 3
+    if not poligonos.any():
+        return gdf
+
+    geometrias[poligonos] = [shapely.MultiPolygon([geometria]) for geometria in geometrias[poligonos]]
+    gdf = gdf.copy()
+    gdf[gdf.geometry.name] = gpd.GeoSeries(geometrias, index=gdf.index, crs=gdf.crs)
+    return gdf
+
+
+def _valor_sqlite(valor):
+    """Converte valores pandas/numpy para tipos aceitos pelo sqlite3"""
+    if valor is None or valor is pd.NaT:
+        return None
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    if isinstance(valor, np.generic):
+        return _valor_sqlite(valor.item())
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+def _metadados_tabela(conexao, camada):
+    """Retorna (coluna fid, coluna geometria, srs_id, tipo, colunas de atributo)"""
+    coluna_geom, tipo, srs_id = conexao.execute(
+        "SELECT column_name, geometry_type_name, srs_id FROM gpkg_geometry_columns "
+        "WHERE lower(table_name) = lower(?)",
+        (camada,)
+    ).fetchone()
+
+    colunas = conexao.execute(f'PRAGMA table_info("{camada}")').fetchall()
+    coluna_fid = next(nome for _, nome, _, _, _, pk in colunas if pk)
+    atributos = [nome for _, nome, _, _, _, _ in colunas if nome not in (coluna_fid, coluna_geom)]
+
+    return coluna_fid, coluna_geom, srs_id, tipo.upper(), atributos
+
+
+def _conectar(gpkg_path, **kwargs):
+    """Abre o GeoPackage com o banco de estado anexado como 'estado'"""
+    conexao = sqlite3.connect(gpkg_path, **kwargs)
+    conexao.execute("ATTACH DATABASE ? AS estado", (gpkg_path + SUFIXO_ESTADO,))
+    _criar_tabela_estado(conexao)
+    return conexao
+
+
+def _criar_tabela_estado(conexao):
+    conexao.execute(
+        f'CREATE TABLE IF NOT EXISTS {TABELA_ESTADO} ('
+        'camada TEXT NOT NULL, chave TEXT NOT NULL, hash TEXT NOT NULL, fid INTEGER, '
+        'PRIMARY KEY (camada, chave))'
+    )
+
+
+def _camada_existe(conexao, camada):
+    return conexao.execute(
+        "SELECT 1 FROM gpkg_contents WHERE lower(table_name) = lower(?)", (camada,)
+    ).fetchone() is not None
+
+
+def _carregar_estado(conexao, camada):
+    """Retorna o estado salvo {chave: (hash, fid)} ou None se inconsistente"""
+    estado = {
+        chave: (hash_, fid)
+        for chave, hash_, fid in conexao.execute(
+            f'SELECT chave, hash, fid FROM {TABELA_ESTADO} WHERE camada = ?', (camada,)
+        )
+    }
+    if not estado or not _camada_existe(conexao, camada):
+        return None
+
+    # Camada reescrita por fora (ex.: modo completo) sem limpar o estado
+    total_camada = conexao.execute(f'SELECT count(*) FROM "{camada}"').fetchone()[0]
+    total_estado = sum(1 for _, fid in estado.values() if fid is not None)
+    return estado if total_camada == total_estado else None
+
+
+def descartar_estado(gpkg_path, camada):
+    """
+    Esquece o estado de sincronização de uma camada
+
+    Deve ser chamado sempre que a camada for reescrita por inteiro fora desta
+    sincronização; a próxima execução incremental fará uma carga completa.
+
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+        camada (str): Nome da camada
+    """
+    if not os.path.exists(gpkg_path):
+        return
+
+    with closing(_conectar(gpkg_path)) as conexao, conexao:
+        conexao.execute(f'DELETE FROM {TABELA_ESTADO} WHERE camada = ?', (camada,))
+
+
+# ==================== TROCA ATÔMICA DE CAMADA ====================
+
+# Tabelas de metadados do GeoPackage com linhas por camada
+_METADADOS_CAMADA = ('gpkg_contents', 'gpkg_geometry_columns', 'gpkg_extensions', 'gpkg_ogr_contents')
+
+# Espera pelos leitores (app) antes de desistir do COMMIT
+TIMEOUT_TROCA = 60  # segundos
+
+
+def _tabela_existe(conexao, esquema, tabela):
+    return conexao.execute(
+        f"SELECT 1 FROM {esquema}.sqlite_master WHERE type = 'table' AND name = ?", (tabela,)
+    ).fetchone() is not None
+
+
+def _copiar_linhas(conexao, tabela, filtro='', parametros=(), ignorar=False):
+    """INSERT ... SELECT de novo.tabela em main.tabela, pelas colunas em comum"""
+    destino = {linha[1] for linha in conexao.execute(f'PRAGMA main.table_info("{tabela}")')}
+    colunas = ', '.join(
+        f'"{linha[1]}"' for linha in conexao.execute(f'PRAGMA novo.table_info("{tabela}")')
+        if linha[1] in destino
+    )
+    conexao.execute(
+        f'INSERT {"OR IGNORE " if ignorar else ""}INTO main."{tabela}" ({colunas}) '
+        f'SELECT {colunas} FROM novo."{tabela}" {filtro}',
+        parametros
+    )
+
+
+def substituir_camada(gpkg_path, camada, origem_path):
+    """
+    Troca uma camada do GeoPackage pela de outro arquivo numa única transação
+
+    A camada nova é montada por inteiro num GeoPackage provisório; aqui a
+    tabela, o índice R-tree, os gatilhos e os metadados são copiados para o
+    destino e o estado da sincronização incremental é descartado, tudo no
+    mesmo COMMIT. Quem lê o arquivo vê a camada antiga ou a nova, nunca uma
+    parte dela, e uma falha no meio da troca deixa a camada antiga intacta.
+
+    Args:
+        gpkg_path (str): GeoPackage de destino (em uso pelo app)
+        camada (str): Nome da camada
+        origem_path (str): GeoPackage provisório com a camada nova
+    """
+    if not os.path.exists(gpkg_path):
+        # Arquivo ainda inexistente não tem leitores: basta trazê-lo pronto
+        provisorio = gpkg_path + '.novo'
+        shutil.copyfile(origem_path, provisorio)
+        os.replace(provisorio, gpkg_path)
+        descartar_estado(gpkg_path, camada)
+        return
+
+    conexao = _conectar(gpkg_path, isolation_level=None, timeout=TIMEOUT_TROCA)
+    try:
+        conexao.execute("ATTACH DATABASE ? AS novo", (origem_path,))
+        coluna_geom = conexao.execute(
+            "SELECT column_name FROM novo.gpkg_geometry_columns WHERE table_name = ?", (camada,)
+        ).fetchone()[0]
+        rtree = f'rtree_{camada}_{coluna_geom}'
+
+        # Tabela, R-tree e índices primeiro; gatilhos só depois da cópia dos
+        # dados (o R-tree já vem pronto do arquivo provisório)
+        objetos = conexao.execute(
+            "SELECT type, sql FROM novo.sqlite_master "
+            "WHERE sql IS NOT NULL AND (tbl_name = ? OR name = ?)",
+            (camada, rtree)
+        ).fetchall()
+        estruturas = [sql for tipo, sql in objetos if tipo in ('table', 'index')]
+        gatilhos = [sql for tipo, sql in objetos if tipo == 'trigger']
+
+        antiga = conexao.execute(
+            "SELECT column_name FROM main.gpkg_geometry_columns WHERE lower(table_name) = lower(?)", (camada,)
+        ).fetchone()
+
+        conexao.execute('BEGIN')
+        try:
+            if antiga is not None:
+                conexao.execute(f'DROP TABLE IF EXISTS main."rtree_{camada}_{antiga[0]}"')
+            conexao.execute(f'DROP TABLE IF EXISTS main."{camada}"')
+
+            for sql in estruturas:
+                conexao.execute(sql)
+            conexao.execute(f'INSERT INTO main."{camada}" SELECT * FROM novo."{camada}"')
+            if _tabela_existe(conexao, 'novo', rtree):
+                conexao.execute(f'INSERT INTO main."{rtree}" SELECT * FROM novo."{rtree}"')
+            for sql in gatilhos:
+                conexao.execute(sql)
+
+            for tabela in _METADADOS_CAMADA:
+                if not _tabela_existe(conexao, 'novo', tabela):
+                    continue
+                if _tabela_existe(conexao, 'main', tabela):
+                    conexao.execute(
+                        f'DELETE FROM main."{tabela}" WHERE lower(table_name) = lower(?)', (camada,)
+                    )
+                else:
+                    conexao.execute(conexao.execute(
+                        "SELECT sql FROM novo.sqlite_master WHERE type = 'table' AND name = ?", (tabela,)
+                    ).fetchone()[0])
+                _copiar_linhas(conexao, tabela, 'WHERE table_name = ?', (camada,))
+
+            _copiar_linhas(
+                conexao,
+                'gpkg_spatial_ref_sys',
+                'WHERE srs_id IN (SELECT srs_id FROM novo.gpkg_geometry_columns WHERE table_name = ?)',
+                (camada,),
+                ignorar=True
+            )
+
+            # Camada reescrita por inteiro: a próxima sincronização faz carga completa
+            conexao.execute(f'DELETE FROM {TABELA_ESTADO} WHERE camada = ?', (camada,))
+
+            conexao.execute('COMMIT')
+        except Exception:
+            conexao.execute('ROLLBACK')
+            raise
+    finally:
+        conexao.close()
+
+
+def gravar_camada(gpkg_path, camada, gdf):
+    """
+    Grava uma camada inteira sem expor escritas parciais aos leitores
+
+    O GeoDataFrame é escrito num GeoPackage provisório e trocado no destino
+    por `substituir_camada`.
+
+    Args:
+        gpkg_path (str): GeoPackage de destino
+        camada (str): Nome da camada
+        gdf (gpd.GeoDataFrame): Conteúdo novo da camada
+    """
+    with tempfile.TemporaryDirectory() as pasta:
+        provisorio = os.path.join(pasta, f"{camada}.gpkg")
+        gdf.to_file(provisorio, layer=camada, driver='GPKG')
+        substituir_camada(gpkg_path, camada, provisorio)
+
+
+# ==================== SINCRONIZAÇÃO ====================
+
+def _carga_completa(gpkg_path, camada, gdf_bruto, impressoes, limpar):
+    """Primeira execução: grava a camada inteira e registra o estado"""
+    gdf_limpo = limpar(gdf_bruto)
+    if gdf_limpo.empty:
+        return {'inseridos': 0, 'atualizados': 0, 'removidos': 0, 'inalterados': 0}
+
+    # A troca descarta o estado: uma falha antes do registro abaixo leva a
+    # nova carga completa. A camada é declarada MULTIPOLYGON para aceitar os
+    # reparos multipartes que chegarem nas próximas sincronizações.
+    gravar_camada(gpkg_path, camada, _promover_multi(gdf_limpo))
+
+    with closing(_conectar(gpkg_path)) as conexao, conexao:
+        coluna_fid = _metadados_tabela(conexao, camada)[0]
+        fids = [fid for (fid,) in conexao.execute(f'SELECT "{coluna_fid}" FROM "{camada}" ORDER BY "{coluna_fid}"')]
+        fid_por_rotulo = dict(zip(gdf_limpo.index, fids))
+
+        # Feições descartadas pela limpeza ficam no estado com fid nulo,
+        # para não serem reprocessadas a cada execução
+        conexao.executemany(
+            f'INSERT INTO {TABELA_ESTADO} (camada, chave, hash, fid) VALUES (?, ?, ?, ?)',
+            [
+                (camada, linha.chave, linha.hash, fid_por_rotulo.get(rotulo))
+                for rotulo, linha in impressoes.iterrows()
+            ]
+        )
+
+    return {'inseridos': len(gdf_limpo), 'atualizados': 0, 'removidos': 0, 'inalterados': 0}
+
+
+def sincronizar_camada(gpkg_path, camada, gdf_bruto, limpar, campo_id=None):
+    """
+    Sincroniza uma camada do GeoPackage com o conteúdo atual da fonte
+
+    Compara a impressão digital de cada feição com o estado salvo na última
+    execução e aplica, numa única transação, só as inserções, alterações e
+    remoções. Apenas as feições novas ou alteradas passam pela limpeza.
+
+    Args:
+        gpkg_path (str): Caminho para o arquivo .gpkg
+        camada (str): Nome da camada
+        gdf_bruto (gpd.GeoDataFrame): Feições da fonte, antes da limpeza
+        limpar (callable): Função de limpeza (ex.: scraper.limpar_geometrias)
+        campo_id (str): Coluna com o identificador do embargo (opcional)
+
+    Returns:
+        dict: Tamanho do delta: 'inseridos', 'atualizados', 'removidos', 'inalterados'
+    """
+    impressoes = calcular_impressoes(gdf_bruto, campo_id)
+
+    estado = None
+    if os.path.exists(gpkg_path):
+        with closing(_conectar(gpkg_path)) as conexao, conexao:
+            estado = _carregar_estado(conexao, camada)
+
+    if estado is None:
+        return _carga_completa(gpkg_path, camada, gdf_bruto, impressoes, limpar)
+
+    chaves_atuais = set(impressoes['chave'])
+    hash_salvo = impressoes['chave'].map({chave: hash_ for chave, (hash_, _) in estado.items()})
+    novos = hash_salvo.isna()
+    alterados = ~novos & (hash_salvo != impressoes['hash'])
+    removidos = [chave for chave in estado if chave not in chaves_atuais]
+
+    gravar = impressoes[novos | alterados]
+    gdf_limpo = limpar(gdf_bruto.loc[gravar.index]) if len(gravar) else gdf_bruto.iloc[0:0]
+
+    with closing(_conectar(gpkg_path)) as conexao:
+        coluna_fid, coluna_geom, srs_id, tipo, atributos = _metadados_tabela(conexao, camada)
+    atributos = [coluna for coluna in atributos if coluna in gdf_limpo.columns]
+
+    geometrias = [_ajustar_ao_tipo(geometria, tipo) for geometria in gdf_limpo.geometry.values]
+    if any(geometria is None for geometria in geometrias):
+        # Camada criada com tipo simples (ex.: POLYGON) recebendo multipartes:
+        # recria a camada inteira com o tipo multi
+        return _carga_completa(gpkg_path, camada, gdf_bruto, impressoes, limpar)
+
+    conexao = _conectar(gpkg_path, isolation_level=None)
+    _registrar_funcoes_st(conexao)
+
+    try:
+        conexao.execute('BEGIN')
+
+        # Remoções e versões antigas das feições alteradas
+        fids_apagar = [
+            estado[chave][1]
+            for chave in removidos + list(impressoes.loc[alterados, 'chave'])
+            if estado[chave][1] is not None
+        ]
+        conexao.executemany(
+            f'DELETE FROM "{camada}" WHERE "{coluna_fid}" = ?',
+            [(fid,) for fid in fids_apagar]
+        )
+        conexao.executemany(
+            f'DELETE FROM {TABELA_ESTADO} WHERE camada = ? AND chave = ?',
+            [(camada, chave) for chave in removidos]
+        )
+
+        # Inserções (novas e novas versões das alteradas)
+        colunas_sql = ', '.join(f'"{c}"' for c in [coluna_geom] + atributos)
+        marcadores = ', '.join('?' * (len(atributos) + 1))
+        fid_por_rotulo = {}
+
+        for (rotulo, linha), geometria in zip(gdf_limpo.iterrows(), geometrias):
+            cursor = conexao.execute(
+                f'INSERT INTO "{camada}" ({colunas_sql}) VALUES ({marcadores})',
+                [_geometria_gpkg(geometria, srs_id)] + [_valor_sqlite(linha[c]) for c in atributos]
+            )
+            fid_por_rotulo[rotulo] = cursor.lastrowid
+
+        conexao.executemany(
+            f'INSERT OR REPLACE INTO {TABELA_ESTADO} (camada, chave, hash, fid) VALUES (?, ?, ?, ?)',
+            [
+                (camada, linha.chave, linha.hash, fid_por_rotulo.get(rotulo))
+                for rotulo, linha in gravar.iterrows()
+            ]
+        )
+
+        # Metadados da camada: data de alteração e extensão (pelo índice R-tree)
+        conexao.execute(
+            "UPDATE gpkg_contents SET last_change = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') "
+            "WHERE lower(table_name) = lower(?)",
+            (camada,)
+        )
+        rtree = f'rtree_{camada}_{coluna_geom}'
+        if conexao.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (rtree,)).fetchone():
+            extensao = conexao.execute(
+                f'SELECT min(minx), min(miny), max(maxx), max(maxy) FROM "{rtree}"'
+            ).fetchone()
+            conexao.execute(
+                "UPDATE gpkg_contents SET min_x = ?, min_y = ?, max_x = ?, max_y = ? "
+                "WHERE lower(table_name) = lower(?)",
+                (*extensao, camada)
+            )
+
+        conexao.execute('COMMIT')
+
+    except Exception:
+        conexao.execute('ROLLBACK')
+        raise
+
+    finally:
+        conexao.close()
+
+    return {
+        'inseridos': int(novos.sum()),
+        'atualizados': int(alterados.sum()),
+        'removidos': len(removidos),
+        'inalterados': int(len(impressoes) - novos.sum() - alterados.sum())
+    }
@@ -0,0 +1,160 @@
+"""
+Cliente Earth Engine falso para os testes
+
+Imita só a parte da API usada por earth_engine.py: imagens com bandas
+`classification_{ano}`, seleção, aritmética de bandas, reduceRegion,
+reduceRegions e o histograma de frequência. Os pixels são uma grade regular
+de PASSO graus, com classe determinística por ano e posição, então o mesmo
+imóvel sempre produz os mesmos histogramas.
+"""
+
+import threading
+from collections import Counter
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+PASSO = 0.001  # graus entre centros de pixel
+CLASSES = (3, 4, 15, 18, 21, 33)
+ANOS = range(1985, 2024)
+
+
+def classe_pixel(ano, ix, iy):
+    """Classe MapBiomas de cada pixel (ix, iy) no ano"""
+    return np.asarray(CLASSES)[(ix * 7 + iy * 13 + (ano - 1985) * (ix % 3 + 1) + (ano % 7) * iy) % len(CLASSES)]
+
+
+def pixels(geometria):
+    """Índices (ix, iy) dos pixels cujo centro cai dentro da geometria"""
+    xmin, ymin, xmax, ymax = geometria.bounds
+    ix, iy = np.meshgrid(
+        np.arange(int(np.floor(xmin / PASSO)), int(np.ceil(xmax / PASSO))),
+        np.arange(int(np.floor(ymin / PASSO)), int(np.ceil(ymax / PASSO)))
+    )
+    ix, iy = ix.ravel(), iy.ravel()
+    dentro = shapely.contains_xy(geometria, (ix + 0.5) * PASSO, (iy + 0.5) * PASSO)
+    return ix[dentro], iy[dentro]
+
+
+class Geometry:
+    def __init__(self, geojson):
+        self.forma = shape(geojson)
+
+
+class Feature:
+    def __init__(self, geometria, propriedades):
+        self.geometria = geometria
+        self.propriedades = dict(propriedades)
+
+
+class FeatureCollection:
+    def __init__(self, feicoes):
+        self.feicoes = list(feicoes)
+
+
+class Reducer:
+    @staticmethod
+    def frequencyHistogram():
+        return 'frequencyHistogram'
+
+
+class _Resultado:
+    """Objeto remoto: o valor só é calculado (e contado) no getInfo"""
+
+    def __init__(self, cliente, operacao, calcular):
+        self.cliente = cliente
+        self.operacao = operacao
+        self.calcular = calcular
+
+    def getInfo(self):
+        self.cliente.registrar(self.operacao)
+        return self.calcular()
+
+
+class Image:
+    def __init__(self, cliente, bandas):
+        self.cliente = cliente
+        self.bandas = dict(bandas)  # nome -> função(ix, iy) -> valores
+
+    def _unica(self):
+        assert len(self.bandas) == 1, "operação aritmética com mais de uma banda"
+        return next(iter(self.bandas.items()))
+
+    def select(self, nomes):
+        nomes = [nomes] if isinstance(nomes, str) else list(nomes)
+        return Image(self.cliente, {nome: self.bandas[nome] for nome in nomes})
+
+    def multiply(self, fator):
+        nome, valores = self._unica()
+        return Image(self.cliente, {nome: lambda ix, iy: valores(ix, iy) * fator})
+
+    def add(self, outra):
+        nome, valores = self._unica()
+        _, outros = outra._unica()
+        return Image(self.cliente, {nome: lambda ix, iy: valores(ix, iy) + outros(ix, iy)})
+
+    def rename(self, nome):
+        return Image(self.cliente, {nome: self._unica()[1]})
+
+    def _histogramas(self, geometria):
+        ix, iy = pixels(geometria)
+        return {
+            nome: {str(int(valor)): n for valor, n in Counter(valores(ix, iy).tolist()).items()}
+            for nome, valores in self.bandas.items()
+        }
+
+    def reduceRegion(self, reducer, geometry, scale, **opcoes):
+        assert reducer == 'frequencyHistogram'
+        return _Resultado(
+            self.cliente,
+            ('reduceRegion', tuple(self.bandas)),
+            lambda: self._histogramas(geometry.forma)
+        )
+
+    def reduceRegions(self, collection, reducer, scale, **opcoes):
+        assert reducer == 'frequencyHistogram'
+
+        def calcular():
+            feicoes = []
+            for feicao in collection.feicoes:
+                histogramas = self._histogramas(feicao.geometria.forma)
+                if len(histogramas) == 1:
+                    # Como no Earth Engine: uma banda só -> saída com o nome do redutor
+                    histogramas = {'histogram': next(iter(histogramas.values()))}
+                feicoes.append({'type': 'Feature', 'properties': {**feicao.propriedades, **histogramas}})
+            return {'type': 'FeatureCollection', 'features': feicoes}
+
+        return _Resultado(self.cliente, ('reduceRegions', len(collection.feicoes)), calcular)
+
+
+class ClienteEEFalso:
+    """Substitui o módulo `ee` (passado como `cliente=`)"""
+
+    Reducer = Reducer
+
+    def __init__(self):
+        self.chamadas = []
+        self._trava = threading.Lock()
+
+    def registrar(self, operacao):
+        with self._trava:
+            self.chamadas.append(operacao)
+
+    def Image(self, colecao):
+        return Image(self, {
+            f'classification_{ano}': (lambda ix, iy, ano=ano: classe_pixel(ano, ix, iy))
+            for ano in ANOS
+        })
+
+    @staticmethod
+    def Geometry(geojson):
+        return Geometry(geojson)
+
+    @staticmethod
+    def Feature(geometria, propriedades):
+        return Feature(geometria, propriedades)
+
+    @staticmethod
+    def FeatureCollection(feicoes):
+        return FeatureCollection(feicoes)
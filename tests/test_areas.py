@@ -0,0 +1,53 @@
+"""
+Áreas em hectares: CRS_AREA preserva a área do elipsoide em todo o estado, e o
+modo 'uniao' tolera geometrias inválidas nas camadas
+"""
+
+import geopandas as gpd
+import numpy as np
+import pyproj
+import pytest
+import shapely
+from shapely.geometry import Polygon, box
+
+from proc import CRS_AREA, IndiceCamada, MotorAreas, areas_ha, calcular_area_util
+
+
+def test_areas_iguais_as_geodesicas_em_rondonia():
+    # Cantos e centro do estado, onde a Policônica erra de 0,5% a 2%
+    imoveis = gpd.GeoSeries(
+        [box(lon, lat, lon + 0.05, lat + 0.05) for lon, lat in [(-60.2, -8), (-63, -11), (-66.5, -10), (-61, -13.5)]],
+        crs='EPSG:4326'
+    )
+    geod = pyproj.Geod(ellps='GRS80')
+    geodesicas = np.array([abs(geod.geometry_area_perimeter(g)[0]) for g in imoveis]) / 10000
+
+    np.testing.assert_allclose(areas_ha(gpd.GeoDataFrame(geometry=imoveis)), geodesicas, rtol=1e-6)
+
+
+def test_uniao_com_rl_e_app_invalidas_e_sobrepostas():
+    imovel = gpd.GeoDataFrame({'cod_imovel': ['RO-1']}, geometry=[box(-63, -10, -62.99, -9.99)], crs='EPSG:4674')
+    # Gravata auto-intersectante (como as do SICAR) sobreposta a outra RL e a uma APP
+    gravata = Polygon([(-63.005, -10.005), (-62.985, -9.985), (-62.985, -10.005), (-63.005, -9.985)])
+    rl = gpd.GeoDataFrame(geometry=[gravata, box(-62.998, -9.998, -62.992, -9.992)], crs='EPSG:4674')
+    app = gpd.GeoDataFrame(geometry=[gravata, box(-62.996, -10.01, -62.994, -9.98)], crs='EPSG:4674')
+    embargos = gpd.GeoDataFrame(geometry=[box(-63.001, -10.001, -62.997, -9.997)], crs='EPSG:4674')
+
+    motor = MotorAreas(embargos=[IndiceCamada(embargos)], reserva_legal=IndiceCamada(rl), app=IndiceCamada(app))
+    uniao = motor.calcular(imovel, 'uniao').iloc[0]
+    unico = calcular_area_util(imovel, embargos, rl, app, modo='uniao')
+
+    # Referência: as mesmas camadas em CRS_AREA, com a gravata reparada
+    imovel_area = imovel.to_crs(CRS_AREA).geometry.iloc[0]
+
+    def area(gdf):
+        geometrias = shapely.make_valid(gdf.to_crs(CRS_AREA).geometry.values)
+        return shapely.intersection(shapely.union_all(geometrias), imovel_area)
+
+    area_embargo = area(embargos)
+    area_rl = shapely.difference(area(rl), area_embargo)
+    assert uniao['embargada'] == pytest.approx(area_embargo.area / 10000)
+    assert uniao['reserva_legal'] == pytest.approx(area_rl.area / 10000)
+    assert 0 < uniao['app'] < uniao['total']
+    for coluna in ('total', 'embargada', 'reserva_legal', 'app', 'util'):
+        assert unico[coluna] == pytest.approx(uniao[coluna])
@@ -0,0 +1,27 @@
+"""
+Busca de imóveis por prefixo do código CAR ou do CPF/CNPJ
+"""
+
+import pandas as pd
+
+from proc import IndiceImoveis
+
+
+def indice():
+    return IndiceImoveis(pd.DataFrame({
+        'cod_imovel': ['RO-100-A', 'RO-200-B', 'RO-300-C'],
+        'cpf_cnpj': ['123.456.789-00', '100.200.300-40', '98.765.432/0001-10']
+    }))
+
+
+def test_codigo_car_nao_casa_com_digitos_do_cpf():
+    # "RO-100" vira "100", que é o início do CPF do imóvel RO-200-B
+    assert indice().buscar('RO-100') == ['RO-100-A']
+    assert indice().buscar('ro-3') == ['RO-300-C']
+
+
+def test_cpf_cnpj_em_qualquer_formatacao():
+    assert indice().buscar('123') == ['RO-100-A']
+    assert indice().buscar('100.200') == ['RO-200-B']
+    assert indice().buscar('98.765.432/0001') == ['RO-300-C']
+    assert indice().buscar(' 123.456.789-00 ') == ['RO-100-A']
@@ -0,0 +1,103 @@
+"""
+Cache de camadas do GeoPackage: memorização por versão do arquivo e invalidação
+"""
+
+import os
+
+import geopandas as gpd
+import pytest
+from shapely.geometry import box
+
+import proc
+from sincronizacao import gravar_camada
+
+
+@pytest.fixture
+def gpkg_path(tmp_path, monkeypatch):
+    monkeypatch.setenv('BACKEND_CAMADAS', 'gpkg')
+    caminho = str(tmp_path / 'car.gpkg')
+    embargos(['TAD-1', 'TAD-2']).to_file(caminho, layer='embargos_ibama', driver='GPKG')
+    gpd.GeoDataFrame(
+        {'cod_imovel': ['RO-1', 'RO-2'], 'cpf_cnpj': ['1', '2']},
+        geometry=[box(0, 0, 1, 1), box(1, 1, 2, 2)],
+        crs='EPSG:4674'
+    ).to_file(caminho, layer='area_imovel', driver='GPKG')
+    return caminho
+
+
+def embargos(codigos):
+    return gpd.GeoDataFrame(
+        {'num_tad': codigos},
+        geometry=[box(i, i, i + 1, i + 1) for i in range(len(codigos))],
+        crs='EPSG:4674'
+    )
+
+
+@pytest.fixture
+def leituras(monkeypatch):
+    """Camadas lidas do disco, na ordem"""
+    lidas = []
+    ler = proc._ler_camada
+
+    def ler_contando(gpkg_path, layer_name, **opcoes):
+        lidas.append(layer_name)
+        return ler(gpkg_path, layer_name, **opcoes)
+
+    monkeypatch.setattr(proc, '_ler_camada', ler_contando)
+    return lidas
+
+
+def test_segunda_leitura_sai_do_cache(gpkg_path, leituras):
+    antes = proc.estatisticas_cache_camadas()
+    primeira = proc.ler_geodataframe(gpkg_path, 'area_imovel')
+    segunda = proc.ler_geodataframe(gpkg_path, 'area_imovel')
+    depois = proc.estatisticas_cache_camadas()
+
+    assert segunda is primeira
+    assert leituras == ['area_imovel']
+    assert depois['misses'] - antes['misses'] == 1
+    assert depois['hits'] - antes['hits'] == 1
+
+
+def test_projecao_de_colunas_sai_da_camada_em_memoria(gpkg_path, leituras):
+    completa = proc.ler_geodataframe(gpkg_path, 'area_imovel')
+    cpfs = proc.ler_geodataframe(gpkg_path, 'area_imovel', colunas=['cpf_cnpj'], geometria=False)
+
+    assert leituras == ['area_imovel']
+    assert list(cpfs.columns) == ['cpf_cnpj']
+    assert cpfs['cpf_cnpj'].tolist() == completa['cpf_cnpj'].tolist()
+
+
+def test_arquivo_alterado_por_fora_e_relido(gpkg_path, leituras):
+    proc.ler_geodataframe(gpkg_path, 'embargos_ibama')
+
+    # Escrita sem avisar o cache (ex.: outro processo): a assinatura muda
+    embargos(['TAD-1', 'TAD-2', 'TAD-3']).to_file(gpkg_path, layer='embargos_ibama', driver='GPKG')
+    os.utime(gpkg_path, ns=(0, os.stat(gpkg_path).st_mtime_ns + 1))
+
+    assert len(proc.ler_geodataframe(gpkg_path, 'embargos_ibama')) == 3
+    assert leituras == ['embargos_ibama', 'embargos_ibama']
+
+
+def test_escrita_registrada_invalida_so_a_camada_gravada(gpkg_path, leituras):
+    imoveis = proc.ler_geodataframe(gpkg_path, 'area_imovel')
+    indice = proc.obter_indice_camada(gpkg_path, 'area_imovel')
+    proc.ler_geodataframe(gpkg_path, 'embargos_ibama')
+    antes = proc.estatisticas_cache_camadas()
+
+    gravar_camada(gpkg_path, 'embargos_ibama', embargos(['TAD-9']))
+    proc.registrar_escrita_camada(gpkg_path, 'embargos_ibama')
+
+    assert proc.estatisticas_cache_camadas()['invalidacoes'] - antes['invalidacoes'] == 1
+    assert proc.ler_geodataframe(gpkg_path, 'embargos_ibama')['num_tad'].tolist() == ['TAD-9']
+    # A outra camada e seus derivados continuam valendo, sem reler o disco
+    assert proc.ler_geodataframe(gpkg_path, 'area_imovel') is imoveis
+    assert proc.obter_indice_camada(gpkg_path, 'area_imovel') is indice
+    assert leituras == ['area_imovel', 'embargos_ibama', 'embargos_ibama']
+
+
+def test_sem_cache_sempre_le_do_disco(gpkg_path, leituras):
+    proc.ler_geodataframe(gpkg_path, 'area_imovel', usar_cache=False)
+    proc.ler_geodataframe(gpkg_path, 'area_imovel', usar_cache=False)
+
+    assert leituras == ['area_imovel', 'area_imovel']
@@ -0,0 +1,100 @@
+"""
+Compliance em lote: quantidades e áreas por imóvel, serial e em processos
+"""
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import box
+
+import compliance_lote
+from compliance_lote import calcular_compliance_lote, calcular_compliance_paralelo
+
+
+def grade(n, lado, tamanho, deslocamento=0.0, prefixo='RO'):
+    """`n` quadrados numa grade de `lado` colunas, em graus perto de Porto Velho"""
+    geometrias = [
+        box(x, y, x + tamanho, y + tamanho)
+        for i in range(n)
+        for x, y in [(-63 + (i % lado) * 0.01 + deslocamento, -10 + (i // lado) * 0.01 + deslocamento)]
+    ]
+    return gpd.GeoDataFrame(
+        {'cod_imovel': [f"{prefixo}-{i}" for i in range(n)]},
+        geometry=geometrias,
+        crs='EPSG:4674'
+    )
+
+
+@pytest.fixture
+def carteira():
+    imoveis = grade(60, 10, 0.008)
+    imoveis['cpf_cnpj'] = [f"{i:011d}" for i in range(60)]
+    return {
+        'gdf_imoveis': imoveis,
+        'gdf_embargos_ibama': grade(25, 5, 0.012, 0.003, 'TAD'),
+        'gdf_embargos_icmbio': grade(12, 4, 0.009, 0.006, 'ICM'),
+        'gdf_rl': grade(40, 8, 0.006, 0.001, 'RL'),
+        'gdf_app': grade(30, 6, 0.015, 0.004, 'APP')
+    }
+
+
+def test_modo_uniao_conta_embargos_como_o_modo_soma(carteira):
+    soma = calcular_compliance_lote(**carteira, modo_area='soma')
+    uniao = calcular_compliance_lote(**carteira, modo_area='uniao')
+
+    assert soma['embargos_ibama'].sum() > 0 and soma['embargos_icmbio'].sum() > 0
+    np.testing.assert_array_equal(uniao['embargos_ibama'], soma['embargos_ibama'])
+    np.testing.assert_array_equal(uniao['embargos_icmbio'], soma['embargos_icmbio'])
+    # Sem dupla contagem a área restrita nunca passa da soma bruta
+    assert (uniao['area_embargada_ha'] <= soma['area_embargada_ha'] + 1e-9).all()
+
+
+@pytest.mark.parametrize('modo_area', ['soma', 'uniao'])
+def test_processos_iguais_ao_serial(carteira, modo_area):
+    serial = calcular_compliance_lote(**carteira, modo_area=modo_area)
+    paralelo = calcular_compliance_paralelo(**carteira, workers=2, modo_area=modo_area)
+
+    pd.testing.assert_frame_equal(
+        pd.DataFrame(paralelo.drop(columns='geometry')),
+        pd.DataFrame(serial.drop(columns='geometry'))
+    )
+    assert paralelo.geometry.geom_equals(serial.geometry).all()
+
+
+class ExecutorContado:
+    """Executor síncrono que registra quantas partições estão em trânsito a cada envio"""
+
+    def __init__(self, max_workers):
+        self.em_transito = []
+        self.pendentes = 0
+        ExecutorContado.ultimo = self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, funcao, argumentos):
+        self.pendentes += 1
+        self.em_transito.append(self.pendentes)
+        executor = self
+
+        class Futuro:
+            def result(self):
+                executor.pendentes -= 1
+                return funcao(argumentos)
+
+        return Futuro()
+
+
+def test_particoes_enviadas_em_janela_limitada(carteira, monkeypatch):
+    monkeypatch.setattr(compliance_lote, 'ProcessPoolExecutor', ExecutorContado)
+    resultado = calcular_compliance_paralelo(**carteira, workers=2)
+
+    # 8 partições, nunca mais de 2 por processo montadas e à espera
+    em_transito = ExecutorContado.ultimo.em_transito
+    assert len(em_transito) > 4
+    assert max(em_transito) == 4
+    assert resultado['cod_imovel'].tolist() == carteira['gdf_imoveis']['cod_imovel'].tolist()
@@ -0,0 +1,97 @@
+"""
+MapBiomas em lote (reduceRegions) contra um cliente Earth Engine falso
+"""
+
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely.geometry import box, mapping
+
+from earth_engine import CacheEarthEngine, histogramas_mapbiomas, mapbiomas_lote
+from ee_falso import ClienteEEFalso
+
+ANOS = [1990, 2005, 2020]
+
+
+def carteira(n=7):
+    """Imóveis de tamanhos diferentes, com códigos numpy (não serializáveis em JSON)"""
+    return gpd.GeoDataFrame(
+        {'cod_imovel': np.array([f"RO-{i}" for i in range(n)], dtype=object)},
+        geometry=[box(-63 + i * 0.03, -10, -63 + i * 0.03 + 0.005 * (i + 1), -9.99) for i in range(n)],
+        crs='EPSG:4326'
+    )
+
+
+def por_imovel(gdf, anos, tmp_path):
+    """Caminho de referência: uma reduceRegion por imóvel"""
+    cliente = ClienteEEFalso()
+    cache = CacheEarthEngine(str(tmp_path / 'por_imovel.sqlite'))
+    return {
+        codigo: histogramas_mapbiomas(mapping(geometria), anos, cache=cache, cliente=cliente)
+        for codigo, geometria in zip(gdf['cod_imovel'], gdf.geometry)
+    }
+
+
+def como_dicionario(tabela):
+    resultado = {}
+    for linha in tabela.itertuples():
+        resultado.setdefault(linha.cod_imovel, {}).setdefault(linha.ano, {})[linha.classe] = linha.area_ha
+    return resultado
+
+
+@pytest.mark.parametrize('anos', [ANOS, [2020]])
+def test_lote_igual_as_consultas_por_imovel(tmp_path, anos):
+    gdf = carteira()
+    cliente = ClienteEEFalso()
+    tabela = mapbiomas_lote(
+        gdf,
+        anos,
+        cache=CacheEarthEngine(str(tmp_path / 'lote.sqlite')),
+        cliente=cliente,
+        imoveis_por_lote=3,
+        max_paralelo=2
+    )
+
+    # 7 imóveis em lotes de 3: 3 reduceRegions em vez de 7 reduceRegion
+    assert sorted(cliente.chamadas) == [('reduceRegions', 1), ('reduceRegions', 3), ('reduceRegions', 3)]
+    assert list(tabela.columns) == ['cod_imovel', 'ano', 'classe', 'nome_classe', 'area_ha']
+
+    obtido = como_dicionario(tabela)
+    esperado = por_imovel(gdf, anos, tmp_path)
+    assert obtido.keys() == esperado.keys()
+    for codigo in esperado:
+        assert obtido[codigo].keys() == esperado[codigo].keys()
+        for ano in esperado[codigo]:
+            assert obtido[codigo][ano] == pytest.approx(esperado[codigo][ano])
+
+
+def test_lotes_respeitam_limite_de_bytes(tmp_path):
+    cliente = ClienteEEFalso()
+    mapbiomas_lote(
+        carteira(),
+        ANOS,
+        cache=CacheEarthEngine(str(tmp_path / 'lote.sqlite')),
+        cliente=cliente,
+        imoveis_por_lote=100,
+        bytes_por_lote=400  # ~2 geometrias retangulares em GeoJSON
+    )
+
+    tamanhos = [n for _, n in cliente.chamadas]
+    assert sum(tamanhos) == 7
+    assert max(tamanhos) < 7
+
+
+def test_lote_reaproveita_cache_das_consultas_individuais(tmp_path):
+    gdf = carteira()
+    cache = CacheEarthEngine(str(tmp_path / 'cache.sqlite'))
+    individual = ClienteEEFalso()
+    histogramas_mapbiomas(mapping(gdf.geometry.iloc[0]), ANOS, cache=cache, cliente=individual)
+
+    cliente = ClienteEEFalso()
+    mapbiomas_lote(gdf, ANOS, cache=cache, cliente=cliente, imoveis_por_lote=100)
+    assert cliente.chamadas == [('reduceRegions', 6)]
+
+    # Segunda execução: tudo em cache, nenhuma chamada
+    repetido = ClienteEEFalso()
+    mapbiomas_lote(gdf, ANOS, cache=cache, cliente=repetido)
+    assert repetido.chamadas == []
@@ -0,0 +1,80 @@
+"""
+Histogramas e transições MapBiomas em lote, contra um cliente Earth Engine falso
+"""
+
+import pytest
+from shapely.geometry import Polygon, mapping
+
+from earth_engine import (
+    CacheEarthEngine,
+    _decodificar_transicoes,
+    histograma_mapbiomas,
+    histogramas_mapbiomas,
+    matriz_transicao_mapbiomas
+)
+from ee_falso import ANOS, ClienteEEFalso
+
+IMOVEL = mapping(Polygon([(-63.03, -10.03), (-63.0, -10.03), (-63.0, -10.0), (-63.015, -10.01), (-63.03, -10.0)]))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheEarthEngine(str(tmp_path / 'cache.sqlite'))
+
+
+def test_histogramas_em_lote_iguais_aos_anuais(tmp_path, cache):
+    anos = list(ANOS)
+
+    por_ano_cliente = ClienteEEFalso()
+    por_ano_cache = CacheEarthEngine(str(tmp_path / 'por_ano.sqlite'))
+    por_ano = {ano: histograma_mapbiomas(IMOVEL, ano, cache=por_ano_cache, cliente=por_ano_cliente) for ano in anos}
+
+    cliente = ClienteEEFalso()
+    em_lote = histogramas_mapbiomas(IMOVEL, anos, cache=cache, cliente=cliente, anos_por_lote=20)
+
+    assert len(por_ano_cliente.chamadas) == len(anos)
+    assert len(cliente.chamadas) == 2  # 39 bandas em lotes de 20
+    assert em_lote.keys() == por_ano.keys()
+    for ano in anos:
+        assert em_lote[ano] == pytest.approx(por_ano[ano])
+        assert sum(em_lote[ano].values()) > 0
+
+
+def test_histogramas_em_cache_nao_consultam_o_servidor(cache):
+    cliente = ClienteEEFalso()
+    primeiro = histogramas_mapbiomas(IMOVEL, [2000, 2010], cache=cache, cliente=cliente)
+    segundo = histogramas_mapbiomas(IMOVEL, [2000, 2010, 2020], cache=cache, cliente=cliente)
+
+    # Só 2020 faltava no cache
+    assert cliente.chamadas == [
+        ('reduceRegion', ('classification_2000', 'classification_2010')),
+        ('reduceRegion', ('classification_2020',))
+    ]
+    assert segundo[2000] == primeiro[2000]
+    assert segundo[2010] == primeiro[2010]
+
+
+def test_matriz_transicao_bate_com_os_histogramas_anuais(cache):
+    cliente = ClienteEEFalso()
+    transicoes = matriz_transicao_mapbiomas(IMOVEL, 2008, 2020, cache=cache, cliente=cliente)
+    inicial = histograma_mapbiomas(IMOVEL, 2008, cache=cache, cliente=cliente)
+    final = histograma_mapbiomas(IMOVEL, 2020, cache=cache, cliente=cliente)
+
+    # de*100+para decodificado: as margens da matriz são os histogramas de cada ano
+    assert transicoes.groupby('de')['area_ha'].sum().to_dict() == pytest.approx(inicial)
+    assert transicoes.groupby('para')['area_ha'].sum().to_dict() == pytest.approx(final)
+    assert (transicoes['de'] != transicoes['para']).any()
+
+    # Uma única redução para a matriz, e nenhuma na segunda consulta
+    chamadas = len(cliente.chamadas)
+    repetida = matriz_transicao_mapbiomas(IMOVEL, 2008, 2020, cache=cache, cliente=cliente)
+    assert len(cliente.chamadas) == chamadas
+    assert repetida.equals(transicoes)
+
+
+def test_decodifica_codigos_inteiros_e_float():
+    transicoes = _decodificar_transicoes({'315': 10, '1503.0': 4}, 0.09)
+
+    assert transicoes[['de', 'para']].values.tolist() == [[3, 15], [15, 3]]
+    assert transicoes['nome_de'].tolist() == ['Formação Florestal', 'Pastagem']
+    assert transicoes['area_ha'].tolist() == pytest.approx([0.9, 0.36])
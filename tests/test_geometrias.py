@@ -0,0 +1,93 @@
+"""
+Limpeza de geometrias compartilhada por scraper e proc
+"""
+
+import geopandas as gpd
+import shapely
+from shapely.geometry import GeometryCollection, LineString, Polygon, box
+
+from proc import sanear_geometrias, validar_geometria
+from scraper import limpar_geometrias
+
+# Laço em "8": inválido, o reparo devolve dois triângulos
+GRAVATA = Polygon([(0, 0), (2, 2), (2, 0), (0, 2)])
+# Polígono com um "rabo" sem área: o reparo gera uma coleção com uma linha
+COM_RABO = Polygon([(10, 0), (12, 0), (12, 2), (10, 2), (10, 0), (9, 0), (10, 0)])
+
+
+def camada():
+    return gpd.GeoDataFrame(
+        {'id': [1, 2, 3, 4, 5, 6]},
+        geometry=[
+            box(0, 0, 1, 1),
+            Polygon([(0, 0, 5), (1, 0, 5), (1, 1, 5), (0, 1, 5)]),
+            GRAVATA,
+            COM_RABO,
+            None,
+            Polygon(),
+        ],
+        crs='EPSG:4674'
+    )
+
+
+def test_relatorio_por_etapa():
+    gdf = camada()
+    limpo, relatorio = sanear_geometrias(gdf)
+
+    assert relatorio == {'entrada': 6, 'z_removido': 1, 'reparadas': 2, 'removidas': 2}
+    assert limpo['id'].tolist() == [1, 2, 3, 4]
+    assert limpo.crs == gdf.crs
+    assert limpo.geometry.is_valid.all()
+    assert not limpo.geometry.has_z.any()
+
+
+def test_reparo_mantem_so_partes_poligonais():
+    limpo, _ = sanear_geometrias(camada())
+    por_id = dict(zip(limpo['id'], limpo.geometry))
+
+    assert por_id[3].geom_type == 'MultiPolygon'
+    # `make_valid` preserva as duas metades; `buffer(0)` descartaria uma
+    assert por_id[3].area == 2.0
+    assert GRAVATA.buffer(0).area == 1.0
+    assert por_id[4].geom_type == 'Polygon'
+    assert por_id[4].equals(box(10, 0, 12, 2))
+
+
+def test_validas_intocadas_e_entrada_preservada():
+    gdf = camada()
+    originais = gdf.geometry.copy()
+    limpo, _ = sanear_geometrias(gdf)
+
+    # Linhas válidas em 2D saem como o mesmo objeto, sem reparo
+    assert limpo.geometry.iloc[0] is gdf.geometry.iloc[0]
+    assert gdf.geometry.equals(originais)
+    assert gdf.geometry.has_z.iloc[1]
+
+
+def test_geometrias_nao_poligonais_nao_sao_filtradas():
+    gdf = gpd.GeoDataFrame(
+        geometry=[LineString([(0, 0), (1, 1)]), GeometryCollection([box(0, 0, 1, 1)])],
+        crs='EPSG:4674'
+    )
+    limpo, relatorio = sanear_geometrias(gdf)
+
+    assert relatorio['removidas'] == 0
+    assert shapely.equals(limpo.geometry.values, gdf.geometry.values).all()
+
+
+def test_camada_vazia():
+    gdf = gpd.GeoDataFrame({'id': []}, geometry=[], crs='EPSG:4674')
+    limpo, relatorio = sanear_geometrias(gdf)
+
+    assert limpo.empty
+    assert relatorio == {'entrada': 0, 'z_removido': 0, 'reparadas': 0, 'removidas': 0}
+
+
+def test_scraper_e_proc_usam_a_mesma_limpeza(capsys):
+    esperado, _ = sanear_geometrias(camada())
+
+    for limpo in (limpar_geometrias(camada(), 'ibama'), validar_geometria(camada())):
+        assert limpo['id'].tolist() == esperado['id'].tolist()
+        assert limpo.geometry.geom_equals(esperado.geometry).all()
+
+    assert '1 com Z convertidas para 2D, 2 reparadas, 2 removidas (de 6)' in capsys.readouterr().out
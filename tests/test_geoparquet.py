@@ -0,0 +1,139 @@
+"""
+Cópia GeoParquet das camadas: ida e volta, filtro por retângulo e validade
+"""
+
+import time
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from shapely.geometry import Point, box
+
+import proc
+from sincronizacao import sincronizar_camada
+
+
+def camada(n=3000, semente=0):
+    """Feições espalhadas (fora de ordem espacial) com atributos de vários tipos"""
+    gerador = np.random.default_rng(semente)
+    x = gerador.uniform(400000, 500000, n)
+    y = gerador.uniform(8800000, 8900000, n)
+    return gpd.GeoDataFrame(
+        {
+            'cod_imovel': [f"RO-{i}" for i in range(n)],
+            'area_ha': gerador.uniform(1, 500, n),
+            'modulos': gerador.integers(0, 40, n),
+            'ativo': gerador.random(n) > 0.3,
+            'data': pd.date_range('2020-01-01', periods=n, freq='h'),
+            'obs': [None if i % 7 == 0 else f"obs {i}" for i in range(n)]
+        },
+        geometry=[box(a, b, a + 300, b + 200) if i % 5 else Point(a, b) for i, (a, b) in enumerate(zip(x, y))],
+        crs='EPSG:31980'
+    )
+
+
+def test_ida_e_volta_preserva_ordem_tipos_e_crs(tmp_path):
+    original = camada()
+    caminho = str(tmp_path / 'camada.parquet')
+    proc.escrever_geoparquet(original, caminho, linhas_por_grupo=500)
+
+    lido = proc.ler_geoparquet(caminho)
+    assert lido.crs == original.crs
+    assert list(lido.columns) == list(original.columns)
+    pd.testing.assert_frame_equal(pd.DataFrame(lido.drop(columns='geometry')), pd.DataFrame(original.drop(columns='geometry')))
+    assert lido.geometry.geom_equals_exact(original.geometry, tolerance=0).all()
+
+    # GeoParquet padrão: legível pelo geopandas (com as colunas auxiliares)
+    assert gpd.read_parquet(caminho).crs == original.crs
+
+
+def test_projecao_de_colunas(tmp_path):
+    original = camada(200)
+    caminho = str(tmp_path / 'camada.parquet')
+    proc.escrever_geoparquet(original, caminho)
+
+    so_area = proc.ler_geoparquet(caminho, colunas=['area_ha', 'inexistente'])
+    assert list(so_area.columns) == ['area_ha', 'geometry']
+    np.testing.assert_array_equal(so_area['area_ha'], original['area_ha'])
+
+    sem_geometria = proc.ler_geoparquet(caminho, colunas=['cod_imovel'], geometria=False)
+    assert type(sem_geometria) is pd.DataFrame
+    assert list(sem_geometria.columns) == ['cod_imovel']
+
+    filtrado = proc.ler_geoparquet(caminho, colunas=['cod_imovel'], atributos={'modulos': [3, 7]})
+    esperado = original[original['modulos'].isin([3, 7])]
+    assert filtrado['cod_imovel'].tolist() == esperado['cod_imovel'].tolist()
+
+
+def test_filtro_por_retangulo_descarta_grupos_de_linhas(tmp_path):
+    original = camada()
+    caminho = str(tmp_path / 'camada.parquet')
+    proc.escrever_geoparquet(original, caminho, linhas_por_grupo=100)
+    retangulo = (420000, 8820000, 440000, 8840000)
+
+    lido = proc.ler_geoparquet(caminho, colunas=['cod_imovel'], bbox=retangulo)
+
+    # Exatamente as feições cujo envelope toca o retângulo, na ordem da camada
+    limites = original.geometry.bounds
+    toca = (
+        (limites['maxx'] >= retangulo[0]) & (limites['minx'] <= retangulo[2])
+        & (limites['maxy'] >= retangulo[1]) & (limites['miny'] <= retangulo[3])
+    )
+    assert 0 < toca.sum() < len(original)
+    assert lido['cod_imovel'].tolist() == original.loc[toca, 'cod_imovel'].tolist()
+
+    # Ordenação espacial: a maioria dos grupos nem toca o retângulo pelas estatísticas
+    metadados = pq.ParquetFile(caminho).metadata
+    nomes = metadados.schema.names
+    tocados = 0
+    for i in range(metadados.num_row_groups):
+        grupo = metadados.row_group(i)
+        estatistica = {nome: grupo.column(nomes.index(nome)).statistics for nome in proc.COLUNAS_ENVELOPE}
+        tocados += (
+            estatistica['_xmax'].max >= retangulo[0] and estatistica['_xmin'].min <= retangulo[2]
+            and estatistica['_ymax'].max >= retangulo[1] and estatistica['_ymin'].min <= retangulo[3]
+        )
+    assert tocados < metadados.num_row_groups / 4
+
+
+def test_copia_desatualizada_quando_a_camada_muda(tmp_path, monkeypatch):
+    monkeypatch.delenv('BACKEND_CAMADAS', raising=False)
+    gpkg_path = str(tmp_path / 'car.gpkg')
+    embargos = gpd.GeoDataFrame({'num_tad': ['TAD-1', 'TAD-2']}, geometry=[box(0, 0, 1, 1), box(2, 2, 3, 3)], crs='EPSG:4674')
+    sincronizar_camada(gpkg_path, 'embargos', embargos, lambda gdf: gdf, 'num_tad')
+    gpd.GeoDataFrame({'cod_imovel': ['RO-1']}, geometry=[box(0, 0, 5, 5)], crs='EPSG:4674').to_file(
+        gpkg_path, layer='area_imovel', driver='GPKG'
+    )
+
+    assert not proc.geoparquet_atualizado(gpkg_path, 'embargos')
+    proc.exportar_geoparquet(gpkg_path)
+    assert proc.geoparquet_atualizado(gpkg_path, 'embargos')
+    assert proc.geoparquet_atualizado(gpkg_path, 'area_imovel')
+
+    # Delta da sincronização incremental: muda o last_change só de 'embargos'
+    time.sleep(0.01)
+    alterados = embargos.assign(num_tad=['TAD-1', 'TAD-3'])
+    sincronizar_camada(gpkg_path, 'embargos', alterados, lambda gdf: gdf, 'num_tad')
+
+    assert not proc.geoparquet_atualizado(gpkg_path, 'embargos')
+    assert proc.geoparquet_atualizado(gpkg_path, 'area_imovel')
+    # Cópia vencida é ignorada: a leitura vem do GeoPackage
+    assert sorted(proc._ler_camada(gpkg_path, 'embargos')['num_tad']) == ['TAD-1', 'TAD-3']
+
+    proc.atualizar_geoparquet(gpkg_path, 'embargos')
+    assert proc.geoparquet_atualizado(gpkg_path, 'embargos')
+
+
+@pytest.mark.parametrize('backend', ['auto', 'gpkg'])
+def test_leitura_igual_pelos_dois_backends(tmp_path, monkeypatch, backend):
+    gpkg_path = str(tmp_path / 'car.gpkg')
+    original = camada(500).drop(columns='data')
+    original.to_file(gpkg_path, layer='area_imovel', driver='GPKG')
+    proc.exportar_geoparquet(gpkg_path)
+    monkeypatch.setenv('BACKEND_CAMADAS', backend)
+
+    lido = proc._ler_camada(gpkg_path, 'area_imovel', colunas=['cod_imovel'], bbox=(420000, 8820000, 460000, 8860000))
+    esperado = gpd.read_file(gpkg_path, layer='area_imovel', bbox=(420000, 8820000, 460000, 8860000))
+    assert sorted(lido['cod_imovel']) == sorted(esperado['cod_imovel'])
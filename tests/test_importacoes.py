@@ -0,0 +1,31 @@
+"""
+Inicialização do app: bibliotecas pesadas só são importadas quando usadas
+"""
+
+import importlib.util
+
+import pytest
+
+from benchmarks.tempo_inicializacao import RAIZ, medir_importacao
+
+# Adiadas até a seção que as usa (gráficos, Earth Engine, planilha, laudo PDF)
+PESADAS = {'plotly', 'ee', 'geemap', 'openpyxl', 'reportlab'}
+
+
+@pytest.mark.parametrize('modulo', ['proc', 'scraper', 'earth_engine', 'compliance_lote'])
+def test_modulos_importados_pelo_app_nao_carregam_bibliotecas_pesadas(modulo):
+    total_ms, _, carregados = medir_importacao(modulo, RAIZ)
+
+    assert total_ms > 0
+    assert modulo in carregados
+    assert not carregados & PESADAS
+
+
+def test_app_nao_carrega_bibliotecas_pesadas():
+    if importlib.util.find_spec('streamlit') is None or importlib.util.find_spec('streamlit_folium') is None:
+        pytest.skip("Streamlit não instalado")
+
+    _, diretos, carregados = medir_importacao('app', RAIZ)
+
+    assert {'proc', 'scraper', 'earth_engine'} <= {nome for nome, _ in diretos}
+    assert not carregados & PESADAS
@@ -0,0 +1,78 @@
+"""
+Índice de CPF/CNPJ dos embargos: normalização e equivalência com a varredura
+"""
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import box
+
+from proc import IndiceCpfCnpj, contar_embargos_por_cpf, normalizar_cpf_cnpj
+
+
+def embargos(cpfs):
+    return gpd.GeoDataFrame({'cpf_cnpj': cpfs}, geometry=[box(i, 0, i + 1, 1) for i in range(len(cpfs))])
+
+
+@pytest.fixture
+def camadas():
+    return {
+        'embargos_ibama': embargos(['123.456.789-00', '12345678900', None, '', '12.345.678/0001-90', 'não informado']),
+        # Coluna numérica (como lida de uma fonte sem formatação): floats e zeros à esquerda perdidos
+        'embargos_icmbio': embargos([12345678900.0, 1234567890.0, np.nan])
+    }
+
+
+@pytest.mark.parametrize('valor, esperado', [
+    ('123.456.789-00', '12345678900'),
+    (' 123 456 789 00 ', '12345678900'),
+    ('12.345.678/0001-90', '12345678000190'),
+    (12345678900, '12345678900'),
+    (12345678900.0, '12345678900'),
+    (1234567890.0, '01234567890'),
+    (np.int64(1234567000190), '01234567000190'),
+    (None, ''),
+    (np.nan, ''),
+    ('', ''),
+])
+def test_normalizacao(valor, esperado):
+    assert normalizar_cpf_cnpj(valor) == esperado
+
+
+@pytest.mark.parametrize('cpf, esperado', [
+    ('123.456.789-00', 3),
+    ('12345678900', 3),
+    ('012.345.678-90', 1),
+    ('12.345.678/0001-90', 1),
+    ('999.999.999-99', 0),
+    # Vazio ou ausente nunca casa com os embargos sem CPF/CNPJ
+    ('', 0),
+    (None, 0),
+    (np.nan, 0),
+])
+def test_indice_igual_a_varredura(camadas, cpf, esperado):
+    indice = IndiceCpfCnpj(camadas)
+    varredura = contar_embargos_por_cpf(cpf, camadas['embargos_ibama'], camadas['embargos_icmbio'])
+
+    assert indice.contar(cpf) == varredura == esperado
+
+
+def test_contagem_em_lote_igual_a_individual(camadas):
+    indice = IndiceCpfCnpj(camadas)
+    cpfs = pd.Series(['123.456.789-00', None, '', '01234567890', '12345678000190', '1'], index=[10, 11, 12, 13, 14, 15])
+
+    totais = indice.contar_lote(cpfs)
+    assert totais.index.tolist() == cpfs.index.tolist()
+    assert totais.tolist() == [indice.contar(cpf) for cpf in cpfs] == [3, 0, 0, 1, 1, 0]
+
+
+def test_linhas_por_camada_e_reindexacao_de_uma_camada(camadas):
+    indice = IndiceCpfCnpj(camadas)
+    linhas = indice.linhas('123.456.789-00')
+    assert linhas['embargos_ibama'].tolist() == [0, 1]
+    assert linhas['embargos_icmbio'].tolist() == [0]
+
+    # Atualização só do ICMBio: o IBAMA continua indexado
+    indice.atualizar_camada('embargos_icmbio', embargos(['123.456.789-00', '123.456.789-00']))
+    assert indice.contar('12345678900') == 4
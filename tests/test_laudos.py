@@ -0,0 +1,119 @@
+"""
+Laudos PDF em lote: pasta, ZIP, processos e exportação da carteira
+"""
+
+import io
+import os
+import zipfile
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from reportlab import rl_config
+
+from laudos import exportar_carteira, gerar_laudos_lote, main, nome_arquivo_laudo
+
+DATA = datetime(2024, 3, 15)
+
+
+@pytest.fixture(autouse=True)
+def pdf_deterministico(monkeypatch):
+    # Sem data de criação nem identificador aleatório no PDF: laudos comparáveis byte a byte
+    monkeypatch.setattr(rl_config, 'invariant', 1)
+    monkeypatch.setenv('RL_invariant', '1')
+
+
+@pytest.fixture
+def resultado():
+    n = 7
+    return pd.DataFrame({
+        'cod_imovel': [f'RO-110000{i}-{i:04d}' for i in range(n - 1)] + ['RO/com espaço'],
+        'status_validacao': ['AT'] * n,
+        'area_total_ha': [100.0 + i for i in range(n)],
+        'area_embargada_ha': [float(i) for i in range(n)],
+        'area_reserva_legal_ha': [20.0] * n,
+        'area_app_ha': [5.0] * n,
+        'area_util_ha': [75.0 - i for i in range(n)],
+        'percentual_util': [75.0] * n,
+        'embargos_ibama': list(range(n)),
+        'embargos_icmbio': [0] * n,
+        'risco': ['✅ Baixo Risco'] * n,
+        'score_risco': [0] * n,
+        'geometry': [None] * n
+    })
+
+
+def nomes_esperados(resultado):
+    return [nome_arquivo_laudo(codigo, DATA) for codigo in resultado['cod_imovel']]
+
+
+def laudos_do_zip(caminho):
+    with zipfile.ZipFile(caminho) as arquivo:
+        return [(nome, arquivo.read(nome)) for nome in arquivo.namelist()]
+
+
+def test_laudos_em_pasta(resultado, tmp_path):
+    destino = tmp_path / 'laudos'
+    estatisticas = gerar_laudos_lote(resultado, str(destino), data=DATA, laudos_por_bloco=3)
+
+    assert sorted(os.listdir(destino)) == sorted(nomes_esperados(resultado))
+    # Barra e espaço do código não viram caminho no nome do arquivo
+    assert 'laudo_esg_RO_com_espaço_20240315.pdf' in os.listdir(destino)
+    assert estatisticas['laudos'] == estatisticas['paginas'] == len(resultado)
+    assert estatisticas['bytes'] == sum(f.stat().st_size for f in destino.iterdir())
+    assert all(f.read_bytes().startswith(b'%PDF') for f in destino.iterdir())
+
+
+def test_zip_na_ordem_da_entrada_com_resumo(resultado, tmp_path):
+    destino = tmp_path / 'laudos.zip'
+    gerar_laudos_lote(resultado, str(destino), data=DATA, laudos_por_bloco=3, resumo='csv')
+
+    with zipfile.ZipFile(destino) as arquivo:
+        nomes = arquivo.namelist()
+        resumo = pd.read_csv(arquivo.open(nomes[0]), encoding='utf-8-sig')
+
+    assert nomes == ['compliance_20240315.csv'] + nomes_esperados(resultado)
+    pd.testing.assert_frame_equal(resumo, resultado.drop(columns='geometry'))
+
+
+def test_processos_iguais_ao_serial(resultado, tmp_path):
+    gerar_laudos_lote(resultado, str(tmp_path / 'serial.zip'), data=DATA, laudos_por_bloco=2)
+    gerar_laudos_lote(resultado, str(tmp_path / 'paralelo.zip'), data=DATA, laudos_por_bloco=2, workers=2)
+
+    assert laudos_do_zip(tmp_path / 'paralelo.zip') == laudos_do_zip(tmp_path / 'serial.zip')
+
+
+@pytest.mark.parametrize('max_memoria, em_disco', [(32 * 1024 * 1024, False), (1024, True)])
+def test_exportar_carteira(resultado, max_memoria, em_disco):
+    arquivo, estatisticas = exportar_carteira(resultado, resumo='xlsx', max_memoria=max_memoria, data=DATA)
+
+    with arquivo:
+        assert arquivo.tell() == 0
+        assert arquivo._rolled == em_disco
+        conteudo = arquivo.read()
+
+    assert estatisticas['bytes_zip'] == len(conteudo)
+    with zipfile.ZipFile(io.BytesIO(conteudo)) as zip_carteira:
+        assert zip_carteira.namelist() == ['compliance_20240315.xlsx'] + nomes_esperados(resultado)
+        resumo = pd.read_excel(zip_carteira.open('compliance_20240315.xlsx'), sheet_name='Compliance')
+
+    assert resumo['cod_imovel'].tolist() == resultado['cod_imovel'].tolist()
+    assert resumo['area_total_ha'].tolist() == resultado['area_total_ha'].tolist()
+
+
+def test_resumo_invalido(resultado, tmp_path):
+    with pytest.raises(ValueError, match='Formato de resumo inválido'):
+        gerar_laudos_lote(resultado, str(tmp_path / 'laudos.zip'), resumo='pdf')
+
+
+def test_linha_de_comando(resultado, tmp_path):
+    entrada = tmp_path / 'compliance_carteira.parquet'
+    resultado.drop(columns='geometry').to_parquet(entrada)
+    saida = tmp_path / 'laudos.zip'
+
+    main(['--entrada', str(entrada), '--saida', str(saida), '--resumo', 'csv'])
+
+    with zipfile.ZipFile(saida) as arquivo:
+        nomes = arquivo.namelist()
+    assert len(nomes) == len(resultado) + 1
+    assert nomes[0].endswith('.csv')
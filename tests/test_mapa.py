@@ -0,0 +1,28 @@
+"""
+GeoJSON do mapa: zoom ajustado ao imóvel e estatísticas sem custo extra
+"""
+
+import geopandas as gpd
+from shapely.geometry import Point
+
+from proc import preparar_geojson, tolerancia_zoom, zoom_para_extensao
+
+
+def test_zoom_acompanha_o_tamanho_do_imovel():
+    pequeno = zoom_para_extensao((-63.0, -10.0, -62.99, -9.99), 800, 600)
+    grande = zoom_para_extensao((-63.5, -10.5, -62.5, -9.5), 800, 600)
+
+    assert pequeno > grande
+    assert tolerancia_zoom(pequeno + 3, -10) < tolerancia_zoom(grande + 3, -10)
+    assert zoom_para_extensao((-63.0, -10.0, -63.0, -10.0), 800, 600) == 18
+
+
+def test_tamanho_original_so_medido_sob_demanda():
+    gdf = gpd.GeoDataFrame({'cod_imovel': ['RO-1']}, geometry=[Point(-63, -10).buffer(0.01, 64)], crs='EPSG:4326')
+
+    _, estatisticas = preparar_geojson(gdf, 14, colunas=('cod_imovel',))
+    assert estatisticas['bytes_antes'] is None
+    assert estatisticas['vertices_depois'] < estatisticas['vertices_antes']
+
+    _, medidas = preparar_geojson(gdf, 14, colunas=('cod_imovel',), medir_original=True)
+    assert medidas['bytes_antes'] > medidas['bytes_depois'] == estatisticas['bytes_depois']
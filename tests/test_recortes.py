@@ -0,0 +1,63 @@
+"""
+Leitura de recortes da camada: esquema, CRS e índices em cache por versão
+"""
+
+import geopandas as gpd
+import pytest
+from shapely.geometry import box
+
+import proc
+
+
+@pytest.fixture
+def gpkg_path(tmp_path):
+    caminho = str(tmp_path / 'car.gpkg')
+    gpd.GeoDataFrame(
+        {'num_tad': ['TAD-1', 'TAD-2'], 'area_ha': [1.0, 2.0]},
+        geometry=[box(0, 0, 1, 1), box(5, 5, 6, 6)],
+        crs='EPSG:4674'
+    ).to_file(caminho, layer='embargos_ibama', driver='GPKG')
+    gpd.GeoDataFrame(
+        {'cod_imovel': ['RO-1']},
+        geometry=[box(0.5, 0.5, 2, 2)],
+        crs='EPSG:4674'
+    ).to_file(caminho, layer='imoveis', driver='GPKG')
+    return caminho
+
+
+def test_recorte_vazio_mantem_colunas_pedidas(gpkg_path):
+    vazio = proc.ler_geodataframe(gpkg_path, 'embargos_ibama', mask=box(10, 10, 11, 11), colunas=['num_tad'])
+
+    assert vazio.empty
+    assert list(vazio.columns) == ['num_tad', 'geometry']
+    assert vazio.crs == 'EPSG:4674'
+    assert vazio['num_tad'].tolist() == []
+
+
+def test_crs_lido_uma_vez_por_versao(gpkg_path, monkeypatch):
+    leituras = []
+    ler = gpd.read_file
+    monkeypatch.setattr(proc.gpd, 'read_file', lambda *a, **k: leituras.append(k) or ler(*a, **k))
+
+    assert proc.crs_camada(gpkg_path, 'imoveis') == 'EPSG:4674'
+    assert proc.crs_camada(gpkg_path, 'imoveis') == 'EPSG:4674'
+    assert len(leituras) == 1
+
+    # Outra camada gravada: o esquema de 'imoveis' continua valendo
+    gpd.GeoDataFrame({'x': [1]}, geometry=[box(0, 0, 1, 1)], crs='EPSG:4674').to_file(
+        gpkg_path, layer='app', driver='GPKG'
+    )
+    proc.registrar_escrita_camada(gpkg_path, 'app')
+    proc.crs_camada(gpkg_path, 'imoveis')
+    assert len(leituras) == 1
+
+
+def test_motor_do_recorte_reaproveitado_e_igual_ao_da_camada(gpkg_path):
+    imovel = gpd.read_file(gpkg_path, layer='imoveis')
+    camadas = ['embargos_ibama', 'imoveis']
+
+    motor = proc.obter_motor_areas(gpkg_path, camadas, mask=imovel)
+    assert proc.obter_motor_areas(gpkg_path, camadas, mask=imovel).embargos[0] is motor.embargos[0]
+
+    esperado = proc.obter_motor_areas(gpkg_path, camadas).calcular(imovel)
+    assert motor.calcular(imovel).equals(esperado)
@@ -0,0 +1,226 @@
+"""
+Download paginado do WFS contra um servidor local que imita o GeoServer
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import geopandas as gpd
+import pandas as pd
+import pytest
+from shapely.geometry import box
+
+import proc
+import scraper
+
+TOTAL_FEICOES = 23
+TAMANHO_PAGINA = 10
+
+
+def feicoes_wfs(total=TOTAL_FEICOES):
+    """Embargos fictícios em Rondônia, no formato GeoJSON do WFS"""
+    return [
+        {
+            'type': 'Feature',
+            'properties': {'num_tad': f"TAD-{i:03d}", 'uf': 'RO', 'area_ha': 10.0 + i},
+            'geometry': box(-63 + i * 0.01, -10, -63 + i * 0.01 + 0.005, -9.995).__geo_interface__
+        }
+        for i in range(total)
+    ]
+
+
+class ServidorWFS:
+    """Servidor HTTP local que responde GetFeature com startIndex/count ou maxFeatures"""
+
+    def __init__(self, feicoes, falhar_em=None, ao_requisitar=None):
+        self.feicoes = feicoes
+        self.falhar_em = falhar_em  # startIndex que responde com erro 500
+        self.ao_requisitar = ao_requisitar  # chamado a cada requisição, antes da resposta
+        self.requisicoes = []
+
+        servidor = self
+
+        class Manipulador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                servidor.requisicoes.append(params)
+                if servidor.ao_requisitar is not None:
+                    servidor.ao_requisitar()
+
+                inicio = int(params.get('startIndex', 0))
+                if servidor.falhar_em is not None and inicio == servidor.falhar_em:
+                    self.send_error(500, "Falha simulada")
+                    return
+
+                quantidade = params.get('count', params.get('maxFeatures'))
+                fim = inicio + int(quantidade) if quantidade is not None else None
+                corpo = json.dumps({
+                    'type': 'FeatureCollection',
+                    'features': servidor.feicoes[inicio:fim]
+                }).encode()
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.http = ThreadingHTTPServer(('127.0.0.1', 0), Manipulador)
+        self.url = f"http://127.0.0.1:{self.http.server_address[1]}/geoserver/ows"
+        self.thread = threading.Thread(target=self.http.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.http.shutdown()
+        self.http.server_close()
+
+
+def fonte_local(url, camada='embargos_teste', versao='2.0.0'):
+    """Entrada no formato de FONTES_EMBARGO apontando para o servidor local"""
+    return {
+        'nome': camada,
+        'camada': camada,
+        'url': url,
+        'campo_id': 'num_tad',
+        'params': {
+            'service': 'WFS',
+            'version': versao,
+            'request': 'GetFeature',
+            'typeName': camada,
+            'outputFormat': 'json'
+        }
+    }
+
+
+def camada_anterior(gpkg_path, camada):
+    """Grava uma versão anterior da camada, que não pode ser perdida"""
+    anterior = gpd.GeoDataFrame.from_features(feicoes_wfs(5), crs='EPSG:4326')
+    anterior['num_tad'] = 'ANTERIOR-' + anterior['num_tad']
+    anterior.to_file(gpkg_path, layer=camada, driver='GPKG')
+    return gpd.read_file(gpkg_path, layer=camada)
+
+
+def assert_mesmas_feicoes(obtido, esperado):
+    atributos = [c for c in esperado.columns if c != 'geometry']
+    pd.testing.assert_frame_equal(
+        obtido[atributos].reset_index(drop=True),
+        esperado[atributos].reset_index(drop=True),
+        check_dtype=False
+    )
+    assert obtido.geometry.reset_index(drop=True).geom_equals(esperado.geometry.reset_index(drop=True)).all()
+
+
+@pytest.mark.parametrize('versao', ['2.0.0', '1.0.0'])
+def test_paginado_igual_ao_download_unico(tmp_path, versao):
+    gpkg_path = str(tmp_path / 'embargos.gpkg')
+
+    with ServidorWFS(feicoes_wfs()) as servidor:
+        fonte = fonte_local(servidor.url, versao=versao)
+        unico = scraper.baixar_embargos(fonte)
+        total = scraper.baixar_embargos_paginado(fonte, gpkg_path=gpkg_path, tamanho_pagina=TAMANHO_PAGINA)
+
+    paginas = [p for p in servidor.requisicoes if 'startIndex' in p]
+    assert [int(p['startIndex']) for p in paginas] == [0, 10, 20]
+    assert all(p['count' if versao.startswith('2') else 'maxFeatures'] == str(TAMANHO_PAGINA) for p in paginas)
+
+    assert total == TOTAL_FEICOES == len(unico)
+    assert_mesmas_feicoes(gpd.read_file(gpkg_path, layer=fonte['camada']), unico)
+
+
+def test_geopackage_em_uso_intocado_ate_a_ultima_pagina(tmp_path):
+    gpkg_path = str(tmp_path / 'embargos.gpkg')
+    camada_anterior(gpkg_path, 'embargos_teste')
+    gpd.GeoDataFrame({'cod_imovel': ['RO-1']}, geometry=[box(-63, -10, -62, -9)], crs='EPSG:4674').to_file(
+        gpkg_path, layer='area_imovel', driver='GPKG'
+    )
+    assinatura = proc.assinatura_arquivo(gpkg_path)
+    vistas = []
+
+    def ao_requisitar():
+        # O que o app veria durante o download: arquivo sem mudanças e camada antiga inteira
+        vistas.append((proc.assinatura_arquivo(gpkg_path), len(gpd.read_file(gpkg_path, layer='embargos_teste'))))
+
+    with ServidorWFS(feicoes_wfs(), ao_requisitar=ao_requisitar) as servidor:
+        total = scraper.baixar_embargos_paginado(
+            fonte_local(servidor.url),
+            gpkg_path=gpkg_path,
+            tamanho_pagina=TAMANHO_PAGINA
+        )
+
+    assert total == TOTAL_FEICOES
+    assert vistas == [(assinatura, 5)] * 3
+    assert len(gpd.read_file(gpkg_path, layer='embargos_teste')) == TOTAL_FEICOES
+    assert gpd.read_file(gpkg_path, layer='area_imovel')['cod_imovel'].tolist() == ['RO-1']
+
+
+def test_falha_em_uma_pagina_mantem_camada_anterior(tmp_path):
+    gpkg_path = str(tmp_path / 'embargos.gpkg')
+    anterior = camada_anterior(gpkg_path, 'embargos_teste')
+
+    with ServidorWFS(feicoes_wfs(), falhar_em=2 * TAMANHO_PAGINA) as servidor:
+        total = scraper.baixar_embargos_paginado(
+            fonte_local(servidor.url),
+            gpkg_path=gpkg_path,
+            tamanho_pagina=TAMANHO_PAGINA
+        )
+
+    assert total is None
+    assert_mesmas_feicoes(gpd.read_file(gpkg_path, layer='embargos_teste'), anterior)
+
+
+def test_atualizacao_paginada_falha_se_alguma_fonte_falhar(tmp_path, monkeypatch):
+    gpkg_path = str(tmp_path / 'car_embargos.gpkg')
+    anterior = camada_anterior(gpkg_path, 'embargos_falha')
+
+    with ServidorWFS(feicoes_wfs()) as ok, ServidorWFS(feicoes_wfs(), falhar_em=2 * TAMANHO_PAGINA) as falha:
+        monkeypatch.setattr(scraper, 'GPKG_OUTPUT', gpkg_path)
+        monkeypatch.setattr(scraper, 'FONTES_EMBARGO', [
+            fonte_local(ok.url, 'embargos_ok'),
+            fonte_local(falha.url, 'embargos_falha')
+        ])
+        sucesso = scraper.atualizar_geopackage(paginado=True, tamanho_pagina=TAMANHO_PAGINA)
+
+    assert sucesso is False
+    assert len(gpd.read_file(gpkg_path, layer='embargos_ok')) == TOTAL_FEICOES
+    assert_mesmas_feicoes(gpd.read_file(gpkg_path, layer='embargos_falha'), anterior)
+
+
+@pytest.mark.parametrize('opcoes', [{}, {'paginado': True, 'tamanho_pagina': TAMANHO_PAGINA}, {'incremental': True}])
+def test_atualizacao_em_segundo_plano_troca_cada_camada_de_uma_vez(tmp_path, monkeypatch, opcoes):
+    gpkg_path = str(tmp_path / 'car_embargos.gpkg')
+    camada_anterior(gpkg_path, 'embargos_a')
+    camada_anterior(gpkg_path, 'embargos_b')
+    assinatura = proc.assinatura_arquivo(gpkg_path)
+    vistas = []
+
+    def ao_requisitar():
+        vistas.append((proc.assinatura_arquivo(gpkg_path), len(gpd.read_file(gpkg_path, layer='embargos_a'))))
+
+    with ServidorWFS(feicoes_wfs(), ao_requisitar=ao_requisitar) as a, ServidorWFS(feicoes_wfs()) as b:
+        monkeypatch.setattr(scraper, 'GPKG_OUTPUT', gpkg_path)
+        monkeypatch.setattr(scraper, 'FONTES_EMBARGO', [fonte_local(a.url, 'embargos_a'), fonte_local(b.url, 'embargos_b')])
+        id_tarefa, nova = scraper.iniciar_atualizacao_background(**opcoes)
+        while scraper.status_atualizacao(id_tarefa)['estado'] == 'executando':
+            time.sleep(0.05)
+
+    assert nova and scraper.status_atualizacao(id_tarefa)['estado'] == 'concluida'
+    # Enquanto a fonte era baixada, a camada dela não mudou
+    assert vistas and all(linhas == 5 for _, linhas in vistas)
+    assinaturas = {vista for vista, _ in vistas} - {assinatura}
+    if opcoes.get('paginado'):
+        # As fontes são baixadas em paralelo: a outra camada pode já ter sido trocada, de uma vez
+        assert len(assinaturas) <= 1
+    else:
+        # Nos demais modos nada é gravado antes de todas as fontes terminarem
+        assert not assinaturas
+    for camada in ('embargos_a', 'embargos_b'):
+        assert len(gpd.read_file(gpkg_path, layer=camada)) == TOTAL_FEICOES
@@ -0,0 +1,129 @@
+"""
+Sincronização incremental: geometrias gravadas no tipo declarado da camada, e
+troca atômica de camadas inteiras
+"""
+
+import sqlite3
+
+import geopandas as gpd
+import pytest
+import shapely
+from shapely.geometry import GeometryCollection, LineString, MultiPolygon, box
+
+import sincronizacao
+from sincronizacao import gravar_camada, sincronizar_camada
+
+
+def sem_limpeza(gdf):
+    return gdf
+
+
+def tipo_declarado(gpkg_path, camada):
+    with sqlite3.connect(gpkg_path) as conexao:
+        return conexao.execute(
+            "SELECT geometry_type_name FROM gpkg_geometry_columns WHERE table_name = ?", (camada,)
+        ).fetchone()[0]
+
+
+def embargos(geometrias):
+    return gpd.GeoDataFrame(
+        {'num_tad': [f"TAD-{i}" for i in range(len(geometrias))]},
+        geometry=geometrias,
+        crs='EPSG:4326'
+    )
+
+
+def test_carga_completa_declara_multipolygon(tmp_path):
+    gpkg_path = str(tmp_path / 'embargos.gpkg')
+
+    sincronizar_camada(gpkg_path, 'embargos', embargos([box(0, 0, 1, 1), box(2, 2, 3, 3)]), sem_limpeza, 'num_tad')
+
+    assert tipo_declarado(gpkg_path, 'embargos') == 'MULTIPOLYGON'
+
+
+def test_delta_com_multipartes_e_colecoes_mantem_tipo(tmp_path):
+    gpkg_path = str(tmp_path / 'embargos.gpkg')
+    sincronizar_camada(gpkg_path, 'embargos', embargos([box(0, 0, 1, 1), box(2, 2, 3, 3)]), sem_limpeza, 'num_tad')
+
+    # Reparos do make_valid podem devolver multipartes ou coleções com linhas
+    multi = MultiPolygon([box(0, 0, 1, 1), box(5, 5, 6, 6)])
+    colecao = GeometryCollection([box(2, 2, 3, 3), LineString([(3, 3), (4, 4)])])
+    delta = sincronizar_camada(gpkg_path, 'embargos', embargos([multi, colecao]), sem_limpeza, 'num_tad')
+
+    assert delta['atualizados'] == 2
+    assert tipo_declarado(gpkg_path, 'embargos') == 'MULTIPOLYGON'
+
+    lidos = gpd.read_file(gpkg_path, layer='embargos').sort_values('num_tad')
+    assert list(lidos.geom_type) == ['MultiPolygon', 'MultiPolygon']
+    assert lidos.geometry.iloc[0].equals(multi)
+    assert lidos.geometry.iloc[1].equals(MultiPolygon([box(2, 2, 3, 3)]))
+
+
+def test_camada_polygon_antiga_recebendo_multipartes_e_recriada(tmp_path):
+    gpkg_path = str(tmp_path / 'embargos.gpkg')
+    sincronizar_camada(gpkg_path, 'embargos', embargos([box(0, 0, 1, 1), box(2, 2, 3, 3)]), sem_limpeza, 'num_tad')
+
+    # Camada gravada como POLYGON (ex.: por uma versão anterior do scraper)
+    gpd.read_file(gpkg_path, layer='embargos').explode(index_parts=False).to_file(
+        gpkg_path, layer='embargos', driver='GPKG'
+    )
+    assert tipo_declarado(gpkg_path, 'embargos') == 'POLYGON'
+
+    multi = MultiPolygon([box(0, 0, 1, 1), box(5, 5, 6, 6)])
+    sincronizar_camada(gpkg_path, 'embargos', embargos([multi, box(2, 2, 3, 3)]), sem_limpeza, 'num_tad')
+
+    assert tipo_declarado(gpkg_path, 'embargos') == 'MULTIPOLYGON'
+    lidos = gpd.read_file(gpkg_path, layer='embargos').sort_values('num_tad')
+    assert shapely.equals(lidos.geometry.iloc[0], multi)
+    assert len(lidos) == 2
+
+
+def test_troca_de_camada_com_esquema_novo_preserva_as_demais(tmp_path):
+    gpkg_path = str(tmp_path / 'car.gpkg')
+    sincronizar_camada(gpkg_path, 'embargos', embargos([box(0, 0, 1, 1), box(2, 2, 3, 3)]), sem_limpeza, 'num_tad')
+    gpd.GeoDataFrame({'cod_imovel': ['RO-1']}, geometry=[box(0, 0, 5, 5)], crs='EPSG:4674').to_file(
+        gpkg_path, layer='area_imovel', driver='GPKG'
+    )
+
+    # Coluna nova, outro tipo de geometria e outro CRS
+    nova = gpd.GeoDataFrame(
+        {'num_tad': ['TAD-9', 'TAD-8', 'TAD-7'], 'situacao': ['ativo', 'ativo', 'suspenso']},
+        geometry=[box(10, 10, 11, 11), box(12, 12, 13, 13).exterior, box(20, 20, 21, 21)],
+        crs='EPSG:31980'
+    )
+    gravar_camada(gpkg_path, 'embargos', nova)
+
+    lidos = gpd.read_file(gpkg_path, layer='embargos')
+    assert lidos.crs == 'EPSG:31980'
+    assert lidos['situacao'].tolist() == ['ativo', 'ativo', 'suspenso']
+    assert lidos.geometry.geom_equals(nova.geometry).all()
+    # Índice R-tree e contagem de feições vieram junto
+    assert gpd.read_file(gpkg_path, layer='embargos', bbox=(19, 19, 22, 22))['num_tad'].tolist() == ['TAD-7']
+    with sqlite3.connect(gpkg_path) as conexao:
+        assert conexao.execute(
+            "SELECT feature_count FROM gpkg_ogr_contents WHERE table_name = 'embargos'"
+        ).fetchone()[0] == 3
+    assert gpd.read_file(gpkg_path, layer='area_imovel')['cod_imovel'].tolist() == ['RO-1']
+
+    # Camada reescrita por fora da sincronização: a próxima é uma carga completa
+    delta = sincronizar_camada(gpkg_path, 'embargos', embargos([box(0, 0, 1, 1)]), sem_limpeza, 'num_tad')
+    assert delta['inseridos'] == 1
+    assert len(gpd.read_file(gpkg_path, layer='embargos')) == 1
+
+
+def test_falha_na_troca_mantem_camada_anterior(tmp_path, monkeypatch):
+    gpkg_path = str(tmp_path / 'car.gpkg')
+    sincronizar_camada(gpkg_path, 'embargos', embargos([box(0, 0, 1, 1), box(2, 2, 3, 3)]), sem_limpeza, 'num_tad')
+    anterior = gpd.read_file(gpkg_path, layer='embargos')
+
+    # Falha depois de a tabela antiga ter sido apagada e a nova copiada
+    def falhar(*args, **kwargs):
+        raise sqlite3.OperationalError("falha simulada")
+
+    monkeypatch.setattr(sincronizacao, '_copiar_linhas', falhar)
+    with pytest.raises(sqlite3.OperationalError):
+        gravar_camada(gpkg_path, 'embargos', embargos([box(5, 5, 6, 6)]))
+
+    lidos = gpd.read_file(gpkg_path, layer='embargos')
+    assert lidos['num_tad'].tolist() == anterior['num_tad'].tolist()
+    assert gpd.read_file(gpkg_path, layer='embargos', bbox=(1.5, 1.5, 3.5, 3.5))['num_tad'].tolist() == ['TAD-1']